@@ -4,19 +4,20 @@ from fastapi.security import HTTPBearer
 from jose import jwt
 import httpx
 from dotenv import load_dotenv
-from dependencies import supabase
+import asyncio
+from dependencies import supabase, close_db, r, redis_breaker
 from fastapi.middleware.cors import CORSMiddleware
 
 from prometheus_fastapi_instrumentator import Instrumentator
 
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-
 from models.auth import AuthCredentials
 
 from middlewares.monitoring import metrics_endpoint, monitoring_middleware
-from middlewares.logger import get_logger, log_auth_event
+from middlewares.logger import close_logs, get_logger, log_auth_event
+from helpers.local_cache import local_cache, listen_for_invalidations
+from helpers.cache_stats import report_cache_stats
+from helpers.cache_helpers import replay_missed_invalidations
+from config import CACHE_STATS_INTERVAL
 
 from middlewares.rate_limiter import (
     auth_rate_limit,
@@ -24,6 +25,9 @@ from middlewares.rate_limiter import (
     init_rate_limiter,
     limiter,
     rate_limit_exceeded_handler,
+    rate_limit_middleware,
+    sync_rate_limits,
+    RateLimitExceeded,
 )
 from routers import expenses
 from routers import groups
@@ -80,12 +84,37 @@ security = HTTPBearer()
 @app.on_event("startup")
 async def startup_event():
     await init_rate_limiter()
+    app.state.rate_limit_sync = asyncio.create_task(sync_rate_limits())
+    redis_breaker.on_recovery(lambda: replay_missed_invalidations(r))
+    if local_cache.enabled:
+        app.state.invalidation_listener = asyncio.create_task(
+            listen_for_invalidations(r)
+        )
+    if CACHE_STATS_INTERVAL > 0:
+        app.state.cache_stats_reporter = asyncio.create_task(report_cache_stats(r))
     logger.info("Application startup completed")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task_name in (
+        "invalidation_listener",
+        "cache_stats_reporter",
+        "rate_limit_sync",
+    ):
+        task = getattr(app.state, task_name, None)
+        if task:
+            task.cancel()
+    # Record the costs charged since the last sync
+    await limiter.sync()
+    await close_db()
+    logger.info("Application shutdown completed")
+    close_logs()
+
+
 # Add rate limiting middleware
-app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+app.middleware("http")(rate_limit_middleware)
 
 
 # Add monitoring middleware
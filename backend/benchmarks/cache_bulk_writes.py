@@ -0,0 +1,98 @@
+"""Benchmark for writing a group's expense list to the Redis cache.
+
+Compares the old one-HSET-per-item writes with one pipelined HSET mapping
+(wrapped in MULTI with the DEL, as cache_items does) and with one JSON blob:
+
+    python benchmarks/cache_bulk_writes.py --sizes 100 1000 5000 --repeat 5
+
+Uses REDIS_HOST / REDIS_PORT like the app, and only touches keys under
+bench:cache_bulk_writes:*.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone
+
+import redis.asyncio as redis
+
+KEY = "bench:cache_bulk_writes"
+
+
+def expense_rows(count: int):
+    group_id = str(uuid.uuid4())
+    persons = [str(uuid.uuid4()) for _ in range(8)]
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Expense {i}",
+            "amount": round(5 + i % 200 * 1.37, 2),
+            "payer_id": persons[i % len(persons)],
+            "group_id": group_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+async def per_item(client, rows):
+    await client.delete(KEY)
+    for row in rows:
+        await client.hset(KEY, row["id"], json.dumps(row))
+
+
+async def pipelined_mapping(client, rows):
+    mapping = {row["id"]: json.dumps(row) for row in rows}
+    async with client.pipeline(transaction=True) as pipe:
+        pipe.delete(KEY)
+        pipe.hset(KEY, mapping=mapping)
+        await pipe.execute()
+
+
+async def single_blob(client, rows):
+    await client.set(KEY, json.dumps(rows))
+
+
+async def run(sizes, repeat: int):
+    client = redis.Redis(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", "6379")),
+        decode_responses=True,
+    )
+    strategies = [
+        ("per-item HSET", per_item),
+        ("pipelined HSET", pipelined_mapping),
+        ("single blob", single_blob),
+    ]
+
+    try:
+        print(f"{'rows':>6}  {'strategy':<16} {'median':>10} {'best':>10}")
+        for size in sizes:
+            rows = expense_rows(size)
+            for name, write in strategies:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    await write(client, rows)
+                    timings.append(time.perf_counter() - start)
+                print(
+                    f"{size:>6}  {name:<16} "
+                    f"{statistics.median(timings) * 1000:>8.1f}ms "
+                    f"{min(timings) * 1000:>8.1f}ms"
+                )
+    finally:
+        await client.delete(KEY)
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.sizes, args.repeat))
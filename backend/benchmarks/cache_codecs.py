@@ -0,0 +1,111 @@
+"""Microbenchmark for the cache value codecs.
+
+Encodes and decodes realistic payloads with every available codec, plus the
+untagged json + datetime_parser path used before codecs existed:
+
+    python benchmarks/cache_codecs.py --expenses 1000 --persons 20 --repeat 50
+
+Run from the backend directory. Codecs whose package is not installed are
+skipped.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from helpers.cache_codecs import (  # noqa: E402
+    JsonCodec,
+    MsgpackCodec,
+    OrjsonCodec,
+    datetime_parser,
+    msgpack,
+    orjson,
+    serialize_dates,
+)
+
+
+class LegacyCodec:
+    def encode(self, value):
+        return json.dumps(value, default=serialize_dates)
+
+    def decode(self, payload):
+        return json.loads(payload, object_hook=datetime_parser)
+
+
+def expense_payload(count: int, persons):
+    group_id = str(uuid.uuid4())
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Expense {i}",
+            "amount": round(5 + i % 200 * 1.37, 2),
+            "payer_id": persons[i % len(persons)],
+            "group_id": group_id,
+            "created_at": datetime.now(timezone.utc),
+        }
+        for i in range(count)
+    ]
+
+
+def balances_payload(persons):
+    return {
+        person_id: {
+            "name": f"Person {i}",
+            "paid": 120.5 + i,
+            "owes": 80.25 + i,
+            "balance": 40.25,
+        }
+        for i, person_id in enumerate(persons)
+    }
+
+
+def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run(expenses: int, persons_count: int, repeat: int):
+    codecs = [("legacy json", LegacyCodec()), ("json", JsonCodec())]
+    if orjson:
+        codecs.append(("orjson", OrjsonCodec()))
+    if msgpack:
+        codecs.append(("msgpack", MsgpackCodec()))
+
+    persons = [str(uuid.uuid4()) for _ in range(persons_count)]
+    payloads = [
+        (f"{expenses} expenses", expense_payload(expenses, persons)),
+        (f"{persons_count} balances", balances_payload(persons)),
+    ]
+
+    print(f"{'payload':<16} {'codec':<12} {'encode':>10} {'decode':>10} {'bytes':>9}")
+    for label, payload in payloads:
+        for name, codec in codecs:
+            encoded = codec.encode(payload)
+            encode_time = measure(lambda: codec.encode(payload), repeat)
+            decode_time = measure(lambda: codec.decode(encoded), repeat)
+            print(
+                f"{label:<16} {name:<12} "
+                f"{encode_time * 1e6:>8.0f}us {decode_time * 1e6:>8.0f}us "
+                f"{len(encoded):>9}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--expenses", type=int, default=1000)
+    parser.add_argument("--persons", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    run(args.expenses, args.persons, args.repeat)
@@ -0,0 +1,102 @@
+"""Per-request cost of serving a cache hit for GET /groups/{group_id}/expenses.
+
+Compares, in process and without Redis, the decode + validate + re-encode
+path with returning the cached response body as is (plain and gzipped):
+
+    python benchmarks/cached_response_path.py --sizes 100 1000 5000 --repeat 50
+
+Reports median wall time and CPU time per request. For end-to-end latency
+under a hit-heavy load, warm the cache and run group_expenses_throughput.py.
+"""
+
+import argparse
+import base64
+import gzip
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from helpers.cache_codecs import decode_cache_value, encode_cache_value  # noqa: E402
+from models.expense import ExpenseListResponse  # noqa: E402
+
+
+def cached_hash(count: int):
+    group_id = str(uuid.uuid4())
+    payer_id = str(uuid.uuid4())
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Expense {i}",
+            "amount": round(5 + i % 200 * 1.37, 2),
+            "payer_id": payer_id,
+            "group_id": group_id,
+            "created_at": datetime.now(timezone.utc),
+        }
+        for i in range(count)
+    ]
+    return {row["id"]: encode_cache_value(row) for row in rows}
+
+
+def decode_and_validate(hash_values, body, gzipped):
+    expenses = [decode_cache_value(v) for v in hash_values.values()]
+    response = ExpenseListResponse(expenses=expenses)
+    return JSONResponse(jsonable_encoder(response)).body
+
+
+def cached_body(hash_values, body, gzipped):
+    return Response(content=body.encode(), media_type="application/json").body
+
+
+def cached_gzip_body(hash_values, body, gzipped):
+    return Response(
+        content=base64.b64decode(gzipped),
+        media_type="application/json",
+        headers={"Content-Encoding": "gzip"},
+    ).body
+
+
+def measure(fn, args, repeat: int):
+    wall, cpu = [], []
+    for _ in range(repeat):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        fn(*args)
+        wall.append(time.perf_counter() - wall_start)
+        cpu.append(time.process_time() - cpu_start)
+    return statistics.median(wall), statistics.median(cpu)
+
+
+def run(sizes, repeat: int):
+    paths = [
+        ("decode + validate", decode_and_validate),
+        ("cached body", cached_body),
+        ("cached gzip body", cached_gzip_body),
+    ]
+
+    print(f"{'rows':>6}  {'path':<18} {'wall':>10} {'cpu':>10}")
+    for size in sizes:
+        hash_values = cached_hash(size)
+        expenses = [decode_cache_value(v) for v in hash_values.values()]
+        body = ExpenseListResponse(expenses=expenses).model_dump_json()
+        gzipped = base64.b64encode(gzip.compress(body.encode())).decode()
+
+        for name, fn in paths:
+            wall, cpu = measure(fn, (hash_values, body, gzipped), repeat)
+            print(f"{size:>6}  {name:<18} {wall * 1e3:>8.2f}ms {cpu * 1e3:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    run(args.sizes, args.repeat)
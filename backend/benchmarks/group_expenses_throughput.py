@@ -0,0 +1,61 @@
+"""Concurrent throughput benchmark for GET /groups/{group_id}/expenses.
+
+Run against a live server, once per build you want to compare:
+
+    python benchmarks/group_expenses_throughput.py <group_id> \
+        --base-url http://localhost:8000 --requests 500 --concurrency 50
+
+Each request sends a distinct ``user-id`` header so the per-client rate
+limit does not dominate the numbers. Flush Redis (or use a group whose
+cache keys are cold) to measure the DB path rather than cache hits.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def run(base_url: str, group_id: str, total: int, concurrency: int):
+    url = f"{base_url}/groups/{group_id}/expenses"
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=concurrency), timeout=30
+    ) as client:
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url, headers={"user-id": uuid.uuid4().hex})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"Requests:    {total} (concurrency {concurrency}, errors {errors})")
+    print(f"Throughput:  {total / elapsed:.1f} req/s")
+    print(f"Latency p50: {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"Latency p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+    print(f"Latency max: {latencies[-1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("group_id")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.base_url, args.group_id, args.requests, args.concurrency))
@@ -0,0 +1,101 @@
+"""Benchmark for the logging overhead of a request, with logging off, with
+synchronous sinks and with the queued writer thread.
+
+Each simulated request emits the lines a typical route does (cache, database,
+app and performance lines, plus a debug line) around a short sleep standing in
+for the awaited DB call, and reports the time spent logging per request:
+
+    python benchmarks/logging_overhead.py --requests 5000
+
+Console output goes to /dev/null and log files to a temporary directory.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger  # noqa: E402
+
+from middlewares.logger import (  # noqa: E402
+    LoggerConfig,
+    close_logs,
+    get_logger,
+    log_cache_operation,
+    log_database_operation,
+    log_performance,
+)
+
+
+def request(app_logger, i: int, io_seconds: float):
+    """Run a request and return the time it spent logging"""
+    start = time.perf_counter()
+    app_logger.debug(f"Resolving group {i}")
+    app_logger.info(f"Fetching expenses for group {i}")
+    log_cache_operation("GET", f"group_expenses:{i}", hit=False)
+    before_io = time.perf_counter()
+
+    time.sleep(io_seconds)
+
+    after_io = time.perf_counter()
+    log_database_operation("SELECT", "expenses", 0.004)
+    log_cache_operation("SET", f"group_expenses:{i}")
+    log_performance("/groups/{group_id}/expenses", 0.012, 200, "GET")
+    return before_io - start + time.perf_counter() - after_io
+
+
+def run_mode(name: str, queue_size, args, devnull):
+    with tempfile.TemporaryDirectory() as log_dir:
+        if queue_size is None:
+            logger.remove()
+        else:
+            LoggerConfig(log_dir=log_dir, queue_size=queue_size, stream=devnull)
+        app_logger = get_logger()
+
+        timings = [
+            request(app_logger, i, args.io_ms / 1000) for i in range(args.requests)
+        ]
+
+        # Time for the writer thread to catch up, not seen by requests
+        drain_start = time.perf_counter()
+        close_logs()
+        drain = time.perf_counter() - drain_start
+
+    timings.sort()
+    print(
+        f"{name:<10} {statistics.mean(timings) * 1e6:>10.1f} "
+        f"{timings[int(len(timings) * 0.99)] * 1e6:>10.1f} "
+        f"{drain * 1000:>10.1f}"
+    )
+
+
+def main(args):
+    modes = [
+        ("off", None),
+        ("sync", 0),
+        ("queued", args.queue_size),
+    ]
+    with open(os.devnull, "w") as devnull:
+        print(
+            f"requests {args.requests}  io {args.io_ms}ms  "
+            f"queue size {args.queue_size}"
+        )
+        print(f"{'logging':<10} {'mean (us)':>10} {'p99 (us)':>10} {'drain (ms)':>10}")
+        for name, queue_size in modes:
+            run_mode(name, queue_size, args, devnull)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument(
+        "--io-ms", type=float, default=1, help="time each request waits on I/O"
+    )
+    parser.add_argument("--queue-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,130 @@
+"""Benchmark for Redis traffic of the rate limiter, with and without local
+token buckets.
+
+Simulates several workers, each with its own limiter, serving clients that
+send requests at a steady rate, and reports Redis round trips per request
+and how far each client got past its limit:
+
+    python benchmarks/rate_limiter_redis_ops.py --workers 4 --clients 20
+
+Uses REDIS_HOST / REDIS_PORT like the app, and only touches keys under
+bench:rate_limiter_ops:*.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from middlewares.rate_limiter import SlidingWindowLimiter  # noqa: E402
+
+KEY = "bench:rate_limiter_ops"
+
+
+class CountingPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        self.round_trips[0] += 1
+        return await super().execute(raise_on_error)
+
+
+class CountingRedis(redis.Redis):
+    """Redis client that counts round trips, a pipeline being one"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.round_trips = [0]
+
+    async def execute_command(self, *args, **options):
+        self.round_trips[0] += 1
+        return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None):
+        pipe = CountingPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+        pipe.round_trips = self.round_trips
+        return pipe
+
+
+async def run_strategy(client, args, local_share: float, sync_interval: float):
+    workers = [
+        SlidingWindowLimiter(client, local_share=local_share)
+        for _ in range(args.workers)
+    ]
+    allowed = [0] * args.clients
+
+    async def sync_loop(limiter):
+        while True:
+            await asyncio.sleep(sync_interval)
+            await limiter.sync()
+
+    async def client_requests(client_index: int):
+        key = f"{KEY}:{client_index}"
+        for i in range(args.requests):
+            # Requests of one client are spread over all workers
+            limiter = workers[(client_index + i) % len(workers)]
+            result = await limiter.hit(key, args.limit, 60)
+            allowed[client_index] += result.allowed
+            await asyncio.sleep(1 / args.rate)
+
+    syncs = [asyncio.create_task(sync_loop(limiter)) for limiter in workers]
+    client.round_trips[0] = 0
+    try:
+        await asyncio.gather(*[client_requests(i) for i in range(args.clients)])
+    finally:
+        for task in syncs:
+            task.cancel()
+    for limiter in workers:
+        await limiter.sync()
+
+    total = args.clients * args.requests
+    over = max(allowed) - min(args.limit, args.requests)
+    return client.round_trips[0] / total, over
+
+
+async def run(args):
+    client = CountingRedis(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", "6379")),
+        decode_responses=True,
+    )
+    strategies = [
+        ("redis per request", 0, args.sync_ms / 1000),
+        (f"local share {args.share}", args.share, args.sync_ms / 1000),
+    ]
+
+    try:
+        print(
+            f"workers {args.workers}  clients {args.clients}  "
+            f"requests {args.requests}  limit {args.limit}  sync {args.sync_ms}ms"
+        )
+        print(f"{'strategy':<20} {'round trips/req':>16} {'max over limit':>15}")
+        for name, share, sync_interval in strategies:
+            keys = [f"{KEY}:{i}" for i in range(args.clients)]
+            await client.delete(*keys)
+            ops, over = await run_strategy(client, args, share, sync_interval)
+            print(f"{name:<20} {ops:>16.3f} {over:>15}")
+            await client.delete(*keys)
+    finally:
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=60)
+    parser.add_argument(
+        "--rate", type=float, default=200, help="requests per second per client"
+    )
+    parser.add_argument("--share", type=float, default=0.1)
+    parser.add_argument("--sync-ms", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
@@ -0,0 +1,141 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# Database (PostgREST) HTTP connection pool
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "20"))
+DB_POOL_MAX_KEEPALIVE = int(os.getenv("DB_POOL_MAX_KEEPALIVE", "10"))
+DB_POOL_KEEPALIVE_EXPIRY = float(os.getenv("DB_POOL_KEEPALIVE_EXPIRY", "30"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+
+# Group balance engine: "python" sums rows in the app, "sql" aggregates in
+# Postgres via the group_balances RPC (sql/group_balances.sql), "compare" runs
+# both, logs any mismatch and returns the python result
+BALANCE_ENGINE = os.getenv("BALANCE_ENGINE", "python")
+
+# Paged reads: page size must not exceed PostgREST's max-rows setting
+# (1000 on Supabase), pages are fetched with bounded concurrency
+DB_PAGE_SIZE = int(os.getenv("DB_PAGE_SIZE", "1000"))
+DB_FETCH_CONCURRENCY = int(os.getenv("DB_FETCH_CONCURRENCY", "4"))
+
+# Cursor pagination for list endpoints; the max must not exceed DB_PAGE_SIZE
+DEFAULT_PAGE_LIMIT = int(os.getenv("DEFAULT_PAGE_LIMIT", "100"))
+MAX_PAGE_LIMIT = min(int(os.getenv("MAX_PAGE_LIMIT", "1000")), DB_PAGE_SIZE)
+
+# Redis socket timeouts (seconds). After REDIS_BREAKER_FAILURES consecutive
+# connection errors or timeouts the circuit breaker opens: routes skip the
+# cache and go to the DB, and after REDIS_BREAKER_RESET seconds one probe
+# command is let through to check whether Redis is back
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "1"))
+REDIS_BREAKER_FAILURES = int(os.getenv("REDIS_BREAKER_FAILURES", "5"))
+REDIS_BREAKER_RESET = float(os.getenv("REDIS_BREAKER_RESET", "10"))
+
+# Rate limits are pre-checked against per-client token buckets in process
+# memory. After each Redis check a worker may admit RATE_LIMIT_LOCAL_SHARE of
+# the client's remaining budget on its own, and syncs it to Redis every
+# RATE_LIMIT_SYNC_INTERVAL ms. With W workers a client can exceed its limit by
+# at most W * floor(RATE_LIMIT_LOCAL_SHARE * limit) cost units per window.
+# 0 checks every request against Redis
+RATE_LIMIT_LOCAL_SHARE = float(os.getenv("RATE_LIMIT_LOCAL_SHARE", "0.1"))
+RATE_LIMIT_SYNC_INTERVAL = int(os.getenv("RATE_LIMIT_SYNC_INTERVAL", "50"))
+
+# Rate limits are budgets of cost units. A request is charged what it did:
+# a base cost, plus each DB call, row read and second spent in the DB, so
+# cache hits are nearly free and requests cost more as the DB slows down
+RATE_LIMIT_COST_BASE = float(os.getenv("RATE_LIMIT_COST_BASE", "0.1"))
+RATE_LIMIT_COST_DB_CALL = float(os.getenv("RATE_LIMIT_COST_DB_CALL", "0.5"))
+RATE_LIMIT_COST_DB_ROW = float(os.getenv("RATE_LIMIT_COST_DB_ROW", "0.001"))
+RATE_LIMIT_COST_DB_SECOND = float(os.getenv("RATE_LIMIT_COST_DB_SECOND", "5"))
+
+# In-process L1 cache in front of Redis, invalidated over Redis pub/sub.
+# The TTL bounds staleness if an invalidation message is ever missed
+L1_CACHE_ENABLED = os.getenv("L1_CACHE_ENABLED", "false").lower() == "true"
+L1_CACHE_MAX_ENTRIES = int(os.getenv("L1_CACHE_MAX_ENTRIES", "1000"))
+L1_CACHE_TTL = float(os.getenv("L1_CACHE_TTL", "5"))
+
+# Cache stampede protection: one worker fills a missing key under a Redis
+# lease (seconds) while the others poll the cache for up to FILL_WAIT seconds
+CACHE_FILL_LEASE_TTL = float(os.getenv("CACHE_FILL_LEASE_TTL", "10"))
+CACHE_FILL_WAIT = float(os.getenv("CACHE_FILL_WAIT", "3"))
+CACHE_FILL_POLL_INTERVAL = float(os.getenv("CACHE_FILL_POLL_INTERVAL", "0.05"))
+
+
+# Serialization of cached values: json (uses orjson when installed), orjson
+# or msgpack. Values are tagged with their codec, so switching needs no flush
+CACHE_CODEC = os.getenv("CACHE_CODEC", "json")
+
+# Cached response bodies are also stored gzipped when at least this large,
+# and served as is to clients that accept gzip
+CACHE_RESPONSE_GZIP = os.getenv("CACHE_RESPONSE_GZIP", "true").lower() == "true"
+CACHE_RESPONSE_GZIP_MIN_BYTES = int(os.getenv("CACHE_RESPONSE_GZIP_MIN_BYTES", "1024"))
+
+# Cached lists with at least this many items are streamed to the client with
+# HSCAN, CACHE_SCAN_COUNT fields at a time, instead of read whole with HGETALL
+CACHE_STREAM_MIN_ITEMS = int(os.getenv("CACHE_STREAM_MIN_ITEMS", "1000"))
+CACHE_SCAN_COUNT = int(os.getenv("CACHE_SCAN_COUNT", "500"))
+
+
+# Cache policy per key family (see cache_key_family in constants/cache_keys.py):
+# - ttl: hard expiry in seconds, 0 keeps the key until evicted
+# - soft_ttl: past this an entry is served while it is refreshed in the
+#   background (stale-while-revalidate), 0 disables
+# - max_entries: most rows or pages kept in one cached hash, 0 is unbounded
+# - max_bytes: largest single value cached, 0 is unbounded
+# Override any field per family, e.g. CACHE_SOFT_TTL_GROUP_SNAPSHOT=15
+def cache_policy(
+    family: str, ttl: int, soft_ttl: int = 0, max_entries: int = 0, max_bytes: int = 0
+):
+    prefix = family.upper()
+    return {
+        "ttl": int(os.getenv(f"CACHE_TTL_{prefix}", ttl)),
+        "soft_ttl": int(os.getenv(f"CACHE_SOFT_TTL_{prefix}", soft_ttl)),
+        "max_entries": int(os.getenv(f"CACHE_MAX_ENTRIES_{prefix}", max_entries)),
+        "max_bytes": int(os.getenv(f"CACHE_MAX_BYTES_{prefix}", max_bytes)),
+    }
+
+
+CACHE_POLICIES = {
+    "expenses_list": cache_policy("expenses_list", 600, 30, 200, 1_000_000),
+    "debtors_list": cache_policy("debtors_list", 600, 0, 200, 1_000_000),
+    "persons_list": cache_policy("persons_list", 600, 0, 200, 1_000_000),
+    "groups_list": cache_policy("groups_list", 600, 30, 200, 1_000_000),
+    "members_list": cache_policy("members_list", 600, 0, 200, 1_000_000),
+    "group": cache_policy("group", 3600, 60, 0, 100_000),
+    "group_expenses": cache_policy("group_expenses", 86400, 0, 20_000, 100_000),
+    "group_persons": cache_policy("group_persons", 86400, 0, 1_000, 100_000),
+    "group_debtors": cache_policy("group_debtors", 86400, 0, 100_000, 100_000),
+    "group_ledger": cache_policy("group_ledger", 86400),
+    "group_snapshot": cache_policy("group_snapshot", 600, 30, 0, 5_000_000),
+    "user_groups": cache_policy("user_groups", 3600, 0, 1_000, 100_000),
+    # Generation counters must outlive every key that embeds them
+    "group_generation": cache_policy("group_generation", 0),
+}
+
+# Policy for keys outside the families above
+CACHE_DEFAULT_POLICY = cache_policy("default", 86400)
+
+# Seconds to remember that a list is empty or an object does not exist
+CACHE_NEGATIVE_TTL = int(os.getenv("CACHE_NEGATIVE_TTL", "30"))
+
+# Seconds to keep a cache key's version counter after its last invalidation.
+# Must be far longer than any fill, which compares it before writing
+CACHE_VERSION_TTL = int(os.getenv("CACHE_VERSION_TTL", "86400"))
+
+# Seconds between samples of cache key counts and bytes per family for the
+# metrics endpoint, 0 disables. Sampling SCANs the whole keyspace
+CACHE_STATS_INTERVAL = int(os.getenv("CACHE_STATS_INTERVAL", "300"))
+
+# Distinct values kept per metric label (e.g. endpoint), past which new values
+# are counted under "other" so /metrics cannot grow without bound
+METRICS_MAX_LABEL_VALUES = int(os.getenv("METRICS_MAX_LABEL_VALUES", "200"))
+
+# Log records are queued and written by a background thread, LOG_BATCH_SIZE at
+# a time or every LOG_FLUSH_INTERVAL seconds. At most LOG_QUEUE_SIZE records
+# wait; past that debug lines are dropped first, then info. 0 logs synchronously
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "256"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.2"))
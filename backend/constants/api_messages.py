@@ -62,6 +62,17 @@ class ErrorMessages:
     ERROR_DELETING_MEMBER = "Error deleting member"
     ERROR_UPDATING_MEMBER = "Error updating member"
     ERROR_RETRIEVING_USER_GROUPS = "Error retrieving user groups"
+    ERROR_RETRIEVING_EXPENSES = "Error retrieving expenses"
+    ERROR_RETRIEVING_GROUPS = "Error retrieving groups"
+    ERROR_RETRIEVING_GROUP = "Error retrieving group"
+    ERROR_RETRIEVING_GROUP_EXPENSES = "Error retrieving group expenses"
+    ERROR_RETRIEVING_GROUP_PERSONS = "Error retrieving group persons"
+    ERROR_RETRIEVING_GROUP_DEBTORS = "Error retrieving group debtors"
+    ERROR_RETRIEVING_GROUP_BALANCES = "Error retrieving group balances"
+    ERROR_RETRIEVING_GROUP_SNAPSHOT = "Error retrieving group snapshot"
+    ERROR_RETRIEVING_PERSONS = "Error retrieving persons"
+    ERROR_RETRIEVING_DEBTORS = "Error retrieving debtors"
+    ERROR_RETRIEVING_MEMBERS = "Error retrieving members"
 
     # Business logic errors
     INSUFFICIENT_PERMISSIONS = "Insufficient permissions for this operation"
@@ -0,0 +1,77 @@
+# Which cached views are built from which tables, so a mutation only has to
+# say what changed (see helpers/invalidation_helpers.py)
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, List, Optional
+
+from constants.cache_keys import (
+    DEBTORS_ALL,
+    EXPENSES_ALL,
+    GROUPS_ALL,
+    MEMBERS_ALL,
+    PERSONS_ALL,
+    group_cache_key,
+    group_debtors_cache_key,
+    group_expenses_cache_key,
+    group_persons_cache_key,
+    group_snapshot_cache_key,
+    user_groups_cache_key,
+)
+
+GLOBAL = "global"
+GROUP = "group"
+USER = "user"
+
+
+@dataclass(frozen=True)
+class CachedView:
+    """A cached view and the table columns it is built from"""
+
+    name: str
+    # Key scope: GLOBAL keys take no arguments, GROUP keys take
+    # (group_id, generation) and USER keys take user_id
+    scope: str
+    key: Callable[..., str]
+    # Columns the view reads; None means every column
+    columns: Optional[FrozenSet[str]] = None
+    # Hash of rows by id that is patched in place instead of dropped
+    patchable: bool = False
+
+
+EXPENSES_LIST_VIEW = CachedView("expenses_list", GLOBAL, lambda: EXPENSES_ALL)
+DEBTORS_LIST_VIEW = CachedView("debtors_list", GLOBAL, lambda: DEBTORS_ALL)
+PERSONS_LIST_VIEW = CachedView("persons_list", GLOBAL, lambda: PERSONS_ALL)
+GROUPS_LIST_VIEW = CachedView("groups_list", GLOBAL, lambda: GROUPS_ALL)
+MEMBERS_LIST_VIEW = CachedView("members_list", GLOBAL, lambda: MEMBERS_ALL)
+
+GROUP_VIEW = CachedView("group", GROUP, group_cache_key)
+GROUP_EXPENSES_VIEW = CachedView(
+    "group_expenses", GROUP, group_expenses_cache_key, patchable=True
+)
+GROUP_PERSONS_VIEW = CachedView("group_persons", GROUP, group_persons_cache_key)
+GROUP_DEBTORS_VIEW = CachedView("group_debtors", GROUP, group_debtors_cache_key)
+GROUP_SNAPSHOT_VIEW = CachedView("group_snapshot", GROUP, group_snapshot_cache_key)
+
+# Embeds groups(id, name, created_at) per membership
+USER_GROUPS_VIEW = CachedView(
+    "user_groups",
+    USER,
+    user_groups_cache_key,
+    columns=frozenset({"id", "name", "created_at"}),
+)
+
+# Balances are not listed: the group ledger is kept current with deltas
+# (helpers/ledger_helpers.py), not invalidated
+CACHE_DEPENDENCIES: Dict[str, List[CachedView]] = {
+    "expenses": [EXPENSES_LIST_VIEW, GROUP_EXPENSES_VIEW, GROUP_SNAPSHOT_VIEW],
+    "expenses_debtors": [DEBTORS_LIST_VIEW, GROUP_DEBTORS_VIEW, GROUP_SNAPSHOT_VIEW],
+    "persons": [PERSONS_LIST_VIEW, GROUP_PERSONS_VIEW, GROUP_SNAPSHOT_VIEW],
+    "groups": [GROUPS_LIST_VIEW, GROUP_VIEW, GROUP_SNAPSHOT_VIEW, USER_GROUPS_VIEW],
+    "group_users": [MEMBERS_LIST_VIEW, USER_GROUPS_VIEW],
+}
+
+# Deleting a row of these tables cascades to rows of the listed tables in
+# the same group, so every group view is dropped with a generation bump
+CASCADING_DELETES: Dict[str, List[str]] = {
+    "groups": ["expenses", "expenses_debtors", "persons", "group_users"],
+    "persons": ["expenses", "expenses_debtors"],
+}
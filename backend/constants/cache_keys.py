@@ -1,37 +1,59 @@
 # Cache key constants and generators
+import re
+from typing import Optional
 
-# Global cache keys
+# Global cache keys, each a hash of cursor pages (see list_page_cache_field)
 EXPENSES_ALL = "expenses:all"
 GROUPS_ALL = "groups:all"
 PERSONS_ALL = "persons:all"
 DEBTORS_ALL = "debtors:all"
 MEMBERS_ALL = "members:all"
 
+# Bump when the shape of the group snapshot payload changes
+GROUP_SNAPSHOT_VERSION = 1
+
 
 # Dynamic cache key generators
-def group_cache_key(group_id: str) -> str:
+def list_page_cache_field(limit: int, after: Optional[str], columns: str) -> str:
+    """Generate hash field for one cursor page of a global list"""
+    return f"{limit}:{after or ''}:{columns}"
+
+
+# Group-scoped keys embed the group's generation (see group_generation_key),
+# so bumping it orphans them all at once and they age out via their TTL
+def group_generation_key(group_id: str) -> str:
+    """Generate key for the cache generation counter of a specific group"""
+    return f"groups:{group_id}:generation"
+
+
+def group_cache_key(group_id: str, generation: int) -> str:
     """Generate cache key for a specific group"""
-    return f"groups:{group_id}"
+    return f"groups:{group_id}:g{generation}"
 
 
-def group_expenses_cache_key(group_id: str) -> str:
+def group_expenses_cache_key(group_id: str, generation: int) -> str:
     """Generate cache key for expenses of a specific group"""
-    return f"groups:{group_id}:expenses"
+    return f"groups:{group_id}:g{generation}:expenses"
 
 
-def group_persons_cache_key(group_id: str) -> str:
+def group_persons_cache_key(group_id: str, generation: int) -> str:
     """Generate cache key for persons in a specific group"""
-    return f"groups:{group_id}:persons"
+    return f"groups:{group_id}:g{generation}:persons"
 
 
-def group_debtors_cache_key(group_id: str) -> str:
+def group_debtors_cache_key(group_id: str, generation: int) -> str:
     """Generate cache key for debtors in a specific group"""
-    return f"groups:{group_id}:debtors"
+    return f"groups:{group_id}:g{generation}:debtors"
 
 
-def group_balances_cache_key(group_id: str) -> str:
-    """Generate cache key for balances of a specific group"""
-    return f"groups:{group_id}:balances"
+def group_ledger_cache_key(group_id: str, generation: int) -> str:
+    """Generate cache key for the running balance ledger of a specific group"""
+    return f"groups:{group_id}:g{generation}:ledger"
+
+
+def group_snapshot_cache_key(group_id: str, generation: int) -> str:
+    """Generate cache key for the full snapshot of a specific group"""
+    return f"groups:{group_id}:g{generation}:snapshot:v{GROUP_SNAPSHOT_VERSION}"
 
 
 def user_groups_cache_key(user_id: str) -> str:
@@ -39,3 +61,57 @@ def user_groups_cache_key(user_id: str) -> str:
     return f"users:{user_id}:groups"
 
 
+def cache_fill_lease_key(cache_key: str) -> str:
+    """Generate key for the lease held while one worker fills a cache key"""
+    return f"{cache_key}:fill"
+
+
+def cache_freshness_key(cache_key: str, field: Optional[str] = None) -> str:
+    """Generate key that marks a cache entry (or one hash field) as fresh"""
+    if field is None:
+        return f"{cache_key}:fresh"
+    return f"{cache_key}:fresh:{field}"
+
+
+def cache_build_key(cache_key: str, token: str) -> str:
+    """Generate key for a cached list while it is being written"""
+    return f"{cache_key}:build:{token}"
+
+
+def cache_version_key(cache_key: str) -> str:
+    """Generate key for the counter bumped on every invalidation of a cache key"""
+    return f"{cache_key}:ver"
+
+
+def response_cache_key(cache_key: str) -> str:
+    """Generate key for the rendered response body built from a cache key"""
+    return f"{cache_key}:response"
+
+
+# Cache key families, matched against a key with any derived suffix
+# (:response, :fresh..., :fill, :ver) removed. Each family has a policy in config
+CACHE_KEY_FAMILIES = [
+    ("expenses_list", re.compile(r"expenses:all")),
+    ("groups_list", re.compile(r"groups:all")),
+    ("persons_list", re.compile(r"persons:all")),
+    ("debtors_list", re.compile(r"debtors:all")),
+    ("members_list", re.compile(r"members:all")),
+    ("group_generation", re.compile(r"groups:[^:]+:generation")),
+    ("group", re.compile(r"groups:[^:]+:g\d+")),
+    ("group_expenses", re.compile(r"groups:[^:]+:g\d+:expenses")),
+    ("group_persons", re.compile(r"groups:[^:]+:g\d+:persons")),
+    ("group_debtors", re.compile(r"groups:[^:]+:g\d+:debtors")),
+    ("group_ledger", re.compile(r"groups:[^:]+:g\d+:ledger")),
+    ("group_snapshot", re.compile(r"groups:[^:]+:g\d+:snapshot:v\d+")),
+    ("user_groups", re.compile(r"users:[^:]+:groups")),
+]
+DERIVED_KEY_SUFFIX = re.compile(r":(response|fill|ver|fresh(:.*)?|build:\w+)$")
+
+
+def cache_key_family(cache_key: str) -> str:
+    """Get the family of a cache key, or "other" for unknown keys"""
+    base_key = DERIVED_KEY_SUFFIX.sub("", cache_key)
+    for family, pattern in CACHE_KEY_FAMILIES:
+        if pattern.fullmatch(base_key):
+            return family
+    return "other"
@@ -1,26 +1,82 @@
-import redis.asyncio as redis
 import os
+import httpx
 from dotenv import load_dotenv
+from postgrest import AsyncPostgrestClient
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
 from supabase import create_client, Client
 
+from config import (
+    DB_POOL_MAX_CONNECTIONS,
+    DB_POOL_MAX_KEEPALIVE,
+    DB_POOL_KEEPALIVE_EXPIRY,
+    DB_POOL_TIMEOUT,
+    DB_TIMEOUT,
+    REDIS_BREAKER_FAILURES,
+    REDIS_BREAKER_RESET,
+    REDIS_CONNECT_TIMEOUT,
+    REDIS_SOCKET_TIMEOUT,
+)
+from helpers.circuit_breaker import BreakerRedis, CircuitBreaker
+
 load_dotenv()
 
 
-r = redis.Redis(
+# Fail fast while Redis is down, so routes fall back to the DB instead of
+# waiting on timeouts
+redis_breaker = CircuitBreaker("redis", REDIS_BREAKER_FAILURES, REDIS_BREAKER_RESET)
+
+r = BreakerRedis(
     host=os.getenv("REDIS_HOST", "localhost"),
     port=int(os.getenv("REDIS_PORT", "6379")),
     decode_responses=True,
+    socket_timeout=REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+    # One immediate retry covers a dropped idle connection, the breaker
+    # handles anything longer than that
+    retry=Retry(NoBackoff(), 1),
+    breaker=redis_breaker,
 )
 
 SUPABASE_PROJECT_ID = os.getenv("SUPABASE_PROJECT_ID")
 SUPABASE_URL = f"https://{SUPABASE_PROJECT_ID}.supabase.co"
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+
+# Sync client, only used for auth (called from sync routes in the threadpool)
 supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
 
+# Async PostgREST client for all table access, backed by a pooled
+# keep-alive HTTP client so DB round trips never block the event loop
+db_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=DB_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=DB_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=DB_POOL_KEEPALIVE_EXPIRY,
+    ),
+    timeout=httpx.Timeout(DB_TIMEOUT, pool=DB_POOL_TIMEOUT),
+    follow_redirects=True,
+)
+
+db = AsyncPostgrestClient(
+    f"{SUPABASE_URL}/rest/v1",
+    headers={
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "apikey": SUPABASE_SERVICE_KEY or "",
+        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+    },
+    http_client=db_http_client,
+)
+
 
 def get_redis():
     return r
 
 
-def get_supabase() -> Client:
-    return supabase
+def get_supabase() -> AsyncPostgrestClient:
+    return db
+
+
+async def close_db():
+    """Close pooled DB connections"""
+    await db.aclose()
@@ -0,0 +1,120 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+from config import CACHE_CODEC
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def serialize_dates(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+
+def datetime_parser(dct):
+    for k, v in dct.items():
+        if isinstance(v, str) and v.endswith("+00:00"):
+            try:
+                dct[k] = datetime.fromisoformat(v)
+            except:
+                pass
+    return dct
+
+
+class JsonCodec:
+    """Standard library JSON. Dates are stored as ISO strings and left as
+    strings on read, the response models parse them"""
+
+    name = "json"
+    version = 1
+
+    def encode(self, value: Any) -> str:
+        return json.dumps(value, default=serialize_dates)
+
+    def decode(self, payload: str) -> Any:
+        return json.loads(payload)
+
+
+class OrjsonCodec(JsonCodec):
+    """Same wire format as JsonCodec, so either one reads the other's values"""
+
+    def encode(self, value: Any) -> str:
+        return orjson.dumps(value).decode()
+
+    def decode(self, payload: str) -> Any:
+        return orjson.loads(payload)
+
+
+class MsgpackCodec:
+    """MessagePack, base64 wrapped because the Redis client decodes replies
+    to str"""
+
+    name = "msgpack"
+    version = 1
+
+    def encode(self, value: Any) -> str:
+        packed = msgpack.packb(value, default=serialize_dates)
+        return base64.b64encode(packed).decode()
+
+    def decode(self, payload: str) -> Any:
+        return msgpack.unpackb(base64.b64decode(payload))
+
+
+# Readers for every tag we may find in Redis, so switching CACHE_CODEC
+# needs no flush: values written by the previous codec stay readable
+DECODERS: Dict[Tuple[str, str], Any] = {
+    (JsonCodec.name, str(JsonCodec.version)): OrjsonCodec() if orjson else JsonCodec()
+}
+if msgpack:
+    DECODERS[(MsgpackCodec.name, str(MsgpackCodec.version))] = MsgpackCodec()
+
+
+def get_codec(name: str):
+    if name == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("CACHE_CODEC=msgpack requires the msgpack package")
+        return MsgpackCodec()
+    if name == "orjson" or (name == "json" and orjson):
+        if orjson is None:
+            raise RuntimeError("CACHE_CODEC=orjson requires the orjson package")
+        return OrjsonCodec()
+    if name == "json":
+        return JsonCodec()
+    raise ValueError(f"Unknown CACHE_CODEC: {name}")
+
+
+codec = get_codec(CACHE_CODEC)
+
+
+def encode_cache_value(value: Any) -> str:
+    """Serialize a value for Redis, prefixed with its codec and version"""
+    return f"{codec.name}:{codec.version}:{codec.encode(value)}"
+
+
+def cache_value_as_json(data: str) -> str:
+    """Get a cached value as JSON text, passing JSON payloads through as is"""
+    name, _, rest = data.partition(":")
+    version, _, payload = rest.partition(":")
+    if (name, version) == (JsonCodec.name, str(JsonCodec.version)):
+        return payload
+    return json.dumps(decode_cache_value(data), default=serialize_dates)
+
+
+def decode_cache_value(data: str) -> Any:
+    """Deserialize a value written by any known codec"""
+    name, _, rest = data.partition(":")
+    version, _, payload = rest.partition(":")
+    decoder = DECODERS.get((name, version))
+    if decoder is None:
+        # Untagged values written before codecs existed
+        return json.loads(data, object_hook=datetime_parser)
+    return decoder.decode(payload)
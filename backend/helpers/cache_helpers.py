@@ -1,41 +1,312 @@
-import json
-from typing import List, Dict, Optional
-from datetime import datetime
+import asyncio
+import base64
+import gzip
+import time
+import uuid
+from functools import wraps
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Dict, Optional, Set
 
+from fastapi import Request, Response
+from pydantic import BaseModel
+from redis.exceptions import RedisError
 
-def serialize_dates(v):
-    return v.isoformat() if isinstance(v, datetime) else v
+from config import (
+    CACHE_FILL_LEASE_TTL,
+    CACHE_FILL_POLL_INTERVAL,
+    CACHE_FILL_WAIT,
+    CACHE_RESPONSE_GZIP,
+    CACHE_RESPONSE_GZIP_MIN_BYTES,
+    CACHE_DEFAULT_POLICY,
+    CACHE_NEGATIVE_TTL,
+    CACHE_POLICIES,
+    CACHE_SCAN_COUNT,
+    CACHE_STREAM_MIN_ITEMS,
+    CACHE_VERSION_TTL,
+)
+from constants.cache_keys import (
+    cache_build_key,
+    cache_fill_lease_key,
+    cache_key_family,
+    cache_freshness_key,
+    cache_version_key,
+    group_generation_key,
+    response_cache_key,
+)
+from helpers.circuit_breaker import log_redis_error
+from helpers.cache_codecs import (
+    cache_value_as_json,
+    decode_cache_value,
+    encode_cache_value,
+)
+from helpers.local_cache import (
+    MISSING,
+    local_cache,
+    publish_invalidation,
+    track_l1_lookup,
+)
+from helpers.stream_helpers import batched, list_response, wants_ndjson
+from middlewares.logger import get_logger
+from middlewares.monitoring import track_cache_stale_serve, track_cache_tier_operation
 
+logger = get_logger()
 
-def datetime_parser(dct):
-    for k, v in dct.items():
-        if isinstance(v, str) and v.endswith("+00:00"):
+# Cached in place of an object that does not exist
+NOT_FOUND_VALUE = "not_found"
+
+# Returned for a cached NOT_FOUND_VALUE, since None means a cache miss
+NOT_FOUND = object()
+
+# Only field of a cached list that is empty, since Redis drops empty hashes
+EMPTY_LIST_FIELD = "_empty"
+
+
+# Every fill carries the version of its key (see cache_version_key) read
+# before the data it caches. The scripts below refuse a fill once the version
+# has moved on, since the key was invalidated or patched after the read began
+# and the fill could overwrite newer data or recreate a deleted key
+
+# Add a field to a cached hash, unless the hash already holds max_entries
+# fields, then apply the family TTL and freshness marker (0 skips either)
+BOUNDED_HSET_SCRIPT = """
+if (redis.call('GET', KEYS[3]) or '0') ~= ARGV[6] then
+    return 0
+end
+local max_entries = tonumber(ARGV[3])
+if max_entries > 0 and redis.call('HLEN', KEYS[1]) >= max_entries
+        and redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+if ARGV[4] ~= '0' then
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+if ARGV[5] ~= '0' then
+    redis.call('SET', KEYS[2], 1, 'EX', ARGV[5])
+end
+return 1
+"""
+
+# Set a single object with the family TTL and freshness marker (0 skips either)
+CAS_SET_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+if ARGV[3] ~= '0' then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+else
+    redis.call('SET', KEYS[1], ARGV[2])
+end
+if ARGV[4] ~= '0' then
+    redis.call('SET', KEYS[3], 1, 'EX', ARGV[4])
+end
+return 1
+"""
+
+# Replace a cached list and drop its response body. Without fields the list
+# is only deleted, e.g. when it is too large to cache
+CAS_REPLACE_HASH_SCRIPT = """
+if (redis.call('GET', KEYS[3]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1], KEYS[2])
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+if #ARGV > 2 and ARGV[2] ~= '0' then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+# Add fields to a hash, e.g. a response body, checked against the version of
+# the key it was rendered from
+CAS_HSET_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+if ARGV[2] ~= '0' then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+# Rename a fully streamed list over its cache key
+CAS_RENAME_SCRIPT = """
+if (redis.call('GET', KEYS[4]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[3])
+redis.call('RENAME', KEYS[1], KEYS[2])
+if ARGV[2] ~= '0' then
+    redis.call('EXPIRE', KEYS[2], ARGV[2])
+else
+    redis.call('PERSIST', KEYS[2])
+end
+return 1
+"""
+
+
+# Invalidations that failed while Redis was unreachable, replayed once the
+# Redis circuit breaker closes again so stale entries do not outlive the
+# outage. Past the cap, the remaining entries are left to expire by TTL
+MAX_MISSED_INVALIDATIONS = 10000
+missed_invalidation_keys: Set[str] = set()
+missed_generation_bumps: Set[str] = set()
+
+
+def degrade_on_redis_error(default=None):
+    """Treat a Redis error as a cache miss, or a skipped cache write, so
+    routes keep serving from the DB while Redis is down"""
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
             try:
-                dct[k] = datetime.fromisoformat(v)
-            except:
-                pass
-    return dct
+                return await func(*args, **kwargs)
+            except RedisError as e:
+                log_redis_error(func.__name__, e)
+                return default
+
+        return wrapper
+
+    return decorator
+
+
+def remember_missed_invalidation(cache_keys=(), group_ids=()):
+    if (
+        len(missed_invalidation_keys) + len(missed_generation_bumps)
+        >= MAX_MISSED_INVALIDATIONS
+    ):
+        logger.error("Too many missed cache invalidations, dropping the rest")
+        return
+    missed_invalidation_keys.update(cache_keys)
+    missed_generation_bumps.update(group_ids)
+
+
+async def replay_missed_invalidations(redis_client):
+    """Apply the invalidations missed while Redis was unreachable"""
+    cache_keys = list(missed_invalidation_keys)
+    group_ids = list(missed_generation_bumps)
+    missed_invalidation_keys.clear()
+    missed_generation_bumps.clear()
+    if not cache_keys and not group_ids:
+        return
+
+    logger.info(
+        f"Replaying missed cache invalidations | Keys: {len(cache_keys)} | Groups: {len(group_ids)}"
+    )
+    # Both re-record anything that fails again
+    if cache_keys:
+        await delete_cache_keys_async(redis_client, cache_keys)
+    for group_id in group_ids:
+        await bump_group_generation_async(redis_client, group_id)
+
+
+def cache_policy_for(cache_key: str) -> Dict[str, int]:
+    """Get the TTL and size policy of a cache key's family"""
+    return CACHE_POLICIES.get(cache_key_family(cache_key), CACHE_DEFAULT_POLICY)
+
+
+def within_max_bytes(cache_key: str, policy: Dict[str, int], value: str) -> bool:
+    if policy["max_bytes"] and len(value) > policy["max_bytes"]:
+        logger.warning(
+            f"Value too large to cache | Key: {cache_key} | Size: {len(value)}"
+        )
+        return False
+    return True
+
 
+@degrade_on_redis_error()
+async def get_cache_version(redis_client, cache_key: str) -> Optional[int]:
+    """Get the version of a cache key, to read before the data a fill caches.
 
-async def cache_single_object_async(redis_client, cache_key: str, data: Dict):
-    """Cache a single object directly (not as part of a hash)"""
-    data_json = json.dumps(data, default=serialize_dates)
-    await redis_client.set(cache_key, data_json)
+    None if Redis is unreachable, and fills given None are skipped.
+    """
+    return int(await redis_client.get(cache_version_key(cache_key)) or 0)
 
 
+def bump_cache_versions(pipe, cache_keys: List[str]):
+    """Queue version bumps of invalidated keys on a transaction"""
+    for cache_key in cache_keys:
+        version_key = cache_version_key(cache_key)
+        pipe.incr(version_key)
+        pipe.expire(version_key, CACHE_VERSION_TTL)
+
+
+def decode_single_object(data: str):
+    if data == NOT_FOUND_VALUE:
+        return NOT_FOUND
+    return decode_cache_value(data)
+
+
+@degrade_on_redis_error()
+async def cache_single_object_async(
+    redis_client, cache_key: str, data: Optional[Dict], version: Optional[int]
+):
+    """Cache a single object directly (not as part of a hash).
+
+    None is cached as a short-lived not-found marker.
+    """
+    if version is None:
+        return
+
+    policy = cache_policy_for(cache_key)
+    if data is None:
+        data_json, ttl, soft_ttl = NOT_FOUND_VALUE, CACHE_NEGATIVE_TTL, 0
+    else:
+        data_json, ttl, soft_ttl = (
+            encode_cache_value(data),
+            policy["ttl"],
+            policy["soft_ttl"],
+        )
+        if not within_max_bytes(cache_key, policy, data_json):
+            return
+
+    stored = await redis_client.eval(
+        CAS_SET_SCRIPT,
+        3,
+        cache_key,
+        cache_version_key(cache_key),
+        cache_freshness_key(cache_key),
+        version,
+        data_json,
+        ttl,
+        soft_ttl,
+    )
+    if stored:
+        local_cache.set(cache_key, data_json)
+
+
+@degrade_on_redis_error()
 async def get_cached_single_object_async(
     redis_client, cache_key: str
 ) -> Optional[Dict]:
-    """Get a single cached object"""
-    data = await redis_client.get(cache_key)
+    """Get a single cached object, NOT_FOUND if it is known not to exist"""
+    data = local_cache.get(cache_key)
+    if data is MISSING:
+        track_l1_lookup(False)
+        data = await redis_client.get(cache_key)
+        track_cache_tier_operation("l2", bool(data))
+        if data:
+            local_cache.set(cache_key, data)
+    else:
+        track_l1_lookup(True)
+
     if data:
-        return json.loads(data, object_hook=datetime_parser)
+        return decode_single_object(data)
     return None
 
 
-def cache_single_object(background_tasks, redis_client, cache_key: str, data: Dict):
+def cache_single_object(
+    background_tasks, redis_client, cache_key: str, data: Dict, version: Optional[int]
+):
     """Cache a single object using background tasks"""
-    background_tasks.add_task(cache_single_object_async, redis_client, cache_key, data)
+    background_tasks.add_task(
+        cache_single_object_async, redis_client, cache_key, data, version
+    )
 
 
 async def get_cached_single_object(redis_client, cache_key: str) -> Optional[Dict]:
@@ -43,8 +314,19 @@ async def get_cached_single_object(redis_client, cache_key: str) -> Optional[Dic
     return await get_cached_single_object_async(redis_client, cache_key)
 
 
+@degrade_on_redis_error()
 async def get_cached_items_async(redis_client, cache_key: str):
-    return await redis_client.hgetall(cache_key)
+    data = local_cache.get(cache_key)
+    if data is not MISSING:
+        track_l1_lookup(True)
+        return data
+
+    track_l1_lookup(False)
+    data = await redis_client.hgetall(cache_key)
+    track_cache_tier_operation("l2", bool(data))
+    if data:
+        local_cache.set(cache_key, data)
+    return data
 
 
 async def cache_item_async(redis_client, cache_key: str, item_id: str, item_json: str):
@@ -60,31 +342,436 @@ async def delete_cache_key_async(redis_client, cache_key: str):
     await redis_client.delete(cache_key)
 
 
+def items_cache_mapping(items: List[Dict], id_field: str = "id") -> Dict[str, str]:
+    """Serialize a list of items into a hash mapping of id -> JSON"""
+    return {item[id_field]: encode_cache_value(item) for item in items}
+
+
+async def replace_cached_items_async(
+    redis_client, cache_key: str, mapping: Dict[str, str], version: Optional[int]
+):
+    """Atomically replace a hash with the given fields in one round trip.
+
+    Readers see either the old hash or the complete new one, never a
+    partially written list. An empty list is cached as a short-lived marker.
+    """
+    if version is None:
+        return
+
+    policy = cache_policy_for(cache_key)
+    ttl = policy["ttl"]
+    if policy["max_entries"] and len(mapping) > policy["max_entries"]:
+        logger.warning(
+            f"List too large to cache | Key: {cache_key} | Count: {len(mapping)}"
+        )
+        mapping = None
+    elif not mapping:
+        mapping = {EMPTY_LIST_FIELD: 1}
+        ttl = CACHE_NEGATIVE_TTL
+
+    args = [version, ttl]
+    for field, value in (mapping or {}).items():
+        args.extend([field, value])
+
+    cache_keys = with_response_keys([cache_key])
+    local_cache.delete(*cache_keys)
+    try:
+        replaced = await redis_client.eval(
+            CAS_REPLACE_HASH_SCRIPT,
+            3,
+            cache_key,
+            response_cache_key(cache_key),
+            cache_version_key(cache_key),
+            *args,
+        )
+        if replaced:
+            await publish_invalidation(redis_client, cache_keys)
+    except RedisError as e:
+        log_redis_error("replace_cached_items_async", e)
+        remember_missed_invalidation(cache_keys=cache_keys)
+
+
+def with_response_keys(cache_keys: List[str]) -> List[str]:
+    """Add the cached response body keys rendered from the given keys"""
+    return cache_keys + [response_cache_key(cache_key) for cache_key in cache_keys]
+
+
+async def delete_cache_keys_async(redis_client, cache_keys: List[str]):
+    """Delete cache keys and drop them from every worker's local cache.
+
+    Bumping their versions in the same transaction refuses fills that read
+    the keys before the delete.
+    """
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            bump_cache_versions(pipe, cache_keys)
+            pipe.delete(*cache_keys)
+            await pipe.execute()
+        await publish_invalidation(redis_client, cache_keys)
+    except RedisError as e:
+        log_redis_error("delete_cache_keys_async", e)
+        remember_missed_invalidation(cache_keys=cache_keys)
+
+
+# Patch a cached list only if it exists. Creating it would leave a hash with
+# a single row that reads as the whole list. Adding a row to a cached empty
+# list drops its EMPTY_LIST_FIELD marker (ARGV[4]). The version is bumped
+# either way
+PATCH_ITEM_SCRIPT = """
+redis.call('INCR', KEYS[3])
+redis.call('EXPIRE', KEYS[3], ARGV[3])
+redis.call('DEL', KEYS[2])
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HDEL', KEYS[1], ARGV[4])
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+return 1
+"""
+
+
+async def update_cache_item_async(
+    redis_client, cache_key: str, item_id: str, item_json: str
+):
+    """Update one hash field and drop the stale hash from local caches"""
+    try:
+        await redis_client.eval(
+            PATCH_ITEM_SCRIPT,
+            3,
+            cache_key,
+            response_cache_key(cache_key),
+            cache_version_key(cache_key),
+            item_id,
+            item_json,
+            CACHE_VERSION_TTL,
+            EMPTY_LIST_FIELD,
+        )
+        await publish_invalidation(redis_client, with_response_keys([cache_key]))
+    except RedisError as e:
+        log_redis_error("update_cache_item_async", e)
+        remember_missed_invalidation(cache_keys=with_response_keys([cache_key]))
+
+
+async def remove_cache_item_async(redis_client, cache_key: str, item_id: str):
+    """Remove one hash field and drop the stale hash from local caches"""
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            bump_cache_versions(pipe, [cache_key])
+            pipe.hdel(cache_key, item_id)
+            pipe.delete(response_cache_key(cache_key))
+            await pipe.execute()
+        await publish_invalidation(redis_client, with_response_keys([cache_key]))
+    except RedisError as e:
+        log_redis_error("remove_cache_item_async", e)
+        remember_missed_invalidation(cache_keys=with_response_keys([cache_key]))
+
+
 # Generic cache functions
 async def get_cached_items(redis_client, cache_key: str) -> Optional[List[Dict]]:
-    """Generic function to get items from cache"""
+    """Generic function to get items from cache, [] for a cached empty list"""
     data = await get_cached_items_async(redis_client, cache_key)
     if data:
-        return [json.loads(v, object_hook=datetime_parser) for v in data.values()]
+        return [decode_cache_value(v) for k, v in data.items() if k != EMPTY_LIST_FIELD]
     return None
 
 
+async def scan_cached_items(redis_client, cache_key: str) -> AsyncIterator[List[str]]:
+    """Read a cached list in HSCAN batches of JSON encoded items.
+
+    Unlike HGETALL this never blocks Redis on a large hash. HSCAN may return
+    a field twice, so fields already sent are skipped.
+    """
+    seen = set()
+    cursor = 0
+    while True:
+        cursor, data = await redis_client.hscan(
+            cache_key, cursor, count=CACHE_SCAN_COUNT
+        )
+        batch = []
+        for field, value in data.items():
+            if field != EMPTY_LIST_FIELD and field not in seen:
+                seen.add(field)
+                batch.append(cache_value_as_json(value))
+        yield batch
+        if cursor == 0:
+            break
+
+
+@degrade_on_redis_error()
+async def get_cached_items_stream(
+    redis_client, cache_key: str, list_field: str, request: Request
+):
+    """Stream a large cached list to the client as it is scanned.
+
+    Returns None for lists small enough to read whole, or not cached.
+    """
+    if local_cache.get(cache_key) is not MISSING:
+        return None
+    if await redis_client.hlen(cache_key) < CACHE_STREAM_MIN_ITEMS:
+        return None
+
+    # Read the first items now, so a key that expired since HLEN is a miss
+    batches = scan_cached_items(redis_client, cache_key)
+    first_batch = []
+    async for first_batch in batches:
+        if first_batch:
+            break
+    if not first_batch:
+        return None
+
+    async def all_batches():
+        yield first_batch
+        async for batch in batches:
+            yield batch
+
+    return list_response(request, list_field, all_batches())
+
+
+async def stream_and_cache_items(
+    redis_client,
+    cache_key: str,
+    rows: AsyncIterator[Dict],
+    version: Optional[int],
+    id_field: str = "id",
+) -> AsyncIterator[List[str]]:
+    """Yield DB rows in batches of JSON items while caching them as a list.
+
+    Rows are written to a temporary hash as they stream and renamed over the
+    cache key once complete, so readers never see a partial list and the
+    rows are never held whole in memory. The temporary hash expires if the
+    stream stalls, e.g. when the client disconnects. A Redis error stops the
+    caching, never the stream.
+    """
+    policy = cache_policy_for(cache_key)
+    build_key = cache_build_key(cache_key, uuid.uuid4().hex)
+    count = 0
+    caching = version is not None
+
+    try:
+        async for rows_batch in batched(rows, CACHE_SCAN_COUNT):
+            mapping = items_cache_mapping(rows_batch, id_field)
+            count += len(mapping)
+            if caching and (
+                not policy["max_entries"] or count <= policy["max_entries"]
+            ):
+                try:
+                    async with redis_client.pipeline(transaction=False) as pipe:
+                        pipe.hset(build_key, mapping=mapping)
+                        pipe.pexpire(build_key, int(CACHE_FILL_LEASE_TTL * 1000))
+                        await pipe.execute()
+                except RedisError as e:
+                    log_redis_error("stream_and_cache_items", e)
+                    caching = False
+            yield [cache_value_as_json(v) for v in mapping.values()]
+
+        if caching:
+            await install_streamed_items(
+                redis_client, cache_key, build_key, count, policy, version
+            )
+    finally:
+        await release_build_key(redis_client, build_key)
+
+
+@degrade_on_redis_error()
+async def install_streamed_items(
+    redis_client,
+    cache_key: str,
+    build_key: str,
+    count: int,
+    policy: Dict[str, int],
+    version: int,
+):
+    cache_keys = with_response_keys([cache_key])
+    if count == 0:
+        await replace_cached_items_async(redis_client, cache_key, {}, version)
+        return
+    if policy["max_entries"] and count > policy["max_entries"]:
+        logger.warning(f"List too large to cache | Key: {cache_key} | Count: {count}")
+        local_cache.delete(*cache_keys)
+        await delete_cache_keys_async(redis_client, cache_keys)
+        return
+
+    installed = await redis_client.eval(
+        CAS_RENAME_SCRIPT,
+        4,
+        build_key,
+        cache_key,
+        response_cache_key(cache_key),
+        cache_version_key(cache_key),
+        version,
+        policy["ttl"],
+    )
+    if not installed:
+        return
+    local_cache.delete(*cache_keys)
+    await publish_invalidation(redis_client, cache_keys)
+
+
+@degrade_on_redis_error()
+async def release_build_key(redis_client, build_key: str):
+    await redis_client.delete(build_key)
+
+
 def cache_items(
     background_tasks,
     redis_client,
     cache_key: str,
     items: List[Dict],
+    version: Optional[int],
     id_field: str = "id",
 ):
     """Generic function to cache list of items"""
+    mapping = items_cache_mapping(items, id_field)
+    background_tasks.add_task(
+        replace_cached_items_async, redis_client, cache_key, mapping, version
+    )
 
-    for item in items:
 
-        item_json = json.dumps(item, default=serialize_dates)
+@degrade_on_redis_error()
+async def get_cached_page(
+    redis_client, cache_key: str, page_field: str
+) -> Optional[Dict]:
+    """Get one cached cursor page from a list's page hash"""
+    data = local_cache.get_field(cache_key, page_field)
+    if data is MISSING:
+        track_l1_lookup(False)
+        data = await redis_client.hget(cache_key, page_field)
+        track_cache_tier_operation("l2", bool(data))
+        if data:
+            local_cache.set_field(cache_key, page_field, data)
+    else:
+        track_l1_lookup(True)
 
-        background_tasks.add_task(
-            cache_item_async, redis_client, cache_key, item[id_field], item_json
-        )
+    if data:
+        return decode_cache_value(data)
+    return None
+
+
+@degrade_on_redis_error()
+async def cache_page_async(
+    redis_client,
+    cache_key: str,
+    page_field: str,
+    page_json: str,
+    version: Optional[int],
+):
+    policy = cache_policy_for(cache_key)
+    if version is None:
+        return
+    if not within_max_bytes(cache_key, policy, page_json):
+        return
+
+    await redis_client.eval(
+        BOUNDED_HSET_SCRIPT,
+        3,
+        cache_key,
+        cache_freshness_key(cache_key, page_field),
+        cache_version_key(cache_key),
+        page_field,
+        page_json,
+        policy["max_entries"],
+        policy["ttl"],
+        policy["soft_ttl"],
+        version,
+    )
+
+
+def cache_page(
+    background_tasks,
+    redis_client,
+    cache_key: str,
+    page_field: str,
+    page: Dict,
+    version: Optional[int],
+):
+    """Cache one cursor page in a list's page hash"""
+    page_json = encode_cache_value(page)
+    background_tasks.add_task(
+        cache_page_async, redis_client, cache_key, page_field, page_json, version
+    )
+
+
+@degrade_on_redis_error()
+async def get_cached_response(
+    redis_client, cache_key: str, request: Request
+) -> Optional[Response]:
+    """Get the cached response body rendered from a cache key.
+
+    The body is returned as is, gzipped if the client accepts it, without
+    decoding the cached data or validating it against the response model.
+    Bodies are JSON, so NDJSON requests always miss.
+    """
+    if wants_ndjson(request):
+        return None
+
+    gzip_accepted = "gzip" in request.headers.get("accept-encoding", "")
+    field = "gzip" if CACHE_RESPONSE_GZIP and gzip_accepted else "body"
+    response_key = response_cache_key(cache_key)
+
+    body = local_cache.get_field(response_key, field)
+    if body is MISSING:
+        track_l1_lookup(False)
+        if field == "gzip":
+            data, plain_data = await redis_client.hmget(response_key, "gzip", "body")
+            # Small bodies are stored uncompressed only
+            if not data and plain_data:
+                field, data = "body", plain_data
+        else:
+            data = await redis_client.hget(response_key, "body")
+        track_cache_tier_operation("l2", bool(data))
+        if not data:
+            return None
+
+        body = base64.b64decode(data) if field == "gzip" else data.encode()
+        local_cache.set_field(response_key, field, body)
+    else:
+        track_l1_lookup(True)
+
+    # Both encodings are served for the same URL, so shared caches must key on it
+    headers = {"Vary": "Accept-Encoding"} if CACHE_RESPONSE_GZIP else {}
+    if field == "gzip":
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@degrade_on_redis_error()
+async def cache_response_async(
+    redis_client, cache_key: str, body: str, version: Optional[int]
+):
+    policy = cache_policy_for(cache_key)
+    if version is None or not within_max_bytes(cache_key, policy, body):
+        return
+
+    args = [version, policy["ttl"], "body", body]
+    if CACHE_RESPONSE_GZIP and len(body) >= CACHE_RESPONSE_GZIP_MIN_BYTES:
+        args.extend(["gzip", base64.b64encode(gzip.compress(body.encode())).decode()])
+    # Checked against the version of the key the body was rendered from
+    await redis_client.eval(
+        CAS_HSET_SCRIPT,
+        2,
+        response_cache_key(cache_key),
+        cache_version_key(cache_key),
+        *args,
+    )
+
+
+def cache_response(
+    background_tasks,
+    redis_client,
+    cache_key: str,
+    response: BaseModel,
+    version: Optional[int],
+):
+    """Cache the final JSON body of a response rendered from a cache key.
+
+    version is that of cache_key, read before the data the response shows.
+    """
+    background_tasks.add_task(
+        cache_response_async,
+        redis_client,
+        cache_key,
+        response.model_dump_json(),
+        version,
+    )
 
 
 def update_item_cache(
@@ -96,9 +783,10 @@ def update_item_cache(
 ):
     """Generic function to update single item in cache"""
     item_id = item_data[id_field]
-    item_json = json.dumps(item_data, default=serialize_dates)
+    item_json = encode_cache_value(item_data)
+    local_cache.delete(*with_response_keys([cache_key]))
     background_tasks.add_task(
-        cache_item_async, redis_client, cache_key, item_id, item_json
+        update_cache_item_async, redis_client, cache_key, item_id, item_json
     )
 
 
@@ -106,15 +794,292 @@ def remove_item_from_cache(
     background_tasks, redis_client, cache_key: str, item_id: str
 ):
     """Generic function to remove item from cache"""
-    background_tasks.add_task(delete_cache_item_async, redis_client, cache_key, item_id)
+    local_cache.delete(*with_response_keys([cache_key]))
+    background_tasks.add_task(remove_cache_item_async, redis_client, cache_key, item_id)
 
 
 def invalidate_cache(background_tasks, redis_client, cache_key: str):
     """Generic function to invalidate/delete entire cache key"""
-    background_tasks.add_task(delete_cache_key_async, redis_client, cache_key)
+    invalidate_multiple_caches(background_tasks, redis_client, [cache_key])
+
+
+async def get_group_generation(
+    redis_client, group_id: str, strict: bool = False
+) -> int:
+    """Get the cache generation embedded in a group's cache keys.
+
+    While Redis is unreachable this is 0, which is fine for reads since they
+    miss anyway. Invalidations must know the real generation, so with strict
+    the Redis error is raised instead.
+    """
+    generation_key = group_generation_key(group_id)
+    generation = local_cache.get(generation_key)
+    if generation is MISSING:
+        try:
+            generation = int(await redis_client.get(generation_key) or 0)
+        except RedisError as e:
+            if strict:
+                raise
+            log_redis_error("get_group_generation", e)
+            return 0
+        local_cache.set(generation_key, generation)
+    return generation
+
+
+async def bump_group_generation_async(redis_client, group_id: str):
+    generation_key = group_generation_key(group_id)
+    try:
+        await redis_client.incr(generation_key)
+        await publish_invalidation(redis_client, [generation_key])
+    except RedisError as e:
+        log_redis_error("bump_group_generation_async", e)
+        remember_missed_invalidation(group_ids=[group_id])
+
+
+def invalidate_group_caches(background_tasks, redis_client, group_id: str):
+    """Orphan every cache entry of a group with a single INCR"""
+    local_cache.delete(group_generation_key(group_id))
+    background_tasks.add_task(bump_group_generation_async, redis_client, group_id)
 
 
 def invalidate_multiple_caches(background_tasks, redis_client, cache_keys: List[str]):
     """Generic function to invalidate multiple cache keys"""
-    for cache_key in cache_keys:
-        background_tasks.add_task(delete_cache_key_async, redis_client, cache_key)
+    cache_keys = with_response_keys(cache_keys)
+    # Drop local copies right away so this worker never serves them again
+    local_cache.delete(*cache_keys)
+    background_tasks.add_task(delete_cache_keys_async, redis_client, cache_keys)
+
+
+# Release a fill lease only if this worker still holds it
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@degrade_on_redis_error()
+async def release_lease(redis_client, lease_key: str, token: str):
+    await redis_client.eval(RELEASE_LEASE_SCRIPT, 1, lease_key, token)
+
+
+# Fills running in this worker, keyed by cache key
+inflight_fills: Dict[str, asyncio.Task] = {}
+
+
+async def single_flight(cache_key: str, compute: Callable[[], Awaitable[Any]]):
+    """Share one in-flight computation between concurrent callers of a key"""
+    task = inflight_fills.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(compute())
+        inflight_fills[cache_key] = task
+        task.add_done_callback(lambda _: inflight_fills.pop(cache_key, None))
+    # A cancelled request must not cancel the fill other requests wait on
+    return await asyncio.shield(task)
+
+
+async def fill_with_lease(
+    redis_client,
+    cache_key: str,
+    read_cached: Callable[[], Awaitable[Any]],
+    fill: Callable[[], Awaitable[Any]],
+):
+    """Let one worker fill a key while the others wait for its result"""
+    lease_key = cache_fill_lease_key(cache_key)
+    token = uuid.uuid4().hex
+
+    try:
+        leased = await redis_client.set(
+            lease_key, token, nx=True, px=int(CACHE_FILL_LEASE_TTL * 1000)
+        )
+    except RedisError as e:
+        # Without Redis there is nothing to coordinate on, or to fill
+        log_redis_error("fill_with_lease", e)
+        return await fill()
+
+    if leased:
+        try:
+            return await fill()
+        finally:
+            await release_lease(redis_client, lease_key, token)
+
+    deadline = time.monotonic() + CACHE_FILL_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(CACHE_FILL_POLL_INTERVAL)
+        cached = await read_cached()
+        if cached is not None:
+            return cached
+
+    # The lease holder is slow or gone, fill it ourselves rather than fail
+    return await fill()
+
+
+async def fill_cache_once(
+    redis_client,
+    cache_key: str,
+    read_cached: Callable[[], Awaitable[Any]],
+    fill: Callable[[], Awaitable[Any]],
+):
+    """Fill a missing cache key with one computation across all workers.
+
+    fill must store the value in the cache before returning it, so callers
+    waiting on the lease can read it back with read_cached.
+    """
+    return await single_flight(
+        cache_key, lambda: fill_with_lease(redis_client, cache_key, read_cached, fill)
+    )
+
+
+async def fill_single_object_once(
+    redis_client,
+    cache_key: str,
+    compute: Callable[[], Awaitable[Optional[Dict]]],
+):
+    """Compute and cache a missing single object with stampede protection.
+
+    Returns NOT_FOUND if compute finds nothing.
+    """
+
+    async def fill():
+        version = await get_cache_version(redis_client, cache_key)
+        data = await compute()
+        await cache_single_object_async(redis_client, cache_key, data, version)
+        return NOT_FOUND if data is None else data
+
+    return await fill_cache_once(
+        redis_client,
+        cache_key,
+        lambda: get_cached_single_object(redis_client, cache_key),
+        fill,
+    )
+
+
+async def refresh_with_lease(
+    redis_client, cache_key: str, fill: Callable[[], Awaitable[Any]]
+):
+    """Refresh a stale key, unless another worker is already refreshing it"""
+    lease_key = cache_fill_lease_key(cache_key)
+    token = uuid.uuid4().hex
+
+    try:
+        leased = await redis_client.set(
+            lease_key, token, nx=True, px=int(CACHE_FILL_LEASE_TTL * 1000)
+        )
+    except RedisError as e:
+        log_redis_error("refresh_with_lease", e)
+        return
+    if not leased:
+        return
+
+    try:
+        await fill()
+    except Exception as e:
+        logger.warning(f"Stale cache refresh failed | Key: {cache_key} | Error: {e}")
+    finally:
+        await release_lease(redis_client, lease_key, token)
+
+
+def schedule_refresh(background_tasks, redis_client, cache_key: str, family: str, fill):
+    track_cache_stale_serve(family)
+    # Refreshes return nothing, so a miss must never join one as if it were
+    # a fill of the same key
+    background_tasks.add_task(
+        single_flight,
+        f"{cache_key}:refresh",
+        lambda: refresh_with_lease(redis_client, cache_key, fill),
+    )
+
+
+@degrade_on_redis_error()
+async def get_cached_single_object_swr(
+    background_tasks,
+    redis_client,
+    cache_key: str,
+    compute: Callable[[], Awaitable[Dict]],
+) -> Optional[Dict]:
+    """Get a cached object, refreshing it in the background once stale.
+
+    Entries past the family's soft TTL are still returned, so only a missing
+    key makes the caller wait for the database.
+    """
+    if not cache_policy_for(cache_key)["soft_ttl"]:
+        return await get_cached_single_object(redis_client, cache_key)
+
+    data = local_cache.get(cache_key)
+    if data is not MISSING:
+        track_l1_lookup(True)
+        return decode_single_object(data)
+
+    track_l1_lookup(False)
+    data, fresh = await redis_client.mget(cache_key, cache_freshness_key(cache_key))
+    track_cache_tier_operation("l2", bool(data))
+    if not data:
+        return None
+
+    # Not-found markers just expire, there is nothing to refresh
+    if fresh or data == NOT_FOUND_VALUE:
+        local_cache.set(cache_key, data)
+    else:
+
+        async def fill():
+            version = await get_cache_version(redis_client, cache_key)
+            fresh_data = await compute()
+            await cache_single_object_async(
+                redis_client, cache_key, fresh_data, version
+            )
+
+        schedule_refresh(
+            background_tasks, redis_client, cache_key, cache_key_family(cache_key), fill
+        )
+
+    return decode_single_object(data)
+
+
+@degrade_on_redis_error()
+async def get_cached_page_swr(
+    background_tasks,
+    redis_client,
+    cache_key: str,
+    page_field: str,
+    compute: Callable[[], Awaitable[Dict]],
+) -> Optional[Dict]:
+    """Get a cached cursor page, refreshing it in the background once stale"""
+    if not cache_policy_for(cache_key)["soft_ttl"]:
+        return await get_cached_page(redis_client, cache_key, page_field)
+
+    data = local_cache.get_field(cache_key, page_field)
+    if data is not MISSING:
+        track_l1_lookup(True)
+        return decode_cache_value(data)
+
+    track_l1_lookup(False)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hget(cache_key, page_field)
+        pipe.exists(cache_freshness_key(cache_key, page_field))
+        data, fresh = await pipe.execute()
+    track_cache_tier_operation("l2", bool(data))
+    if not data:
+        return None
+
+    if fresh:
+        local_cache.set_field(cache_key, page_field, data)
+    else:
+
+        async def fill():
+            version = await get_cache_version(redis_client, cache_key)
+            page = await compute()
+            page_json = encode_cache_value(page)
+            await cache_page_async(
+                redis_client, cache_key, page_field, page_json, version
+            )
+
+        schedule_refresh(
+            background_tasks,
+            redis_client,
+            f"{cache_key}:{page_field}",
+            cache_key_family(cache_key),
+            fill,
+        )
+
+    return decode_cache_value(data)
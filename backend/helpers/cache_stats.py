@@ -0,0 +1,73 @@
+import asyncio
+from collections import defaultdict
+
+from config import CACHE_STATS_INTERVAL
+from constants.cache_keys import cache_key_family
+from middlewares.logger import get_logger
+from middlewares.monitoring import track_cache_usage
+
+logger = get_logger()
+
+# Generation counters have no TTL, so only keys with a TTL may be evicted
+RECOMMENDED_EVICTION_POLICIES = ("volatile-lru", "volatile-lfu", "volatile-ttl")
+
+SCAN_COUNT = 500
+
+
+async def check_eviction_policy(redis_client):
+    """Warn when Redis could evict keys the cache relies on"""
+    try:
+        config = await redis_client.config_get("maxmemory-policy")
+    except Exception as e:
+        # Managed Redis often disables CONFIG
+        logger.info(f"Could not read Redis eviction policy | Error: {str(e)}")
+        return None
+
+    policy = config.get("maxmemory-policy")
+    if policy not in RECOMMENDED_EVICTION_POLICIES:
+        logger.warning(
+            f"Redis maxmemory-policy is {policy} | Recommended: volatile-lru, "
+            "so generation counters are never evicted"
+        )
+    return policy
+
+
+async def collect_cache_stats(redis_client):
+    """Count keys and memory per cache key family with SCAN and MEMORY USAGE"""
+    keys = defaultdict(int)
+    used_bytes = defaultdict(int)
+
+    cursor = 0
+    while True:
+        cursor, batch = await redis_client.scan(cursor, count=SCAN_COUNT)
+        if batch:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for key in batch:
+                    pipe.memory_usage(key)
+                sizes = await pipe.execute(raise_on_error=False)
+            for key, size in zip(batch, sizes):
+                family = cache_key_family(key)
+                keys[family] += 1
+                if isinstance(size, int):
+                    used_bytes[family] += size
+        if cursor == 0:
+            break
+
+    track_cache_usage(keys, used_bytes)
+    return keys, used_bytes
+
+
+async def report_cache_stats(redis_client):
+    """Refresh the cache size metrics every CACHE_STATS_INTERVAL seconds"""
+    await check_eviction_policy(redis_client)
+    while True:
+        try:
+            keys, used_bytes = await collect_cache_stats(redis_client)
+            logger.info(
+                f"Cache stats | Keys: {sum(keys.values())} | Bytes: {sum(used_bytes.values())}"
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error collecting cache stats: {str(e)}")
+        await asyncio.sleep(CACHE_STATS_INTERVAL)
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+
+from redis.asyncio.client import Pipeline, Redis
+from redis.exceptions import ConnectionError, TimeoutError
+
+from middlewares.logger import get_logger
+from middlewares.monitoring import track_circuit_breaker_state
+
+logger = get_logger()
+
+CLOSED = 0
+HALF_OPEN = 1
+OPEN = 2
+
+STATE_NAMES = {CLOSED: "closed", HALF_OPEN: "half-open", OPEN: "open"}
+
+# Errors that mean the server is unreachable or slow, as opposed to errors
+# in a command (e.g. WRONGTYPE), which must not open the breaker
+FAILURE_ERRORS = (ConnectionError, TimeoutError, asyncio.TimeoutError, OSError)
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling a dependency while its breaker is open"""
+
+
+class CircuitBreaker:
+    """Stop calling a failing dependency, then probe it until it recovers.
+
+    Closed: calls go through and consecutive failures are counted. Open:
+    calls fail fast with CircuitOpenError. After reset_timeout one call is
+    let through (half-open); its success closes the breaker, its failure
+    opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.state = CLOSED
+        self.recovery_callbacks: List[Callable[[], Awaitable[None]]] = []
+        track_circuit_breaker_state(name, CLOSED)
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def on_recovery(self, callback: Callable[[], Awaitable[None]]):
+        """Run callback each time the breaker closes after being open"""
+        self.recovery_callbacks.append(callback)
+
+    def set_state(self, state: int):
+        if state == self.state:
+            return
+        logger.warning(
+            f"Circuit breaker {self.name} {STATE_NAMES[self.state]} -> {STATE_NAMES[state]}"
+        )
+        self.state = state
+        track_circuit_breaker_state(self.name, state)
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if (
+            self.state == OPEN
+            and time.monotonic() - self.opened_at >= self.reset_timeout
+        ):
+            self.set_state(HALF_OPEN)
+        # Half-open lets a single probe through at a time
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.probing = False
+        if self.state != CLOSED:
+            self.set_state(CLOSED)
+            for callback in self.recovery_callbacks:
+                asyncio.ensure_future(callback())
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.set_state(OPEN)
+
+    async def call(self, func: Callable[..., Awaitable], *args, **kwargs):
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit breaker {self.name} is open")
+        try:
+            result = await func(*args, **kwargs)
+        except FAILURE_ERRORS:
+            self.record_failure()
+            raise
+        except BaseException:
+            # A command error still proves the server answered, but a
+            # cancelled probe proves nothing, so only free the probe slot
+            self.probing = False
+            raise
+        self.record_success()
+        return result
+
+
+def log_redis_error(operation: str, error: Exception):
+    # The breaker logs once when it opens, so fast failures stay quiet
+    if isinstance(error, CircuitOpenError):
+        logger.debug(f"Redis unavailable, skipped {operation}")
+    else:
+        logger.warning(f"Redis error in {operation}, skipped | Error: {error}")
+
+
+class BreakerPipeline(Pipeline):
+    """Pipeline whose execute goes through the circuit breaker"""
+
+    def __init__(self, *args, breaker: CircuitBreaker, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+
+    async def execute(self, raise_on_error: bool = True):
+        return await self.breaker.call(super().execute, raise_on_error)
+
+
+class BreakerRedis(Redis):
+    """Redis client that sends every command through a circuit breaker.
+
+    Pub/sub connections are long lived and reconnect on their own, so they
+    bypass the breaker.
+    """
+
+    def __init__(self, *args, breaker: CircuitBreaker, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+
+    async def execute_command(self, *args, **options):
+        return await self.breaker.call(super().execute_command, *args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> BreakerPipeline:
+        return BreakerPipeline(
+            self.connection_pool,
+            self.response_callbacks,
+            transaction,
+            shard_hint,
+            breaker=self.breaker,
+        )
@@ -1,31 +1,58 @@
 from models.debtor import ExpenseDebtorIn, ExpenseDebtorUpdate
+from typing import AsyncIterator, Dict, Optional
+from helpers.fetch_helpers import fetch_all_rows, fetch_keyset_page, stream_rows
 
 
 async def get_all_debtors_from_db(supabase):
     """Get all debtors from database"""
-    return supabase.table("expenses_debtors").select("*").execute().data
+    return await fetch_all_rows(lambda: supabase.table("expenses_debtors").select("*"))
 
 
-async def get_group_debtors_from_db(supabase, group_id: str):
-    """Get debtors for specific group from database"""
-    return (
-        supabase.from_("expenses_debtors")
+async def get_debtors_page_from_db(
+    supabase, limit: int, after: Optional[str] = None, columns: str = "*"
+):
+    """Get one cursor page of debtors from database"""
+    return await fetch_keyset_page(
+        lambda: supabase.table("expenses_debtors").select(columns), limit, after
+    )
+
+
+def stream_group_debtors_from_db(supabase, group_id: str) -> AsyncIterator[Dict]:
+    """Stream debtors for specific group from database, page by page"""
+    return stream_rows(
+        lambda: supabase.from_("expenses_debtors")
         .select("*, expenses(group_id)")
         .eq("expenses.group_id", group_id)
-        .execute()
-        .data
     )
 
 
+async def get_group_debtors_from_db(supabase, group_id: str):
+    """Get debtors for specific group from database"""
+    return [row async for row in stream_group_debtors_from_db(supabase, group_id)]
+
+
 async def create_debtor_record(supabase, debtor: ExpenseDebtorIn):
     """Create debtor record in database"""
-    response = supabase.table("expenses_debtors").insert(debtor.model_dump()).execute()
+    response = (
+        await supabase.table("expenses_debtors").insert(debtor.model_dump()).execute()
+    )
+    return response.data[0] if response.data else None
+
+
+async def get_debtor_by_id_from_db(supabase, debtor_id: str):
+    """Get single debtor by ID from database"""
+    response = (
+        await supabase.table("expenses_debtors")
+        .select("*")
+        .eq("id", debtor_id)
+        .execute()
+    )
     return response.data[0] if response.data else None
 
 
 async def get_debtor_expense_id(supabase, debtor_id: str):
     """Get expense_id for specific debtor"""
-    response = (
+    response = await (
         supabase.table("expenses_debtors")
         .select("expense_id")
         .eq("id", debtor_id)
@@ -38,7 +65,7 @@ async def get_expense_group_id_from_expense(supabase, expense_id: str):
     """Get group_id from expense_id"""
     if not expense_id:
         return None
-    response = (
+    response = await (
         supabase.table("expenses").select("group_id").eq("id", expense_id).execute()
     )
     return response.data[0]["group_id"] if response.data else None
@@ -46,13 +73,15 @@ async def get_expense_group_id_from_expense(supabase, expense_id: str):
 
 async def delete_debtor_from_db(supabase, debtor_id: str):
     """Delete debtor from database"""
-    response = supabase.table("expenses_debtors").delete().eq("id", debtor_id).execute()
+    response = (
+        await supabase.table("expenses_debtors").delete().eq("id", debtor_id).execute()
+    )
     return response.data
 
 
 async def update_debtor_in_db(supabase, debtor_id: str, debtor: ExpenseDebtorUpdate):
     """Update debtor in database"""
-    response = (
+    response = await (
         supabase.table("expenses_debtors")
         .update(debtor.model_dump(exclude_unset=True))
         .eq("id", debtor_id)
@@ -1,15 +1,40 @@
 from models.expense import ExpenseCreate
+from typing import AsyncIterator, Dict, Optional
+from helpers.fetch_helpers import fetch_all_rows, fetch_keyset_page, stream_rows
 
 
 async def get_all_expenses_from_db(supabase):
     """Get all expenses from database"""
-    return supabase.table("expenses").select("*").execute().data
+    return await fetch_all_rows(lambda: supabase.table("expenses").select("*"))
+
+
+async def get_expenses_page_from_db(
+    supabase, limit: int, after: Optional[str] = None, columns: str = "*"
+):
+    """Get one cursor page of expenses from database"""
+    return await fetch_keyset_page(
+        lambda: supabase.table("expenses").select(columns), limit, after
+    )
+
+
+def stream_group_expenses_from_db(supabase, group_id: str) -> AsyncIterator[Dict]:
+    """Stream expenses for specific group from database, page by page"""
+    return stream_rows(
+        lambda: supabase.table("expenses").select("*").eq("group_id", group_id)
+    )
 
 
 async def get_group_expenses_from_db(supabase, group_id: str):
     """Get expenses for specific group from database"""
-    return (
-        supabase.table("expenses").select("*").eq("group_id", group_id).execute().data
+    return [row async for row in stream_group_expenses_from_db(supabase, group_id)]
+
+
+async def get_group_expenses_with_debtors_from_db(supabase, group_id: str):
+    """Get expenses for specific group with their debtors embedded"""
+    return await fetch_all_rows(
+        lambda: supabase.table("expenses")
+        .select("*, debtors:expenses_debtors(*)")
+        .eq("group_id", group_id)
     )
 
 
@@ -21,7 +46,7 @@ async def create_expense_record(supabase, expense: ExpenseCreate):
         "payer_id": expense.payer_id,
         "group_id": expense.group_id,
     }
-    response = supabase.table("expenses").insert(new_expense).execute()
+    response = await supabase.table("expenses").insert(new_expense).execute()
     return response.data[0]
 
 
@@ -34,26 +59,37 @@ async def create_debtors_records(
         {"expense_id": expense_id, "person_id": debtor_id, "amount": share_amount}
         for debtor_id in debtors
     ]
-    response = supabase.table("expenses_debtors").insert(debtors_data).execute()
+    response = await supabase.table("expenses_debtors").insert(debtors_data).execute()
     return response.data
 
 
 async def get_expense_group_id(supabase, expense_id: str):
     """Get group_id for specific expense"""
-    response = (
+    response = await (
         supabase.table("expenses").select("group_id").eq("id", expense_id).execute()
     )
     return response.data[0]["group_id"] if response.data else None
 
 
+async def get_expense_with_debtors_from_db(supabase, expense_id: str):
+    """Get expense with its debtors embedded"""
+    response = await (
+        supabase.table("expenses")
+        .select("*, debtors:expenses_debtors(person_id, amount)")
+        .eq("id", expense_id)
+        .execute()
+    )
+    return response.data[0] if response.data else None
+
+
 async def delete_expense_from_db(supabase, expense_id: str):
     """Delete expense from database"""
-    return supabase.table("expenses").delete().eq("id", expense_id).execute()
+    return await supabase.table("expenses").delete().eq("id", expense_id).execute()
 
 
 async def update_expense_in_db(supabase, expense_id: str, expense_data):
     """Update expense in database"""
-    return (
+    return await (
         supabase.table("expenses")
         .update(expense_data.model_dump(exclude_unset=True))
         .eq("id", expense_id)
@@ -0,0 +1,126 @@
+import asyncio
+import re
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from postgrest.exceptions import APIError
+
+from config import DB_PAGE_SIZE, DB_FETCH_CONCURRENCY
+from middlewares.monitoring import track_rows_read
+
+# PostgREST error for an offset past the last row
+RANGE_NOT_SATISFIABLE = "PGRST103"
+
+COLUMN_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def count_rows(rows: List[Dict]) -> int:
+    """Count rows read, including those embedded in them (e.g. debtors)"""
+    count = len(rows)
+    for row in rows:
+        for value in row.values():
+            if isinstance(value, list) and value and isinstance(value[0], dict):
+                count += len(value)
+    return count
+
+
+async def fetch_page(build_query: Callable, order_by: str, start: int, end: int):
+    """Fetch rows start..end (inclusive) of a query"""
+    try:
+        response = await build_query().order(order_by).range(start, end).execute()
+    except APIError as e:
+        if e.code == RANGE_NOT_SATISFIABLE:
+            return []
+        raise
+    track_rows_read(count_rows(response.data))
+    return response.data
+
+
+async def stream_rows(
+    build_query: Callable,
+    order_by: str = "id",
+    page_size: int = DB_PAGE_SIZE,
+    concurrency: int = DB_FETCH_CONCURRENCY,
+) -> AsyncIterator[Dict]:
+    """Yield all rows of a query, page by page, past the PostgREST row cap.
+
+    build_query must return a fresh filtered select builder on every call,
+    since builders cannot be reused across requests. The first page is
+    fetched alone so small results cost one round trip; after that up to
+    `concurrency` pages are fetched at once and yielded in order, so at most
+    one batch of pages is held in memory.
+    """
+    start = 0
+    batch_size = 1
+
+    while True:
+        pages = await asyncio.gather(
+            *(
+                fetch_page(
+                    build_query,
+                    order_by,
+                    start + i * page_size,
+                    start + (i + 1) * page_size - 1,
+                )
+                for i in range(batch_size)
+            )
+        )
+
+        for page in pages:
+            for row in page:
+                yield row
+            if len(page) < page_size:
+                return
+
+        start += batch_size * page_size
+        batch_size = concurrency
+
+
+async def fetch_all_rows(build_query: Callable, **kwargs) -> List[Dict]:
+    """Collect all rows of a query into a list"""
+    return [row async for row in stream_rows(build_query, **kwargs)]
+
+
+def build_projection(fields: Optional[str], cursor_field: str = "id") -> str:
+    """Turn a ?fields= value into a PostgREST select projection.
+
+    Raises ValueError for anything that is not a plain column name, so the
+    value cannot inject embeds or filters. The cursor field is always kept.
+    """
+    if not fields:
+        return "*"
+
+    columns = []
+    for column in fields.split(","):
+        column = column.strip()
+        if not COLUMN_NAME_PATTERN.match(column):
+            raise ValueError(f"Invalid field: {column!r}")
+        if column not in columns:
+            columns.append(column)
+
+    if cursor_field not in columns:
+        columns.insert(0, cursor_field)
+    return ",".join(columns)
+
+
+async def fetch_keyset_page(
+    build_query: Callable,
+    limit: int,
+    after: Optional[str] = None,
+    order_by: str = "id",
+) -> Dict:
+    """Fetch one page of rows ordered by `order_by`, starting after a cursor"""
+    query = build_query().order(order_by)
+    if after:
+        query = query.gt(order_by, after)
+
+    # One extra row tells whether another page follows
+    response = await query.limit(limit + 1).execute()
+    rows = response.data
+    track_rows_read(count_rows(rows))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][order_by]
+
+    return {"items": rows, "next_cursor": next_cursor}
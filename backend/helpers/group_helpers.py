@@ -1,40 +1,63 @@
+import asyncio
+from typing import Optional
 from models.group import GroupIn, GroupUpdate
 from fastapi import HTTPException
+from config import BALANCE_ENGINE
+from helpers.expense_helpers import get_group_expenses_with_debtors_from_db
+from helpers.fetch_helpers import fetch_all_rows, fetch_keyset_page, stream_rows
+from middlewares.logger import get_logger
+from middlewares.monitoring import track_rows_read
+
+logger = get_logger()
 
 
 async def get_all_groups_from_db(supabase):
     """Get all groups from database"""
-    return supabase.table("groups").select("*").execute().data
+    return await fetch_all_rows(lambda: supabase.table("groups").select("*"))
+
+
+async def get_groups_page_from_db(
+    supabase, limit: int, after: Optional[str] = None, columns: str = "*"
+):
+    """Get one cursor page of groups from database"""
+    return await fetch_keyset_page(
+        lambda: supabase.table("groups").select(columns), limit, after
+    )
 
 
 async def get_group_by_id_from_db(supabase, group_id: str):
-    """Get single group by ID from database"""
-    response = (
-        supabase.table("groups").select("*").eq("id", group_id).single().execute()
+    """Get single group by ID from database, or None if it does not exist"""
+    response = await (
+        supabase.table("groups").select("*").eq("id", group_id).maybe_single().execute()
     )
+    if not response:
+        return None
+    track_rows_read(1)
     return response.data
 
 
 async def get_group_persons_from_db(supabase, group_id: str):
     """Get persons for specific group from database"""
-    return supabase.table("persons").select("*").eq("group_id", group_id).execute().data
+    return await fetch_all_rows(
+        lambda: supabase.table("persons").select("*").eq("group_id", group_id)
+    )
 
 
 async def create_group_record(supabase, group: GroupIn):
     """Create group record in database"""
-    response = supabase.table("groups").insert(group.model_dump()).execute()
+    response = await supabase.table("groups").insert(group.model_dump()).execute()
     return response.data[0] if response.data else None
 
 
 async def delete_group_from_db(supabase, group_id: str):
     """Delete group from database"""
-    response = supabase.table("groups").delete().eq("id", group_id).execute()
+    response = await supabase.table("groups").delete().eq("id", group_id).execute()
     return response.data[0] if response.data else None
 
 
 async def update_group_in_db(supabase, group_id: str, group: GroupUpdate):
     """Update group in database"""
-    response = (
+    response = await (
         supabase.table("groups")
         .update(group.model_dump(exclude_unset=True))
         .eq("id", group_id)
@@ -43,25 +66,9 @@ async def update_group_in_db(supabase, group_id: str, group: GroupUpdate):
     return response.data[0] if response.data else None
 
 
-async def calculate_group_balances(supabase, group_id: str):
-    """Calculate balances for all persons in a group"""
-    # 1. Verify group exists
-    group = supabase.table("groups").select("id").eq("id", group_id).single().execute()
-    if not group.data:
-        raise HTTPException(status_code=404, detail="Group not found")
-
-    # 2. Get persons in group
-    persons = (
-        supabase.table("persons")
-        .select("id, name")
-        .eq("group_id", group_id)
-        .execute()
-        .data
-    )
-    if not persons:
-        return {}
-
-    balances = {
+def empty_group_balances(persons: list):
+    """Build zeroed balances for persons"""
+    return {
         person["id"]: {
             "name": person["name"],
             "paid": 0.0,
@@ -71,38 +78,133 @@ async def calculate_group_balances(supabase, group_id: str):
         for person in persons
     }
 
-    # 3. Get all expenses for this group
-    expenses = (
-        supabase.table("expenses")
-        .select("id, amount, payer_id")
-        .eq("group_id", group_id)
+
+def add_expense_to_balances(balances: dict, expense: dict):
+    """Add an expense with embedded debtors to balances"""
+    payer_id = expense["payer_id"]
+    if payer_id in balances:
+        balances[payer_id]["paid"] += float(expense["amount"])
+
+    for d in expense.get("debtors") or []:
+        if d["person_id"] in balances:
+            balances[d["person_id"]]["owes"] += float(d["amount"])
+
+
+def finalize_group_balances(balances: dict):
+    """Compute net balance for every person"""
+    for data in balances.values():
+        data["balance"] = data["paid"] - data["owes"]
+    return balances
+
+
+def build_group_balances(persons: list, expenses: list):
+    """Build balances from persons and expenses with embedded debtors"""
+    balances = empty_group_balances(persons)
+    for e in expenses:
+        add_expense_to_balances(balances, e)
+    return finalize_group_balances(balances)
+
+
+async def get_group_snapshot_from_db(supabase, group_id: str):
+    """Get group, persons, expenses with debtors and balances in one go"""
+    group, persons, expenses = await asyncio.gather(
+        get_group_by_id_from_db(supabase, group_id),
+        get_group_persons_from_db(supabase, group_id),
+        get_group_expenses_with_debtors_from_db(supabase, group_id),
+    )
+    if group is None:
+        return None
+    return {
+        "group": group,
+        "persons": persons,
+        "expenses": expenses,
+        "balances": build_group_balances(persons, expenses),
+    }
+
+
+async def verify_group_exists(supabase, group_id: str):
+    """Raise 404 if the group does not exist"""
+    group = (
+        await supabase.table("groups")
+        .select("id")
+        .eq("id", group_id)
+        .single()
         .execute()
-        .data
     )
-    expense_ids = [e["id"] for e in expenses]
+    if not group.data:
+        raise HTTPException(status_code=404, detail="Group not found")
 
-    # 4. Aggregate "paid" by payer
-    for e in expenses:
-        payer_id = e["payer_id"]
-        if payer_id in balances:
-            balances[payer_id]["paid"] += float(e["amount"])
-
-    # 5. Get debtors only for this group's expenses
-    if expense_ids:
-        debtors = (
-            supabase.table("expenses_debtors")
-            .select("person_id, amount, expense_id")
-            .in_("expense_id", expense_ids)
-            .execute()
-            .data
-        )
 
-        for d in debtors:
-            if d["person_id"] in balances:
-                balances[d["person_id"]]["owes"] += float(d["amount"])
+async def calculate_group_balances_python(supabase, group_id: str):
+    """Calculate balances by summing expense and debtor rows in Python"""
+    # 1. Verify group exists
+    await verify_group_exists(supabase, group_id)
 
-    # 6. Compute net balance
-    for person_id, data in balances.items():
-        data["balance"] = data["paid"] - data["owes"]
+    # 2. Get persons in group
+    persons = await fetch_all_rows(
+        lambda: supabase.table("persons").select("id, name").eq("group_id", group_id)
+    )
+    if not persons:
+        return {}
 
-    return balances
+    # 3. Stream expenses with their debtors embedded, so the debtors filter
+    # does not grow with the group and only one batch of pages is in memory
+    balances = empty_group_balances(persons)
+    async for e in stream_rows(
+        lambda: supabase.table("expenses")
+        .select("amount, payer_id, debtors:expenses_debtors(person_id, amount)")
+        .eq("group_id", group_id)
+    ):
+        add_expense_to_balances(balances, e)
+
+    return finalize_group_balances(balances)
+
+
+async def calculate_group_balances_sql(supabase, group_id: str):
+    """Calculate balances with the group_balances RPC, one row per person"""
+    _, response = await asyncio.gather(
+        verify_group_exists(supabase, group_id),
+        supabase.rpc("group_balances", {"p_group_id": group_id}).execute(),
+    )
+    track_rows_read(len(response.data))
+
+    return {
+        row["person_id"]: {
+            "name": row["name"],
+            "paid": float(row["paid"]),
+            "owes": float(row["owes"]),
+            "balance": float(row["balance"]),
+        }
+        for row in response.data
+    }
+
+
+def find_balance_mismatches(expected: dict, actual: dict, tolerance: float = 1e-6):
+    """List person ids whose balances differ between two engine results"""
+    mismatches = sorted(set(expected) ^ set(actual))
+    for person_id in set(expected) & set(actual):
+        for field in ("paid", "owes", "balance"):
+            if abs(expected[person_id][field] - actual[person_id][field]) > tolerance:
+                mismatches.append(person_id)
+                break
+    return mismatches
+
+
+async def calculate_group_balances(supabase, group_id: str):
+    """Calculate balances for all persons in a group with the configured engine"""
+    if BALANCE_ENGINE == "sql":
+        return await calculate_group_balances_sql(supabase, group_id)
+
+    if BALANCE_ENGINE == "compare":
+        balances, sql_balances = await asyncio.gather(
+            calculate_group_balances_python(supabase, group_id),
+            calculate_group_balances_sql(supabase, group_id),
+        )
+        mismatches = find_balance_mismatches(balances, sql_balances)
+        if mismatches:
+            logger.warning(
+                f"BALANCE_ENGINE_MISMATCH | Group: {group_id} | Persons: {', '.join(mismatches)}"
+            )
+        return balances
+
+    return await calculate_group_balances_python(supabase, group_id)
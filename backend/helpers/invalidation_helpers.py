@@ -0,0 +1,106 @@
+from typing import Dict, Iterable, List, Optional
+
+from redis.exceptions import RedisError
+
+from constants.cache_dependencies import (
+    CACHE_DEPENDENCIES,
+    CASCADING_DELETES,
+    GLOBAL,
+    GROUP,
+)
+from constants.cache_keys import group_generation_key
+from helpers.cache_helpers import (
+    get_group_generation,
+    invalidate_group_caches,
+    invalidate_multiple_caches,
+    remove_item_from_cache,
+    update_item_cache,
+)
+from helpers.circuit_breaker import log_redis_error
+from middlewares.logger import log_cache_operation
+
+
+async def apply_cache_change(
+    background_tasks,
+    redis_client,
+    table: str,
+    group_id: Optional[str] = None,
+    user_ids: Iterable[str] = (),
+    row: Optional[Dict] = None,
+    deleted_id: Optional[str] = None,
+    columns: Optional[Iterable[str]] = None,
+) -> List[str]:
+    """Update, patch or drop every cached view built from a changed row.
+
+    Pass the new row for inserts and updates, so views that can be patched
+    in place are, or the id of a deleted row. Pass the changed columns to
+    skip views that do not read them. Returns the touched cache keys.
+    """
+    changed_columns = set(columns) if columns is not None else None
+    touched = []
+    to_drop = []
+
+    cascade = deleted_id is not None and table in CASCADING_DELETES
+    group_orphaned = False
+    if cascade and group_id:
+        invalidate_group_caches(background_tasks, redis_client, group_id)
+        log_cache_operation("invalidate", group_generation_key(group_id))
+        touched.append(group_generation_key(group_id))
+        group_orphaned = True
+
+    tables = [table]
+    if cascade:
+        tables.extend(CASCADING_DELETES[table])
+    views = [view for name in tables for view in CACHE_DEPENDENCIES[name]]
+
+    generation = None
+    for view in views:
+        if (
+            changed_columns is not None
+            and view.columns is not None
+            and not view.columns & changed_columns
+        ):
+            continue
+
+        if view.scope == GLOBAL:
+            keys = [view.key()]
+        elif view.scope == GROUP:
+            if not group_id or group_orphaned:
+                continue
+            if generation is None:
+                try:
+                    generation = await get_group_generation(
+                        redis_client, group_id, strict=True
+                    )
+                except RedisError as e:
+                    # Keys cannot be built without the generation, so orphan
+                    # every group view instead, replayed once Redis is back
+                    log_redis_error("apply_cache_change", e)
+                    invalidate_group_caches(background_tasks, redis_client, group_id)
+                    touched.append(group_generation_key(group_id))
+                    group_orphaned = True
+                    continue
+            keys = [view.key(group_id, generation)]
+        else:
+            keys = [view.key(user_id) for user_id in user_ids if user_id]
+
+        for cache_key in keys:
+            if view.patchable and row is not None:
+                update_item_cache(background_tasks, redis_client, cache_key, row)
+                log_cache_operation("update", cache_key)
+                touched.append(cache_key)
+            elif view.patchable and deleted_id is not None:
+                remove_item_from_cache(
+                    background_tasks, redis_client, cache_key, deleted_id
+                )
+                log_cache_operation("delete", cache_key)
+                touched.append(cache_key)
+            elif cache_key not in to_drop:
+                to_drop.append(cache_key)
+
+    if to_drop:
+        invalidate_multiple_caches(background_tasks, redis_client, to_drop)
+        for cache_key in to_drop:
+            log_cache_operation("invalidate", cache_key)
+
+    return touched + to_drop
@@ -0,0 +1,206 @@
+from typing import Dict, List, Optional
+
+from config import CACHE_VERSION_TTL
+from constants.cache_keys import cache_version_key, group_ledger_cache_key
+from redis.exceptions import RedisError
+
+from helpers.circuit_breaker import log_redis_error
+from helpers.cache_helpers import (
+    cache_policy_for,
+    degrade_on_redis_error,
+    get_cache_version,
+    get_group_generation,
+    remember_missed_invalidation,
+)
+from helpers.group_helpers import calculate_group_balances
+
+# Marks a ledger as built, so a group without expenses still has a ledger
+LEDGER_BUILT_FIELD = "_built"
+
+# Apply deltas only to a ledger that already exists. A missing ledger is
+# rebuilt from the DB on the next read, so deltas must not create a partial one.
+# The version is bumped either way, so a rebuild that read the DB before these
+# deltas does not overwrite them. ARGV[2] is the version begin_ledger_change
+# set before the DB write: if it moved on, a rebuild stored the ledger while
+# the write was in flight and may already hold it, so the ledger is dropped
+APPLY_DELTAS_SCRIPT = """
+local version = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+if version - 1 ~= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return 0
+end
+for i = 3, #ARGV, 2 do
+    redis.call('HINCRBYFLOAT', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+# Replace a ledger, unless it changed since the rebuild read its version. The
+# version is bumped, so deltas of a write in flight see the rebuild
+STORE_LEDGER_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('DEL', KEYS[1])
+for i = 4, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+if ARGV[2] ~= '0' then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+def paid_field(person_id: str) -> str:
+    return f"{person_id}:paid"
+
+
+def owes_field(person_id: str) -> str:
+    return f"{person_id}:owes"
+
+
+def expense_ledger_deltas(expense: Dict, debtors: List[Dict], sign: int = 1):
+    """Build ledger deltas for an expense and its debtors"""
+    deltas: Dict[str, float] = {}
+    if expense.get("payer_id"):
+        add_ledger_delta(
+            deltas, paid_field(expense["payer_id"]), sign * float(expense["amount"])
+        )
+    for debtor in debtors:
+        add_ledger_delta(
+            deltas,
+            owes_field(debtor["person_id"]),
+            sign * float(debtor.get("amount") or 0),
+        )
+    return deltas
+
+
+def debtor_ledger_deltas(debtor: Dict, sign: int = 1):
+    """Build ledger deltas for a single debtor row"""
+    return {owes_field(debtor["person_id"]): sign * float(debtor.get("amount") or 0)}
+
+
+def add_ledger_delta(deltas: Dict[str, float], field: str, delta: float):
+    deltas[field] = deltas.get(field, 0.0) + delta
+
+
+def merge_ledger_deltas(*all_deltas: Dict[str, float]) -> Dict[str, float]:
+    merged: Dict[str, float] = {}
+    for deltas in all_deltas:
+        for field, delta in deltas.items():
+            add_ledger_delta(merged, field, delta)
+    return merged
+
+
+@degrade_on_redis_error()
+async def begin_ledger_change(redis_client, group_id: str) -> Optional[int]:
+    """Bump the version of a group ledger before a DB write that changes it.
+
+    Rebuilds that read the DB before the write can no longer store the
+    ledger. Pass the returned version to apply_ledger_deltas after the write.
+    """
+    generation = await get_group_generation(redis_client, group_id, strict=True)
+    version_key = cache_version_key(group_ledger_cache_key(group_id, generation))
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.incr(version_key)
+        pipe.expire(version_key, CACHE_VERSION_TTL)
+        version, _ = await pipe.execute()
+    return version
+
+
+async def apply_ledger_deltas(
+    redis_client, group_id: str, deltas: Dict[str, float], version: Optional[int]
+):
+    """Atomically apply deltas to a group ledger, if the ledger exists.
+
+    version comes from begin_ledger_change. Without it, or if a rebuild
+    stored the ledger since, the ledger is dropped instead.
+    """
+    args = [CACHE_VERSION_TTL, "" if version is None else version]
+    for field, delta in deltas.items():
+        if delta:
+            args.extend([field, repr(delta)])
+    if len(args) == 2:
+        return False
+    try:
+        generation = await get_group_generation(redis_client, group_id, strict=True)
+        cache_key = group_ledger_cache_key(group_id, generation)
+        applied = await redis_client.eval(
+            APPLY_DELTAS_SCRIPT, 2, cache_key, cache_version_key(cache_key), *args
+        )
+    except RedisError as e:
+        # The ledger missed these deltas, so it must be rebuilt once Redis is back
+        log_redis_error("apply_ledger_deltas", e)
+        remember_missed_invalidation(group_ids=[group_id])
+        return False
+    return bool(applied)
+
+
+@degrade_on_redis_error()
+async def get_ledger_balances(
+    redis_client, group_id: str, persons: List[Dict]
+) -> Optional[Dict]:
+    """Read balances for the given persons from the group ledger"""
+    generation = await get_group_generation(redis_client, group_id)
+    ledger = await redis_client.hgetall(group_ledger_cache_key(group_id, generation))
+    if not ledger:
+        return None
+
+    balances = {}
+    for person in persons:
+        paid = float(ledger.get(paid_field(person["id"]), 0))
+        owes = float(ledger.get(owes_field(person["id"]), 0))
+        balances[person["id"]] = {
+            "name": person["name"],
+            "paid": paid,
+            "owes": owes,
+            "balance": paid - owes,
+        }
+    return balances
+
+
+@degrade_on_redis_error(default=(None, None))
+async def get_ledger_fill_target(redis_client, group_id: str):
+    """Get the ledger key of a group and its version, to read before the DB"""
+    generation = await get_group_generation(redis_client, group_id, strict=True)
+    cache_key = group_ledger_cache_key(group_id, generation)
+    return cache_key, await get_cache_version(redis_client, cache_key)
+
+
+@degrade_on_redis_error()
+async def store_group_ledger(
+    redis_client, cache_key: str, balances: Dict, version: Optional[int]
+):
+    """Replace a group ledger with the given balances"""
+    if version is None:
+        return
+
+    args = [
+        version,
+        cache_policy_for(cache_key)["ttl"],
+        CACHE_VERSION_TTL,
+        LEDGER_BUILT_FIELD,
+        1,
+    ]
+    for person_id, data in balances.items():
+        args.extend([paid_field(person_id), repr(float(data["paid"]))])
+        args.extend([owes_field(person_id), repr(float(data["owes"]))])
+
+    await redis_client.eval(
+        STORE_LEDGER_SCRIPT, 2, cache_key, cache_version_key(cache_key), *args
+    )
+
+
+async def rebuild_group_ledger(redis_client, supabase, group_id: str):
+    """Rebuild a group ledger from the DB and return the balances"""
+    cache_key, version = await get_ledger_fill_target(redis_client, group_id)
+    balances = await calculate_group_balances(supabase, group_id)
+    await store_group_ledger(redis_client, cache_key, balances, version)
+    return balances
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, List
+
+from config import L1_CACHE_ENABLED, L1_CACHE_MAX_ENTRIES, L1_CACHE_TTL
+from middlewares.logger import get_logger
+from middlewares.monitoring import track_cache_tier_operation
+
+logger = get_logger()
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Returned on a miss, since None and empty lists are valid cached values
+MISSING = object()
+
+
+class LocalCache:
+    """Size-bounded in-process LRU cache with a TTL, keyed like Redis"""
+
+    def __init__(self, max_entries: int, ttl: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.entries: OrderedDict = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            return MISSING
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return MISSING
+
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get_field(self, key: str, field: str) -> Any:
+        """Get one field of a cached hash (e.g. one cursor page)"""
+        fields = self.get(key)
+        if fields is MISSING:
+            return MISSING
+        return fields.get(field, MISSING)
+
+    def set_field(self, key: str, field: str, value: Any):
+        fields = self.get(key)
+        if fields is MISSING:
+            fields = {}
+        fields[field] = value
+        self.set(key, fields)
+
+    def delete(self, *keys: str):
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+local_cache = LocalCache(L1_CACHE_MAX_ENTRIES, L1_CACHE_TTL, enabled=L1_CACHE_ENABLED)
+
+
+def track_l1_lookup(hit: bool):
+    """Track an L1 lookup, unless L1 is off and every lookup is a miss"""
+    if local_cache.enabled:
+        track_cache_tier_operation("l1", hit)
+
+
+async def publish_invalidation(redis_client, cache_keys: List[str]):
+    """Tell every worker to drop its local copy of the given keys"""
+    if local_cache.enabled:
+        await redis_client.publish(INVALIDATION_CHANNEL, json.dumps(cache_keys))
+
+
+async def listen_for_invalidations(redis_client):
+    """Drop local entries for keys invalidated by any worker"""
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Anything cached while disconnected may have missed messages
+                local_cache.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        local_cache.delete(*json.loads(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Cache invalidation listener error: {str(e)}")
+            local_cache.clear()
+            await asyncio.sleep(1)
@@ -1,20 +1,31 @@
 from models.group_user import GroupUserIn, GroupUserUpdate
+from typing import Optional
+from helpers.fetch_helpers import fetch_all_rows, fetch_keyset_page
 
 
 async def get_all_members_from_db(supabase):
     """Get all members from database"""
-    return supabase.table("group_users").select("*").execute().data
+    return await fetch_all_rows(lambda: supabase.table("group_users").select("*"))
+
+
+async def get_members_page_from_db(
+    supabase, limit: int, after: Optional[str] = None, columns: str = "*"
+):
+    """Get one cursor page of members from database"""
+    return await fetch_keyset_page(
+        lambda: supabase.table("group_users").select(columns), limit, after
+    )
 
 
 async def create_member_record(supabase, member: GroupUserIn):
     """Create member record in database"""
-    response = supabase.table("group_users").insert(member.model_dump()).execute()
+    response = await supabase.table("group_users").insert(member.model_dump()).execute()
     return response.data[0] if response.data else None
 
 
 async def get_member_user_id(supabase, member_id: str):
     """Get user_id for specific member"""
-    response = (
+    response = await (
         supabase.table("group_users").select("user_id").eq("id", member_id).execute()
     )
     return response.data[0]["user_id"] if response.data else None
@@ -22,16 +33,30 @@ async def get_member_user_id(supabase, member_id: str):
 
 async def delete_member_from_db(supabase, member_id: str):
     """Delete member from database"""
-    response = supabase.table("group_users").delete().eq("id", member_id).execute()
+    response = (
+        await supabase.table("group_users").delete().eq("id", member_id).execute()
+    )
     return response.data
 
 
 async def update_member_in_db(supabase, member_id: str, member: GroupUserUpdate):
     """Update member in database"""
-    response = (
+    response = await (
         supabase.table("group_users")
         .update(member.model_dump(exclude_unset=True))
         .eq("id", member_id)
         .execute()
     )
     return response.data
+
+
+async def get_group_user_ids_from_db(supabase, group_id: str):
+    """Get ids of users that are members of a specific group"""
+    return [
+        row["user_id"]
+        for row in await fetch_all_rows(
+            lambda: supabase.table("group_users")
+            .select("id, user_id")
+            .eq("group_id", group_id)
+        )
+    ]
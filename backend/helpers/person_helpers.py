@@ -1,20 +1,31 @@
 from models.person import PersonIn, PersonUpdate
+from typing import Optional
+from helpers.fetch_helpers import fetch_all_rows, fetch_keyset_page
 
 
 async def get_all_persons_from_db(supabase):
     """Get all persons from database"""
-    return supabase.table("persons").select("*").execute().data
+    return await fetch_all_rows(lambda: supabase.table("persons").select("*"))
+
+
+async def get_persons_page_from_db(
+    supabase, limit: int, after: Optional[str] = None, columns: str = "*"
+):
+    """Get one cursor page of persons from database"""
+    return await fetch_keyset_page(
+        lambda: supabase.table("persons").select(columns), limit, after
+    )
 
 
 async def create_person_record(supabase, person: PersonIn):
     """Create person record in database"""
-    response = supabase.table("persons").insert(person.model_dump()).execute()
+    response = await supabase.table("persons").insert(person.model_dump()).execute()
     return response.data[0] if response.data else None
 
 
 async def get_person_group_id(supabase, person_id: str):
     """Get group_id for specific person"""
-    response = (
+    response = await (
         supabase.table("persons").select("group_id").eq("id", person_id).execute()
     )
     return response.data[0]["group_id"] if response.data else None
@@ -22,13 +33,13 @@ async def get_person_group_id(supabase, person_id: str):
 
 async def delete_person_from_db(supabase, person_id: str):
     """Delete person from database"""
-    response = supabase.table("persons").delete().eq("id", person_id).execute()
+    response = await supabase.table("persons").delete().eq("id", person_id).execute()
     return response.data[0] if response.data else None
 
 
 async def update_person_in_db(supabase, person_id: str, person: PersonUpdate):
     """Update person in database"""
-    response = (
+    response = await (
         supabase.table("persons")
         .update(person.model_dump(exclude_unset=True))
         .eq("id", person_id)
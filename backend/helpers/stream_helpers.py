@@ -0,0 +1,132 @@
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from helpers.cache_codecs import serialize_dates
+from middlewares.logger import log_database_operation
+from middlewares.monitoring import track_database_operation
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Items per chunk when streaming a list that is already in memory
+STREAM_BATCH_SIZE = 500
+
+
+def encode_json(value: Any) -> str:
+    if orjson:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, default=serialize_dates)
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def batched(items: AsyncIterator[Any], size: int) -> AsyncIterator[List[Any]]:
+    """Group an async stream of items into lists of up to size items"""
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def timed_db_stream(
+    rows: AsyncIterator[Dict], operation: str, table: str
+) -> AsyncIterator[Dict]:
+    """Pass rows through, logging the DB operation once they are all read"""
+    db_start = time.time()
+    async for row in rows:
+        yield row
+    db_duration = time.time() - db_start
+    log_database_operation(operation, table, db_duration)
+    track_database_operation(operation, table, db_duration)
+
+
+async def read_first_batch(
+    batches: AsyncIterator[List[str]],
+) -> AsyncIterator[List[str]]:
+    """Read the first batch of a stream now, so an error reading it (e.g. the
+    first DB page) is raised before the response status is sent"""
+    first_batch = await anext(batches, None)
+
+    async def all_batches():
+        if first_batch is not None:
+            yield first_batch
+        async for batch in batches:
+            yield batch
+
+    return all_batches()
+
+
+async def encoded_batches(items: Iterable[Dict]) -> AsyncIterator[List[str]]:
+    """Encode an in-memory list as batches of JSON items"""
+    batch = []
+    for item in items:
+        batch.append(encode_json(item))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def stream_json_list(
+    list_field: str,
+    batches: AsyncIterator[List[str]],
+    extra: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[bytes]:
+    """Write {"<list_field>": [...], **extra} from batches of JSON items"""
+    yield f'{{"{list_field}":['.encode()
+    first = True
+    async for batch in batches:
+        if not batch:
+            continue
+        chunk = ",".join(batch)
+        yield (chunk if first else "," + chunk).encode()
+        first = False
+    tail = "".join(f',"{k}":{encode_json(v)}' for k, v in (extra or {}).items())
+    yield f"]{tail}}}".encode()
+
+
+async def stream_ndjson(batches: AsyncIterator[List[str]]) -> AsyncIterator[bytes]:
+    """Write one JSON item per line"""
+    async for batch in batches:
+        if batch:
+            yield ("\n".join(batch) + "\n").encode()
+
+
+def list_response(
+    request: Request,
+    list_field: str,
+    batches: AsyncIterator[List[str]],
+    extra: Optional[Dict[str, Any]] = None,
+) -> StreamingResponse:
+    """Stream a list response as it is produced, one chunk per batch.
+
+    Clients sending Accept: application/x-ndjson get one item per line, with
+    the extra fields (e.g. next_cursor) as X-<Field> headers instead.
+    """
+    if wants_ndjson(request):
+        headers = {
+            "X-" + k.replace("_", "-").title(): str(v)
+            for k, v in (extra or {}).items()
+            if v is not None
+        }
+        return StreamingResponse(
+            stream_ndjson(batches), media_type=NDJSON_MEDIA_TYPE, headers=headers
+        )
+    return StreamingResponse(
+        stream_json_list(list_field, batches, extra), media_type="application/json"
+    )
@@ -1,29 +1,228 @@
+import atexit
+import copy
+import itertools
 import sys
 import os
+import threading
+from collections import deque
 from loguru import logger
 from datetime import datetime
 
+from config import LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL, LOG_QUEUE_SIZE
+
+FILE_FORMAT = (
+    "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+)
+
+# Fields of a queued record kept when the writer thread logs it again, so lines
+# show the time and place they were logged at, not when they were written
+RECORD_FIELDS = (
+    "elapsed",
+    "extra",
+    "file",
+    "function",
+    "line",
+    "module",
+    "name",
+    "process",
+    "thread",
+    "time",
+)
+
+
+def drop_rank(level_no: int) -> int:
+    """Rank of a level when the log queue is full: debug lines go first, then
+    info, then warnings and errors"""
+    if level_no < 20:
+        return 0
+    if level_no < 30:
+        return 1
+    return 2
+
+
+class LogQueue:
+    """Bounded queue of log records. When full, the least severe record is
+    dropped, and records come out in the order they were logged"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.size = 0
+        self.ranks = (deque(), deque(), deque())
+        self.dropped = [0, 0, 0]
+        self.sequence = itertools.count()
+
+    def put(self, record) -> bool:
+        rank = drop_rank(record["level"].no)
+        if self.size >= self.maxsize:
+            lowest = next(i for i, queued in enumerate(self.ranks) if queued)
+            if lowest >= rank:
+                self.dropped[rank] += 1
+                return False
+            self.ranks[lowest].popleft()
+            self.dropped[lowest] += 1
+            self.size -= 1
+        self.ranks[rank].append((next(self.sequence), record))
+        self.size += 1
+        return True
+
+    def take(self, count: int):
+        """Remove and return up to count of the oldest records"""
+        batch = []
+        while self.size and len(batch) < count:
+            oldest = min((queued for queued in self.ranks if queued), key=head_sequence)
+            batch.append(oldest.popleft()[1])
+            self.size -= 1
+        return batch
+
+    def take_dropped(self):
+        dropped, self.dropped = self.dropped, [0, 0, 0]
+        return dropped
+
+
+def head_sequence(queued: deque) -> int:
+    return queued[0][0]
+
+
+class BatchedStream:
+    """Stream for a sink that keeps its lines until the whole batch is written
+    with one write and flush"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lines = []
+
+    def write(self, message):
+        self.lines.append(message)
+
+    def write_batch(self):
+        if not self.lines:
+            return
+        try:
+            self.stream.write("".join(self.lines))
+            self.stream.flush()
+        except Exception as e:
+            # Like a loguru sink, a broken stream must not stop the writer
+            sys.stderr.write(f"Logging error in console stream: {e!r}\n")
+        finally:
+            self.lines.clear()
+
+
+class QueuedSink:
+    """Loguru stream sink that queues records for a background thread, which logs
+    them in batches to the real sinks of a separate writer logger. Logging
+    never waits on a write, and at most maxsize records are held"""
+
+    def __init__(
+        self,
+        writer,
+        streams,
+        maxsize: int = LOG_QUEUE_SIZE,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+    ):
+        self.writer = writer.patch(self.restore_record)
+        self.streams = streams
+        self.queue = LogQueue(maxsize)
+        # A full queue always wakes the writer
+        self.batch_size = min(batch_size, maxsize)
+        self.flush_interval = flush_interval
+        self.current = None
+        self.running = True
+        self.start()
+        # Threads do not survive a fork, so a forked worker starts its own
+        os.register_at_fork(after_in_child=self.start)
+
+    def start(self):
+        if not self.running:
+            return
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, message):
+        with self.condition:
+            self.queue.put(message.record)
+            if self.queue.size >= self.batch_size:
+                self.condition.notify()
+
+    def stop(self):
+        """Write the queued records and stop the writer thread"""
+        with self.condition:
+            if not self.running:
+                return
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                if self.running and self.queue.size < self.batch_size:
+                    self.condition.wait(self.flush_interval)
+                batch = self.queue.take(self.batch_size)
+                dropped = self.queue.take_dropped()
+                stopping = not self.running and not self.queue.size
+            self.log_batch(batch, dropped)
+            if stopping:
+                return
+
+    def log_batch(self, batch, dropped):
+        if any(dropped):
+            self.writer.warning(
+                f"LOGGING | Queue full, dropped {dropped[0]} debug, "
+                f"{dropped[1]} info and {dropped[2]} warning or error lines"
+            )
+        for record in batch:
+            self.current = record
+            writer = self.writer
+            if record["exception"]:
+                writer = writer.opt(exception=record["exception"])
+            writer.log(record["level"].name, record["message"])
+        self.current = None
+        for stream in self.streams:
+            stream.write_batch()
+
+    def restore_record(self, record):
+        if self.current is not None:
+            for field in RECORD_FIELDS:
+                record[field] = self.current[field]
+
+
+def is_performance_record(record) -> bool:
+    return record["extra"].get("performance", False)
+
 
 class LoggerConfig:
-    def __init__(self):
-        # Remove default handler
+    def __init__(
+        self, log_dir: str = "logs", queue_size: int = LOG_QUEUE_SIZE, stream=None
+    ):
+        # Remove default handler, stopping the writer thread of a previous config
         logger.remove()
 
         # Create logs directory if it doesn't exist
-        os.makedirs("logs", exist_ok=True)
+        os.makedirs(log_dir, exist_ok=True)
+
+        # With a queue, the sinks below belong to a separate logger written by a
+        # background thread, and the app logger only queues records for it
+        stream = stream or sys.stdout
+        if queue_size > 0:
+            writer = copy.deepcopy(logger)
+            stream = BatchedStream(stream)
+        else:
+            writer = logger
 
         # Console handler with colors
-        logger.add(
-            sys.stdout,
+        writer.add(
+            stream,
             format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
             level="INFO",
             colorize=True,
         )
 
         # File handler for all logs
-        logger.add(
-            "logs/app_{time:YYYY-MM-DD}.log",
-            format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+        writer.add(
+            os.path.join(log_dir, "app_{time:YYYY-MM-DD}.log"),
+            format=FILE_FORMAT,
             level="DEBUG",
             rotation="00:00",  # Rotate daily
             retention="30 days",  # Keep logs for 30 days
@@ -31,9 +230,9 @@ class LoggerConfig:
         )
 
         # Error file handler
-        logger.add(
-            "logs/error_{time:YYYY-MM-DD}.log",
-            format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+        writer.add(
+            os.path.join(log_dir, "error_{time:YYYY-MM-DD}.log"),
+            format=FILE_FORMAT,
             level="ERROR",
             rotation="00:00",
             retention="90 days",  # Keep error logs longer
@@ -41,16 +240,22 @@ class LoggerConfig:
         )
 
         # Performance/monitoring logs
-        logger.add(
-            "logs/performance_{time:YYYY-MM-DD}.log",
-            format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+        writer.add(
+            os.path.join(log_dir, "performance_{time:YYYY-MM-DD}.log"),
+            format=FILE_FORMAT,
             level="INFO",
             rotation="00:00",
             retention="7 days",
             compression="zip",
-            filter=lambda record: "PERFORMANCE" in record["message"],
+            filter=is_performance_record,
         )
 
+        if queue_size > 0:
+            # Records are formatted by the writer, so queueing skips formatting
+            self.sink = QueuedSink(writer, [stream], maxsize=queue_size)
+            logger.add(self.sink, format="{message}", level="DEBUG")
+            atexit.register(self.sink.stop)
+
 
 # Initialize logger configuration
 config = LoggerConfig()
@@ -58,10 +263,18 @@ config = LoggerConfig()
 # Create a custom logger instance
 app_logger = logger.bind(name="casa-cuenta")
 
+# Routed to the performance log by its extra field, not by matching messages
+performance_logger = app_logger.bind(performance=True)
+
+
+def close_logs():
+    """Write the queued log records and stop logging, on shutdown"""
+    logger.remove()
+
 
 def log_performance(endpoint: str, duration: float, status_code: int, method: str):
     """Log performance metrics"""
-    app_logger.info(
+    performance_logger.info(
         f"PERFORMANCE | {method} {endpoint} | Duration: {duration:.3f}s | Status: {status_code}"
     )
 
@@ -7,11 +7,63 @@ from prometheus_client import (
     CONTENT_TYPE_LATEST,
 )
 import time
+from config import METRICS_MAX_LABEL_VALUES
+from contextvars import ContextVar
 from middlewares.logger import get_logger, log_performance
-from typing import Callable
+from typing import Callable, Dict, Optional, Set
 
 logger = get_logger()
 
+# Endpoint of requests that matched no route, e.g. scans of unknown paths
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class LabelGuard:
+    """Cap the distinct values of a metric label, counting the rest as one"""
+
+    def __init__(self, name: str, max_values: int = METRICS_MAX_LABEL_VALUES):
+        self.name = name
+        self.max_values = max_values
+        self.values: Set[str] = set()
+
+    def __call__(self, value: str) -> str:
+        if value in self.values:
+            return value
+        if len(self.values) >= self.max_values:
+            return "other"
+        self.values.add(value)
+        if len(self.values) == self.max_values:
+            logger.warning(
+                f"Metric label {self.name} reached {self.max_values} values, "
+                f"new values are counted as other"
+            )
+        return value
+
+
+method_label = LabelGuard("method")
+endpoint_label = LabelGuard("endpoint")
+
+
+# Route templates by route id, resolved on each route's first request. Routes
+# live as long as the app, so ids are never reused
+route_templates: Dict[int, str] = {}
+
+
+def request_endpoint(request: Request) -> str:
+    """Get the route template a request matched, e.g. /groups/{group_id}.
+
+    Only set once the request has been routed.
+    """
+    route = request.scope.get("route")
+    if route is None:
+        return UNMATCHED_ROUTE
+    template = route_templates.get(id(route))
+    if template is None:
+        template = getattr(route, "path_format", None) or route.path
+        route_templates[id(route)] = template
+    return template
+
+
 # Prometheus metrics
 REQUEST_COUNT = Counter(
     "http_requests_total", "Total HTTP requests", ["method", "endpoint", "status_code"]
@@ -29,6 +81,30 @@ CACHE_OPERATIONS = Counter(
     "cache_operations_total", "Total cache operations", ["operation", "result"]
 )
 
+CACHE_TIER_OPERATIONS = Counter(
+    "cache_tier_operations_total",
+    "Cache lookups per tier (l1 = in-process, l2 = Redis)",
+    ["tier", "result"],
+)
+
+CACHE_STALE_SERVES = Counter(
+    "cache_stale_serves_total",
+    "Cache entries served past their soft TTL while being refreshed",
+    ["family"],
+)
+
+CACHE_KEYS = Gauge("cache_keys", "Cached Redis keys per key family", ["family"])
+
+CACHE_BYTES = Gauge(
+    "cache_bytes", "Redis memory used by cached keys per key family", ["family"]
+)
+
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state (0 = closed, 1 = half-open, 2 = open)",
+    ["name"],
+)
+
 DATABASE_OPERATIONS = Counter(
     "database_operations_total", "Total database operations", ["operation", "table"]
 )
@@ -58,9 +134,9 @@ async def monitoring_middleware(request: Request, call_next: Callable) -> Respon
         # Calculate duration
         duration = time.time() - start_time
 
-        # Extract metrics
-        method = request.method
-        endpoint = request.url.path
+        # Extract metrics, by route template so path ids add no series
+        method = method_label(request.method)
+        endpoint = endpoint_label(request_endpoint(request))
         status_code = response.status_code
 
         # Update Prometheus metrics
@@ -91,7 +167,9 @@ async def monitoring_middleware(request: Request, call_next: Callable) -> Respon
 
         # Update error metrics
         REQUEST_COUNT.labels(
-            method=request.method, endpoint=request.url.path, status_code=500
+            method=method_label(request.method),
+            endpoint=endpoint_label(request_endpoint(request)),
+            status_code=500,
         ).inc()
 
         raise
@@ -107,15 +185,65 @@ def track_cache_operation(operation: str, hit: bool):
     CACHE_OPERATIONS.labels(operation=operation, result=result).inc()
 
 
+def track_cache_tier_operation(tier: str, hit: bool):
+    """Track cache lookups per cache tier"""
+    result = "hit" if hit else "miss"
+    CACHE_TIER_OPERATIONS.labels(tier=tier, result=result).inc()
+
+
+def track_cache_stale_serve(family: str):
+    """Track stale cache entries served while refreshing"""
+    CACHE_STALE_SERVES.labels(family=family).inc()
+
+
+def track_cache_usage(keys: dict, used_bytes: dict):
+    """Publish the key count and memory use of each cache key family"""
+    for family in keys:
+        CACHE_KEYS.labels(family=family).set(keys[family])
+        CACHE_BYTES.labels(family=family).set(used_bytes.get(family, 0))
+
+
+def track_circuit_breaker_state(name: str, state: int):
+    """Track the state of a circuit breaker"""
+    CIRCUIT_BREAKER_STATE.labels(name=name).set(state)
+
+
+class RequestCost:
+    """DB work done while serving one request"""
+
+    def __init__(self):
+        self.db_calls = 0
+        self.db_rows = 0
+        self.db_seconds = 0.0
+
+
+# Cost of the request being served, set by rate limited endpoints
+request_cost: ContextVar[Optional[RequestCost]] = ContextVar(
+    "request_cost", default=None
+)
+
+
 def track_database_operation(operation: str, table: str, duration: float):
     """Track database operations for monitoring"""
     DATABASE_OPERATIONS.labels(operation=operation, table=table).inc()
     DATABASE_DURATION.labels(operation=operation, table=table).observe(duration)
 
+    cost = request_cost.get()
+    if cost is not None:
+        cost.db_calls += 1
+        cost.db_seconds += duration
+
+
+def track_rows_read(rows: int):
+    """Count rows read from the database towards the current request's cost"""
+    cost = request_cost.get()
+    if cost is not None:
+        cost.db_rows += rows
+
 
 def track_rate_limit_hit(endpoint: str):
     """Track rate limit hits"""
-    RATE_LIMIT_HITS.labels(endpoint=endpoint).inc()
+    RATE_LIMIT_HITS.labels(endpoint=endpoint_label(endpoint)).inc()
 
 
 async def metrics_endpoint():
@@ -1,52 +1,259 @@
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-from fastapi import Request, HTTPException
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from config import (
+    RATE_LIMIT_COST_BASE,
+    RATE_LIMIT_COST_DB_CALL,
+    RATE_LIMIT_COST_DB_ROW,
+    RATE_LIMIT_COST_DB_SECOND,
+    RATE_LIMIT_LOCAL_SHARE,
+    RATE_LIMIT_SYNC_INTERVAL,
+)
 from dependencies import get_redis
-import redis.asyncio as redis
-from middlewares.logger import get_logger
-from typing import Optional
+from redis.exceptions import RedisError
+from helpers.circuit_breaker import log_redis_error
+from middlewares.logger import get_logger, log_rate_limit
+from middlewares.monitoring import (
+    RequestCost,
+    request_cost,
+    request_endpoint,
+    track_rate_limit_hit,
+)
+from dataclasses import dataclass
+from functools import lru_cache, wraps
+from typing import Dict, Optional, Tuple
 import asyncio
 import hashlib
+import time
+import uuid
 
 logger = get_logger()
 
 
-class RedisStorage:
-    """Custom Redis storage for SlowAPI"""
+# Weighted sliding window log: one sorted set member per charge, scored by
+# the Redis server time in ms so every worker shares one clock, with its cost
+# in a hash next to the running total. Expired charges are trimmed from the
+# total, the request is charged only if its cost fits under the limit, and both
+# keys expire once the window passes without requests. Rejected requests are
+# not charged, so a client retrying too fast is not locked out for longer.
+# ARGV[4] is settled as is first: costs of requests admitted from a local
+# bucket, or measured minus charged costs. The current request is only
+# checked, and charged ARGV[6], if ARGV[5] is 1
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
 
-    def __init__(self, redis_client: redis.Redis):
+local total = tonumber(redis.call('HGET', KEYS[2], '_total') or '0')
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now - window)
+for _, member in ipairs(expired) do
+    total = total - tonumber(redis.call('HGET', KEYS[2], member) or '0')
+    redis.call('HDEL', KEYS[2], member)
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+
+local function charge(member, cost)
+    redis.call('ZADD', KEYS[1], now, member)
+    redis.call('HSET', KEYS[2], member, tostring(cost))
+    total = total + cost
+end
+if tonumber(ARGV[4]) ~= 0 then
+    charge(ARGV[3] .. ':settled', tonumber(ARGV[4]))
+end
+local allowed = 0
+if ARGV[5] == '1' and total + tonumber(ARGV[6]) <= limit then
+    charge(ARGV[3], tonumber(ARGV[6]))
+    allowed = 1
+end
+-- Drop float drift once nothing is left in the window
+if redis.call('ZCARD', KEYS[1]) == 0 then
+    total = 0
+end
+redis.call('HSET', KEYS[2], '_total', tostring(total))
+redis.call('PEXPIRE', KEYS[1], window)
+redis.call('PEXPIRE', KEYS[2], window)
+
+local reset = window
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if oldest[2] then
+    reset = tonumber(oldest[2]) + window - now
+end
+return {allowed, math.max(math.floor(limit - total), 0), reset}
+"""
+
+# Cost charged up front for a route not measured yet, i.e. one unit per
+# request, and how fast a route's expected cost follows measured costs
+DEFAULT_REQUEST_COST = 1.0
+EXPECTED_COST_WEIGHT = 0.2
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """Outcome of one rate limited request"""
+
+    allowed: bool
+    limit: int
+    # Whole cost units left in the window
+    remaining: int
+    # Milliseconds until the oldest charge leaves the window
+    reset_ms: int
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, result: RateLimitResult, detail: str):
+        super().__init__(detail)
+        self.result = result
+        self.detail = detail
+
+
+class LocalBucket:
+    """Cost a worker may admit for one rate limit key without Redis"""
+
+    def __init__(self, limit: int, window: int):
+        self.limit = limit
+        self.window = window
+        # Refilled from the remaining budget of every Redis check
+        self.tokens = 0.0
+        # Charged locally and not yet recorded in Redis
+        self.pending = 0.0
+        # Redis state at the last check, for the X-RateLimit-* headers
+        self.remaining = limit
+        self.reset_ms = 0
+        self.synced_at = 0.0
+        self.spent = 0.0
+
+
+class SlidingWindowLimiter:
+    """Redis sliding window rate limiter over weighted request costs, one
+    Lua script call per checked request.
+
+    With a local share, requests are first taken from a per-client token
+    bucket in process memory and recorded in Redis in batches by sync(), so
+    Redis is only asked synchronously once a client's bucket runs dry, i.e.
+    when it nears its limit. Costs settled after a request are batched the
+    same way. Fails open: while Redis is unreachable requests are not rate
+    limited.
+    """
+
+    def __init__(self, redis_client=None, local_share: float = 0):
         self.redis_client = redis_client
+        self.local_share = local_share
+        self.buckets: Dict[str, LocalBucket] = {}
 
-    async def get(self, key: str) -> Optional[int]:
-        """Get current count for rate limit key"""
-        try:
-            value = await self.redis_client.get(key)
-            return int(value) if value else None
-        except Exception as e:
-            logger.error(f"Redis get error for key {key}: {e}")
-            return None
+    async def hit(
+        self, key: str, limit: int, window: int, cost: float = DEFAULT_REQUEST_COST
+    ) -> RateLimitResult:
+        """Charge a request against a limit of cost units per window seconds"""
+        bucket = self.buckets.get(key)
+        if bucket is not None and bucket.tokens >= cost:
+            bucket.tokens -= cost
+            bucket.pending += cost
+            bucket.spent += cost
+            elapsed_ms = int((time.monotonic() - bucket.synced_at) * 1000)
+            return RateLimitResult(
+                True,
+                limit,
+                max(int(bucket.remaining - bucket.spent), 0),
+                max(bucket.reset_ms - elapsed_ms, 0),
+            )
 
-    async def set(self, key: str, value: int, expire: int):
-        """Set rate limit count with expiration"""
+        # Record the costs charged locally along with this check
+        admitted = 0.0
+        if bucket is not None:
+            admitted, bucket.pending = bucket.pending, 0.0
         try:
-            await self.redis_client.setex(key, expire, value)
-        except Exception as e:
-            logger.error(f"Redis set error for key {key}: {e}")
+            allowed, remaining, reset_ms = await self.redis_client.eval(
+                SLIDING_WINDOW_SCRIPT,
+                2,
+                key,
+                rate_limit_cost_key(key),
+                limit,
+                window * 1000,
+                uuid.uuid4().hex,
+                repr(admitted),
+                1,
+                repr(cost),
+            )
+        except RedisError as e:
+            if bucket is not None:
+                bucket.pending += admitted
+            log_redis_error("rate limit hit", e)
+            return RateLimitResult(True, limit, limit, window * 1000)
+
+        self.refill(key, limit, window, remaining, reset_ms)
+        return RateLimitResult(bool(allowed), limit, remaining, reset_ms)
+
+    def settle(self, key: str, limit: int, window: int, delta: float):
+        """Correct a charge once the request's measured cost is known.
+
+        Recorded in Redis with the key's next check or sync.
+        """
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = LocalBucket(limit, window)
+            bucket.synced_at = time.monotonic()
+        bucket.pending += delta
+        bucket.spent += delta
+        # Refunds wait for the next check, so local tokens never grow here
+        bucket.tokens -= max(delta, 0)
+
+    def refill(self, key: str, limit: int, window: int, remaining: int, reset_ms: int):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if not self.local_share:
+                return
+            bucket = self.buckets[key] = LocalBucket(limit, window)
+        # Costs charged while Redis was asked count against the new tokens, so
+        # a worker never holds more than one share of unrecorded costs
+        bucket.tokens = max(
+            int(self.local_share * remaining) - max(bucket.pending, 0), 0
+        )
+        bucket.remaining = remaining
+        bucket.reset_ms = reset_ms
+        bucket.synced_at = time.monotonic()
+        bucket.spent = 0
+
+    async def sync(self):
+        """Record locally charged costs in Redis in one round trip and refill
+        their buckets"""
+        now = time.monotonic()
+        for key, bucket in list(self.buckets.items()):
+            if not bucket.pending and now - bucket.synced_at > bucket.window:
+                del self.buckets[key]
+
+        flushes = []
+        for key, bucket in self.buckets.items():
+            if bucket.pending:
+                flushes.append((key, bucket, bucket.pending))
+                bucket.pending = 0.0
+        if not flushes:
+            return
 
-    async def incr(self, key: str, expire: int) -> int:
-        """Increment rate limit count"""
         try:
-            # Use pipeline for atomic operations
-            async with self.redis_client.pipeline() as pipe:
-                await pipe.incr(key)
-                await pipe.expire(key, expire)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, bucket, admitted in flushes:
+                    pipe.eval(
+                        SLIDING_WINDOW_SCRIPT,
+                        2,
+                        key,
+                        rate_limit_cost_key(key),
+                        bucket.limit,
+                        bucket.window * 1000,
+                        uuid.uuid4().hex,
+                        repr(admitted),
+                        0,
+                        0,
+                    )
                 results = await pipe.execute()
-                return results[0]
-        except Exception as e:
-            logger.error(f"Redis incr error for key {key}: {e}")
-            return 1
+        except RedisError as e:
+            for _, bucket, admitted in flushes:
+                bucket.pending += admitted
+            log_redis_error("rate limit sync", e)
+            return
+
+        for (key, bucket, _), (_, remaining, reset_ms) in zip(flushes, results):
+            self.refill(key, bucket.limit, bucket.window, remaining, reset_ms)
 
 
 # Custom key function to identify clients
@@ -58,33 +265,172 @@ def get_client_id(request: Request) -> str:
         return f"user:{user_id}"
 
     # Fall back to IP address
-    client_ip = get_remote_address(request)
+    client_ip = request.client.host if request.client else "127.0.0.1"
     return f"ip:{client_ip}"
 
 
+@lru_cache(maxsize=None)
+def endpoint_hash(method: str, route_template: str) -> str:
+    # Hashed once per route, so keys stay short for long templates
+    return hashlib.md5(f"{method}:{route_template}".encode()).hexdigest()[:8]
+
+
 def get_endpoint_key(request: Request) -> str:
-    """Generate rate limit key based on endpoint and client"""
+    """Generate rate limit key based on endpoint and client.
+
+    Endpoints are route templates, so one client shares a bucket across
+    every id in the path.
+    """
     client_id = get_client_id(request)
-    endpoint = f"{request.method}:{request.url.path}"
+    endpoint = endpoint_hash(request.method, request_endpoint(request))
+    return f"rate_limit:{client_id}:{endpoint}"
 
-    # Create a hash for long URLs
-    endpoint_hash = hashlib.md5(endpoint.encode()).hexdigest()[:8]
 
-    return f"rate_limit:{client_id}:{endpoint_hash}"
+def rate_limit_cost_key(key: str) -> str:
+    """Generate key for the costs charged under a rate limit key"""
+    return f"{key}:cost"
+
+
+def request_cost_units(cost: RequestCost) -> float:
+    """Weigh the DB work of a request in rate limit cost units"""
+    return (
+        RATE_LIMIT_COST_BASE
+        + cost.db_calls * RATE_LIMIT_COST_DB_CALL
+        + cost.db_rows * RATE_LIMIT_COST_DB_ROW
+        + cost.db_seconds * RATE_LIMIT_COST_DB_SECOND
+    )
+
+
+# Expected cost of each route, by method and route template, charged up front
+# since the measured cost is only known once the response is sent
+expected_costs: Dict[Tuple[str, str], float] = {}
+
+
+class RateLimitCharge:
+    """A request's up front charge, settled against its measured cost"""
+
+    def __init__(self, key: str, limit: int, window: int, route, charged: float):
+        self.key = key
+        self.limit = limit
+        self.window = window
+        self.route = route
+        self.charged = charged
+        self.cost = RequestCost()
+
+    def settle(self):
+        measured = request_cost_units(self.cost)
+        expected = expected_costs.get(self.route, DEFAULT_REQUEST_COST)
+        expected_costs[self.route] = expected + EXPECTED_COST_WEIGHT * (
+            measured - expected
+        )
+        limiter.settle(self.key, self.limit, self.window, measured - self.charged)
 
 
 # Initialize with a placeholder - will be updated with Redis client
-limiter = Limiter(key_func=get_endpoint_key, default_limits=["1000/hour", "100/minute"])
+limiter = SlidingWindowLimiter(local_share=RATE_LIMIT_LOCAL_SHARE)
 
 
 async def init_rate_limiter():
     """Initialize rate limiter with Redis storage"""
-    redis_client = get_redis()
-    storage = RedisStorage(redis_client)
-    limiter.storage = storage
+    limiter.redis_client = get_redis()
     logger.info("Rate limiter initialized with Redis storage")
 
 
+async def sync_rate_limits():
+    """Record locally charged costs in Redis every RATE_LIMIT_SYNC_INTERVAL ms"""
+    while True:
+        try:
+            await limiter.sync()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error syncing rate limits: {str(e)}")
+        await asyncio.sleep(RATE_LIMIT_SYNC_INTERVAL / 1000)
+
+
+def rate_limit_headers(result: RateLimitResult) -> Dict[str, str]:
+    # Round up, so a client waiting Reset seconds is never still limited
+    reset = -(-result.reset_ms // 1000)
+    headers = {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+        "X-RateLimit-Reset": str(reset),
+    }
+    if not result.allowed:
+        headers["Retry-After"] = str(reset)
+    return headers
+
+
+def rate_limit(limit: int, window: int, cost_aware: bool = True):
+    """Limit an endpoint to limit cost units per window seconds for each client.
+
+    Cost aware endpoints are charged their route's expected cost up front and
+    settled to the cost measured once the response is sent (see
+    request_cost_units). Otherwise each request costs one unit. The endpoint
+    must take a `request: Request` argument.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs["request"]
+            key = get_endpoint_key(request)
+            route = (request.method, request_endpoint(request))
+            charged = DEFAULT_REQUEST_COST
+            if cost_aware:
+                # Capped, so a route costlier than the limit is not always denied
+                charged = min(expected_costs.get(route, DEFAULT_REQUEST_COST), limit)
+
+            result = await limiter.hit(key, limit, window, charged)
+            request.state.rate_limit = result
+            if not result.allowed:
+                unit = "cost units" if cost_aware else "requests"
+                raise RateLimitExceeded(result, f"{limit} {unit} per {window} seconds")
+            if cost_aware:
+                charge = RateLimitCharge(key, limit, window, route, charged)
+                request.state.rate_limit_charge = charge
+                request_cost.set(charge.cost)
+            log_rate_limit(
+                get_client_id(request),
+                f"{request.method}:{request.url.path}",
+                result.remaining,
+            )
+
+            if asyncio.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            return await run_in_threadpool(func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+async def rate_limit_middleware(request: Request, call_next):
+    """Add X-RateLimit-* headers to responses of rate limited endpoints, and
+    settle their charge once the response body is sent"""
+    response = await call_next(request)
+    result: Optional[RateLimitResult] = getattr(request.state, "rate_limit", None)
+    if result is not None:
+        response.headers.update(rate_limit_headers(result))
+
+    charge: Optional[RateLimitCharge] = getattr(
+        request.state, "rate_limit_charge", None
+    )
+    if charge is not None:
+        # Streamed lists read the DB while the body is sent
+        body = response.body_iterator
+
+        async def settled_body():
+            try:
+                async for chunk in body:
+                    yield chunk
+            finally:
+                charge.settle()
+
+        response.body_iterator = settled_body()
+    return response
+
+
 # Custom rate limit exceeded handler
 async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
     client_id = get_client_id(request)
@@ -94,33 +440,39 @@ async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
         f"RATE_LIMIT_EXCEEDED | Client: {client_id} | Endpoint: {endpoint} | "
         f"Limit: {exc.detail}"
     )
+    track_rate_limit_hit(f"{request.method}:{request_endpoint(request)}")
 
-    return HTTPException(
+    headers = rate_limit_headers(exc.result)
+    return JSONResponse(
         status_code=429,
-        detail={
-            "error": "Rate limit exceeded",
-            "message": f"Too many requests. Limit: {exc.detail}",
-            "retry_after": getattr(exc, "retry_after", 60),
+        content={
+            "detail": {
+                "error": "Rate limit exceeded",
+                "message": f"Too many requests. Limit: {exc.detail}",
+                "retry_after": int(headers["Retry-After"]),
+            }
         },
+        headers=headers,
     )
 
 
 # Rate limiting decorators for different tiers
 def basic_rate_limit():
-    """Basic rate limiting: 60 requests per minute"""
-    return limiter.limit("60/minute")
+    """Basic rate limiting: 60 cost units per minute"""
+    return rate_limit(60, 60)
 
 
 def strict_rate_limit():
-    """Strict rate limiting: 20 requests per minute"""
-    return limiter.limit("20/minute")
+    """Strict rate limiting: 20 cost units per minute"""
+    return rate_limit(20, 60)
 
 
 def auth_rate_limit():
-    """Authentication endpoint rate limiting: 5 requests per minute"""
-    return limiter.limit("5/minute")
+    """Authentication endpoint rate limiting: 5 requests per minute, whatever
+    they cost, since sign-in attempts must stay scarce"""
+    return rate_limit(5, 60, cost_aware=False)
 
 
 def expensive_rate_limit():
-    """Expensive operation rate limiting: 10 requests per minute"""
-    return limiter.limit("10/minute")
+    """Expensive operation rate limiting: 10 cost units per minute"""
+    return rate_limit(10, 60)
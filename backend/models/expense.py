@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 
 # class ExpenseIn(BaseModel):
@@ -34,3 +34,4 @@ class ExpenseCreate(BaseModel):
 
 class ExpenseListResponse(BaseModel):
     expenses: List[dict]
+    next_cursor: Optional[str] = None
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -12,6 +12,7 @@ class GroupUpdate(BaseModel):
 
 class GroupListResponse(BaseModel):
     groups: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
 
 
 class GroupResponse(BaseModel):
@@ -24,3 +25,10 @@ class GroupPersonsResponse(BaseModel):
 
 class GroupBalancesResponse(BaseModel):
     balances: Dict[str, Dict[str, Any]]
+
+
+class GroupSnapshotResponse(BaseModel):
+    group: Dict[str, Any]
+    persons: List[Dict[str, Any]]
+    expenses: List[Dict[str, Any]]
+    balances: Dict[str, Dict[str, Any]]
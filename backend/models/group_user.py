@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -14,3 +14,4 @@ class GroupUserUpdate(BaseModel):
 
 class GroupUsersListResponse(BaseModel):
     members: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -16,3 +16,4 @@ class PersonUpdate(BaseModel):
 
 class PersonListResponse(BaseModel):
     persons: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
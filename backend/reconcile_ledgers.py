@@ -0,0 +1,80 @@
+"""Rebuild group balance ledgers in Redis from the database.
+
+Usage:
+    python reconcile_ledgers.py              # all groups
+    python reconcile_ledgers.py <group_id>   # specific groups
+"""
+
+import asyncio
+import sys
+
+from dependencies import close_db, get_redis, get_supabase
+from helpers.group_helpers import calculate_group_balances, get_all_groups_from_db
+from helpers.ledger_helpers import (
+    get_ledger_balances,
+    get_ledger_fill_target,
+    store_group_ledger,
+)
+from middlewares.logger import get_logger
+
+logger = get_logger()
+
+# Differences below this are float noise from HINCRBYFLOAT, not drift
+DRIFT_TOLERANCE = 1e-6
+
+
+async def reconcile_group(redis_client, supabase, group_id: str):
+    """Rebuild one group ledger and return the ids of persons that drifted"""
+    # A ledger patched while the DB is read is left for the next run
+    cache_key, version = await get_ledger_fill_target(redis_client, group_id)
+    balances = await calculate_group_balances(supabase, group_id)
+    persons = [
+        {"id": person_id, "name": d["name"]} for person_id, d in balances.items()
+    ]
+
+    current = await get_ledger_balances(redis_client, group_id, persons)
+    drifted = []
+    if current is not None:
+        for person_id, expected in balances.items():
+            actual = current[person_id]
+            if (
+                abs(actual["paid"] - expected["paid"]) > DRIFT_TOLERANCE
+                or abs(actual["owes"] - expected["owes"]) > DRIFT_TOLERANCE
+            ):
+                drifted.append(person_id)
+
+    await store_group_ledger(redis_client, cache_key, balances, version)
+    return drifted
+
+
+async def reconcile(group_ids):
+    redis_client = get_redis()
+    supabase = get_supabase()
+
+    try:
+        if not group_ids:
+            groups = await get_all_groups_from_db(supabase)
+            group_ids = [group["id"] for group in groups]
+
+        for group_id in group_ids:
+            try:
+                drifted = await reconcile_group(redis_client, supabase, group_id)
+            except Exception as e:
+                logger.error(
+                    f"Ledger reconcile failed | Group: {group_id} | Error: {str(e)}"
+                )
+                continue
+
+            if drifted:
+                logger.warning(
+                    f"Ledger drift fixed | Group: {group_id} | Persons: {', '.join(drifted)}"
+                )
+            else:
+                logger.info(f"Ledger reconciled | Group: {group_id}")
+    finally:
+        await close_db()
+        await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(reconcile(sys.argv[1:]))
@@ -1,21 +1,48 @@
+from config import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
 from dependencies import get_redis, get_supabase
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from typing import Optional
 import time
 
 # Models
 from models.debtor import ExpenseDebtorIn, ExpenseDebtorUpdate, DebtorListResponse
 
 # Helpers
-from helpers.cache_helpers import get_cached_items, cache_items, invalidate_cache
+from helpers.cache_helpers import (
+    get_cache_version,
+    get_cached_items,
+    get_cached_items_stream,
+    stream_and_cache_items,
+    get_cached_response,
+    cache_response,
+    get_group_generation,
+    get_cached_page,
+    cache_page,
+)
 from helpers.debtor_helpers import (
-    get_all_debtors_from_db,
-    get_group_debtors_from_db,
+    get_debtors_page_from_db,
+    stream_group_debtors_from_db,
     create_debtor_record,
-    get_debtor_expense_id,
+    get_debtor_by_id_from_db,
     get_expense_group_id_from_expense,
     delete_debtor_from_db,
     update_debtor_in_db,
 )
+from helpers.ledger_helpers import (
+    apply_ledger_deltas,
+    begin_ledger_change,
+    debtor_ledger_deltas,
+    merge_ledger_deltas,
+)
+from helpers.fetch_helpers import build_projection
+from helpers.stream_helpers import (
+    encoded_batches,
+    list_response,
+    read_first_batch,
+    timed_db_stream,
+    wants_ndjson,
+)
+from helpers.invalidation_helpers import apply_cache_change
 
 # Middlewares
 from middlewares.rate_limiter import (
@@ -27,7 +54,11 @@ from middlewares.logger import get_logger, log_cache_operation, log_database_ope
 from middlewares.monitoring import track_cache_operation, track_database_operation
 
 # Constants
-from constants.cache_keys import DEBTORS_ALL, group_debtors_cache_key
+from constants.cache_keys import (
+    DEBTORS_ALL,
+    group_debtors_cache_key,
+    list_page_cache_field,
+)
 from constants.api_messages import SuccessMessages, ErrorMessages
 
 router = APIRouter(
@@ -43,46 +74,65 @@ logger = get_logger()
 async def get_debtors(
     request: Request,
     background_tasks: BackgroundTasks,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
     redis_client=Depends(get_redis),
     supabase=Depends(get_supabase),
 ):
     cache_key = DEBTORS_ALL
     start_time = time.time()
 
-    logger.info("Fetching all debtors")
+    try:
+        columns = build_projection(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page_field = list_page_cache_field(limit, after, columns)
+
+    logger.info(f"Fetching debtors page | Limit: {limit} | After: {after}")
 
     try:
         # Try to get from cache
-        debtors = await get_cached_items(redis_client, cache_key)
+        page = await get_cached_page(redis_client, cache_key, page_field)
 
-        if debtors:
+        if page:
             log_cache_operation("get", cache_key, True)
             track_cache_operation("get", True)
-            logger.info(f"Debtors retrieved from cache | Count: {len(debtors)}")
+            logger.info(f"Debtors retrieved from cache | Count: {len(page['items'])}")
         else:
             log_cache_operation("get", cache_key, False)
             track_cache_operation("get", False)
 
-            # Get from database
+            # Get from database, reading the version first so the page is
+            # not cached if the list is invalidated meanwhile
+            version = await get_cache_version(redis_client, cache_key)
             db_start = time.time()
-            debtors = await get_all_debtors_from_db(supabase)
+            page = await get_debtors_page_from_db(supabase, limit, after, columns)
             db_duration = time.time() - db_start
 
             log_database_operation("select", "debtors", db_duration)
             track_database_operation("select", "debtors", db_duration)
 
-            # Cache the results
-            cache_items(background_tasks, redis_client, cache_key, debtors)
+            # Cache the page under its cursor
+            cache_page(
+                background_tasks, redis_client, cache_key, page_field, page, version
+            )
             log_cache_operation("set", cache_key)
 
             logger.info(
-                f"Debtors retrieved from database | Count: {len(debtors)} | DB Duration: {db_duration:.3f}s"
+                f"Debtors retrieved from database | Count: {len(page['items'])} | DB Duration: {db_duration:.3f}s"
             )
 
         total_duration = time.time() - start_time
         logger.info(f"Get debtors completed | Total Duration: {total_duration:.3f}s")
 
-        return DebtorListResponse(debtors=debtors)
+        return list_response(
+            request,
+            "debtors",
+            encoded_batches(page["items"]),
+            {"next_cursor": page["next_cursor"]},
+        )
 
     except Exception as e:
         logger.error(f"Error fetching debtors: {str(e)}")
@@ -100,47 +150,73 @@ async def get_debtors_for_group(
     redis_client=Depends(get_redis),
     supabase=Depends(get_supabase),
 ):
-    cache_key = group_debtors_cache_key(group_id)
+    generation = await get_group_generation(redis_client, group_id)
+    cache_key = group_debtors_cache_key(group_id, generation)
     start_time = time.time()
 
     logger.info(f"Fetching debtors for group | ID: {group_id}")
 
     try:
-        # Try to get from cache
-        debtors = await get_cached_items(redis_client, cache_key)
+        # Serve the cached response body as is, skipping decode and validation
+        cached_response = await get_cached_response(redis_client, cache_key, request)
+        if cached_response:
+            log_cache_operation("get", cache_key, True)
+            track_cache_operation("get", True)
+            logger.info(f"Group debtors response served from cache | Group: {group_id}")
+            return cached_response
 
-        if debtors:
+        # Stream large cached lists from Redis instead of reading them whole
+        streamed_response = await get_cached_items_stream(
+            redis_client, cache_key, "debtors", request
+        )
+        if streamed_response:
             log_cache_operation("get", cache_key, True)
             track_cache_operation("get", True)
-            logger.info(
-                f"Group debtors retrieved from cache | Group: {group_id} | Count: {len(debtors)}"
-            )
-        else:
-            log_cache_operation("get", cache_key, False)
-            track_cache_operation("get", False)
+            logger.info(f"Group debtors streamed from cache | Group: {group_id}")
+            return streamed_response
 
-            # Get from database
-            db_start = time.time()
-            debtors = await get_group_debtors_from_db(supabase, group_id)
-            db_duration = time.time() - db_start
+        # Read the version before the data, so the cache writes below are
+        # refused if the key is invalidated meanwhile
+        version = await get_cache_version(redis_client, cache_key)
 
-            log_database_operation("select", "debtors", db_duration)
-            track_database_operation("select", "debtors", db_duration)
+        # Try to get from cache
+        debtors = await get_cached_items(redis_client, cache_key)
 
-            # Cache the results
-            cache_items(background_tasks, redis_client, cache_key, debtors)
-            log_cache_operation("set", cache_key)
+        if debtors is None:
+            log_cache_operation("get", cache_key, False)
+            track_cache_operation("get", False)
 
-            logger.info(
-                f"Group debtors retrieved from database | Group: {group_id} | Count: {len(debtors)} | DB Duration: {db_duration:.3f}s"
+            # Stream from database page by page, caching rows as they pass
+            rows = timed_db_stream(
+                stream_group_debtors_from_db(supabase, group_id), "select", "debtors"
+            )
+            # The first page is read before responding, so a DB error is
+            # still a 500 instead of a truncated 200
+            batches = await read_first_batch(
+                stream_and_cache_items(redis_client, cache_key, rows, version)
             )
+            log_cache_operation("set", cache_key)
+            logger.info(f"Group debtors streaming from database | Group: {group_id}")
+            return list_response(request, "debtors", batches)
+
+        log_cache_operation("get", cache_key, True)
+        track_cache_operation("get", True)
+        logger.info(
+            f"Group debtors retrieved from cache | Group: {group_id} | Count: {len(debtors)}"
+        )
 
         total_duration = time.time() - start_time
         logger.info(
             f"Get group debtors completed | Group: {group_id} | Total Duration: {total_duration:.3f}s"
         )
 
-        return DebtorListResponse(debtors=debtors)
+        if wants_ndjson(request):
+            return list_response(request, "debtors", encoded_batches(debtors))
+
+        response = DebtorListResponse(debtors=debtors)
+        cache_response(background_tasks, redis_client, cache_key, response, version)
+
+        return response
 
     except Exception as e:
         logger.error(
@@ -172,6 +248,11 @@ async def add_debtor(
         log_database_operation("select", "expenses", db_duration)
         track_database_operation("select", "expenses", db_duration)
 
+        # Fence off ledger rebuilds that would miss or double count the debtor
+        ledger_version = None
+        if group_id:
+            ledger_version = await begin_ledger_change(redis_client, group_id)
+
         db_start = time.time()
         debtor_data = await create_debtor_record(supabase, debtor)
         db_duration = time.time() - db_start
@@ -183,15 +264,19 @@ async def add_debtor(
             logger.error("Failed to create debtor record")
             raise HTTPException(500, ErrorMessages.ERROR_ADDING_DEBTOR)
 
-        # Invalidate caches
-        global_cache_key = DEBTORS_ALL
-        invalidate_cache(background_tasks, redis_client, global_cache_key)
-        log_cache_operation("invalidate", global_cache_key)
-
+        # Apply the new debtor to the group balance ledger
         if group_id:
-            group_cache_key = group_debtors_cache_key(group_id)
-            invalidate_cache(background_tasks, redis_client, group_cache_key)
-            log_cache_operation("invalidate", group_cache_key)
+            await apply_ledger_deltas(
+                redis_client,
+                group_id,
+                debtor_ledger_deltas(debtor_data),
+                ledger_version,
+            )
+
+        # Drop every cached view built from the group's debtors
+        await apply_cache_change(
+            background_tasks, redis_client, "expenses_debtors", group_id=group_id
+        )
 
         total_duration = time.time() - start_time
         logger.info(
@@ -221,18 +306,20 @@ async def delete_debtor(
     logger.info(f"Deleting debtor | ID: {debtor_id}")
 
     try:
-        # Get expense_id and group_id for cache invalidation
+        # Get debtor and group_id for cache invalidation and ledger update
         db_start = time.time()
-        expense_id = await get_debtor_expense_id(supabase, debtor_id)
+        old_debtor = await get_debtor_by_id_from_db(supabase, debtor_id)
         db_duration = time.time() - db_start
 
         log_database_operation("select", "debtors", db_duration)
         track_database_operation("select", "debtors", db_duration)
 
-        if expense_id is None:
+        if old_debtor is None:
             logger.warning(f"Debtor not found | ID: {debtor_id}")
             raise HTTPException(404, ErrorMessages.DEBTOR_NOT_FOUND)
 
+        expense_id = old_debtor["expense_id"]
+
         db_start = time.time()
         group_id = await get_expense_group_id_from_expense(supabase, expense_id)
         db_duration = time.time() - db_start
@@ -240,6 +327,10 @@ async def delete_debtor(
         log_database_operation("select", "expenses", db_duration)
         track_database_operation("select", "expenses", db_duration)
 
+        ledger_version = None
+        if group_id:
+            ledger_version = await begin_ledger_change(redis_client, group_id)
+
         # Delete debtor
         db_start = time.time()
         response = await delete_debtor_from_db(supabase, debtor_id)
@@ -252,15 +343,19 @@ async def delete_debtor(
             logger.warning(f"Debtor deletion failed | ID: {debtor_id}")
             raise HTTPException(404, ErrorMessages.DEBTOR_NOT_FOUND)
 
-        # Invalidate caches
-        global_cache_key = DEBTORS_ALL
-        invalidate_cache(background_tasks, redis_client, global_cache_key)
-        log_cache_operation("invalidate", global_cache_key)
-
+        # Remove the debtor from the group balance ledger
         if group_id:
-            group_cache_key = group_debtors_cache_key(group_id)
-            invalidate_cache(background_tasks, redis_client, group_cache_key)
-            log_cache_operation("invalidate", group_cache_key)
+            await apply_ledger_deltas(
+                redis_client,
+                group_id,
+                debtor_ledger_deltas(old_debtor, sign=-1),
+                ledger_version,
+            )
+
+        # Drop every cached view built from the group's debtors
+        await apply_cache_change(
+            background_tasks, redis_client, "expenses_debtors", group_id=group_id
+        )
 
         total_duration = time.time() - start_time
         logger.info(
@@ -289,18 +384,20 @@ async def update_debtor(
     logger.info(f"Updating debtor | ID: {debtor_id}")
 
     try:
-        # Get expense_id and group_id for cache invalidation
+        # Get debtor and group_id for cache invalidation and ledger update
         db_start = time.time()
-        expense_id = await get_debtor_expense_id(supabase, debtor_id)
+        old_debtor = await get_debtor_by_id_from_db(supabase, debtor_id)
         db_duration = time.time() - db_start
 
         log_database_operation("select", "debtors", db_duration)
         track_database_operation("select", "debtors", db_duration)
 
-        if expense_id is None:
+        if old_debtor is None:
             logger.warning(f"Debtor not found for update | ID: {debtor_id}")
             raise HTTPException(404, ErrorMessages.DEBTOR_NOT_FOUND)
 
+        expense_id = old_debtor["expense_id"]
+
         db_start = time.time()
         group_id = await get_expense_group_id_from_expense(supabase, expense_id)
         db_duration = time.time() - db_start
@@ -308,6 +405,10 @@ async def update_debtor(
         log_database_operation("select", "expenses", db_duration)
         track_database_operation("select", "expenses", db_duration)
 
+        ledger_version = None
+        if group_id:
+            ledger_version = await begin_ledger_change(redis_client, group_id)
+
         # Update debtor
         db_start = time.time()
         response = await update_debtor_in_db(supabase, debtor_id, debtor)
@@ -320,15 +421,43 @@ async def update_debtor(
             logger.warning(f"Debtor update failed | ID: {debtor_id}")
             raise HTTPException(404, ErrorMessages.DEBTOR_NOT_FOUND)
 
-        # Invalidate caches
-        global_cache_key = DEBTORS_ALL
-        invalidate_cache(background_tasks, redis_client, global_cache_key)
-        log_cache_operation("invalidate", global_cache_key)
+        # Move the debtor in the group balance ledger
+        debtor_data = response[0]
+        old_deltas = debtor_ledger_deltas(old_debtor, sign=-1)
+        new_deltas = debtor_ledger_deltas(debtor_data)
 
-        if group_id:
-            group_cache_key = group_debtors_cache_key(group_id)
-            invalidate_cache(background_tasks, redis_client, group_cache_key)
-            log_cache_operation("invalidate", group_cache_key)
+        new_group_id = group_id
+        if debtor_data["expense_id"] != expense_id:
+            new_group_id = await get_expense_group_id_from_expense(
+                supabase, debtor_data["expense_id"]
+            )
+
+        if new_group_id == group_id:
+            if group_id:
+                await apply_ledger_deltas(
+                    redis_client,
+                    group_id,
+                    merge_ledger_deltas(old_deltas, new_deltas),
+                    ledger_version,
+                )
+        else:
+            if group_id:
+                await apply_ledger_deltas(
+                    redis_client, group_id, old_deltas, ledger_version
+                )
+            # The new group was not fenced before the write, so its ledger
+            # is dropped and rebuilt
+            if new_group_id:
+                await apply_ledger_deltas(redis_client, new_group_id, new_deltas, None)
+
+        # Drop every cached view built from the debtors of both groups
+        for changed_group_id in {group_id, new_group_id}:
+            await apply_cache_change(
+                background_tasks,
+                redis_client,
+                "expenses_debtors",
+                group_id=changed_group_id,
+            )
 
         total_duration = time.time() - start_time
         logger.info(
@@ -1,5 +1,8 @@
+from config import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
 from dependencies import get_redis, get_supabase
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from functools import partial
+from typing import Optional
 import time
 
 # Models
@@ -7,20 +10,27 @@ from models.expense import ExpenseListResponse, ExpenseCreate, ExpenseUpdate
 
 # Helpers
 from helpers.cache_helpers import (
-    get_cached_items,
-    cache_items,
-    invalidate_cache,
-    update_item_cache,
-    remove_item_from_cache,
+    get_cache_version,
+    get_cached_page_swr,
+    cache_page,
 )
 from helpers.expense_helpers import (
-    get_all_expenses_from_db,
+    get_expenses_page_from_db,
     create_expense_record,
     create_debtors_records,
-    get_expense_group_id,
+    get_expense_with_debtors_from_db,
     delete_expense_from_db,
     update_expense_in_db,
 )
+from helpers.ledger_helpers import (
+    apply_ledger_deltas,
+    begin_ledger_change,
+    expense_ledger_deltas,
+    merge_ledger_deltas,
+)
+from helpers.fetch_helpers import build_projection
+from helpers.stream_helpers import encoded_batches, list_response
+from helpers.invalidation_helpers import apply_cache_change
 
 # Middlewares
 from middlewares.rate_limiter import (
@@ -34,8 +44,7 @@ from middlewares.monitoring import track_cache_operation, track_database_operati
 # Constants
 from constants.cache_keys import (
     EXPENSES_ALL,
-    group_expenses_cache_key,
-    group_balances_cache_key,
+    list_page_cache_field,
 )
 from constants.api_messages import SuccessMessages, ErrorMessages
 
@@ -53,46 +62,73 @@ logger = get_logger()
 async def get_expenses(
     request: Request,
     background_tasks: BackgroundTasks,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
     redis_client=Depends(get_redis),
     supabase=Depends(get_supabase),
 ):
     cache_key = EXPENSES_ALL
     start_time = time.time()
 
-    logger.info("Fetching all expenses")
+    try:
+        columns = build_projection(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page_field = list_page_cache_field(limit, after, columns)
+
+    logger.info(f"Fetching expenses page | Limit: {limit} | After: {after}")
 
     try:
-        # Try to get from cache
-        expenses = await get_cached_items(redis_client, cache_key)
+        load_page = partial(get_expenses_page_from_db, supabase, limit, after, columns)
 
-        if expenses:
+        # Try to get from cache, serving stale pages while they refresh
+        page = await get_cached_page_swr(
+            background_tasks,
+            redis_client,
+            cache_key,
+            page_field,
+            load_page,
+        )
+
+        if page:
             log_cache_operation("get", cache_key, True)
             track_cache_operation("get", True)
-            logger.info(f"Expenses retrieved from cache | Count: {len(expenses)}")
+            logger.info(f"Expenses retrieved from cache | Count: {len(page['items'])}")
         else:
             log_cache_operation("get", cache_key, False)
             track_cache_operation("get", False)
 
-            # Get from database
+            # Get from database, reading the version first so the page is
+            # not cached if the list is invalidated meanwhile
+            version = await get_cache_version(redis_client, cache_key)
             db_start = time.time()
-            expenses = await get_all_expenses_from_db(supabase)
+            page = await load_page()
             db_duration = time.time() - db_start
 
             log_database_operation("select", "expenses", db_duration)
             track_database_operation("select", "expenses", db_duration)
 
-            # Cache the results
-            cache_items(background_tasks, redis_client, cache_key, expenses)
+            # Cache the page under its cursor
+            cache_page(
+                background_tasks, redis_client, cache_key, page_field, page, version
+            )
             log_cache_operation("set", cache_key)
 
             logger.info(
-                f"Expenses retrieved from database | Count: {len(expenses)} | DB Duration: {db_duration:.3f}s"
+                f"Expenses retrieved from database | Count: {len(page['items'])} | DB Duration: {db_duration:.3f}s"
             )
 
         total_duration = time.time() - start_time
         logger.info(f"Get expenses completed | Total Duration: {total_duration:.3f}s")
 
-        return ExpenseListResponse(expenses=expenses)
+        return list_response(
+            request,
+            "expenses",
+            encoded_batches(page["items"]),
+            {"next_cursor": page["next_cursor"]},
+        )
 
     except Exception as e:
         logger.error(f"Error fetching expenses: {str(e)}")
@@ -128,6 +164,9 @@ async def add_expense(
         raise HTTPException(status_code=400, detail="At least one debtor is required")
 
     try:
+        # Fence off ledger rebuilds that would miss or double count the expense
+        ledger_version = await begin_ledger_change(redis_client, expense.group_id)
+
         # Create expense with timing
         db_start = time.time()
         expense_data = await create_expense_record(supabase, expense)
@@ -152,23 +191,29 @@ async def add_expense(
         log_database_operation("insert", "expense_debtors", db_duration)
         track_database_operation("insert", "expense_debtors", db_duration)
 
-        # Update cache in multiple locations
-        global_cache_key = EXPENSES_ALL
-        group_cache_key = group_expenses_cache_key(expense.group_id)
+        # Apply the new expense to the group balance ledger
+        await apply_ledger_deltas(
+            redis_client,
+            expense.group_id,
+            expense_ledger_deltas(expense_data, debtors_data or []),
+            ledger_version,
+        )
 
-        update_item_cache(
-            background_tasks, redis_client, global_cache_key, expense_data
+        # Update every cached view built from the expense and its debtors
+        await apply_cache_change(
+            background_tasks,
+            redis_client,
+            "expenses",
+            group_id=expense.group_id,
+            row=expense_data,
         )
-        update_item_cache(
+        await apply_cache_change(
             background_tasks,
             redis_client,
-            group_cache_key,
-            expense_data,
+            "expenses_debtors",
+            group_id=expense.group_id,
         )
 
-        log_cache_operation("update", global_cache_key)
-        log_cache_operation("update", group_cache_key)
-
         total_duration = time.time() - start_time
         logger.info(
             f"Expense added successfully | ID: {expense_data['id']} | Total Duration: {total_duration:.3f}s"
@@ -199,18 +244,21 @@ async def delete_expense(
     logger.info(f"Deleting expense | ID: {expense_id}")
 
     try:
-        # Get group_id before deletion
+        # Get expense and its debtors before deletion
         db_start = time.time()
-        group_id = await get_expense_group_id(supabase, expense_id)
+        old_expense = await get_expense_with_debtors_from_db(supabase, expense_id)
         db_duration = time.time() - db_start
 
         log_database_operation("select", "expenses", db_duration)
         track_database_operation("select", "expenses", db_duration)
 
-        if group_id is None:
+        if old_expense is None:
             logger.warning(f"Expense not found | ID: {expense_id}")
             raise HTTPException(status_code=404, detail=ErrorMessages.EXPENSE_NOT_FOUND)
 
+        group_id = old_expense["group_id"]
+        ledger_version = await begin_ledger_change(redis_client, group_id)
+
         # Delete expense
         db_start = time.time()
         response = await delete_expense_from_db(supabase, expense_id)
@@ -223,23 +271,25 @@ async def delete_expense(
             logger.warning(f"Expense deletion failed | ID: {expense_id}")
             raise HTTPException(status_code=404, detail=ErrorMessages.EXPENSE_NOT_FOUND)
 
-        # Remove from cache in multiple locations
-        global_cache_key = EXPENSES_ALL
-
-        remove_item_from_cache(
-            background_tasks, redis_client, global_cache_key, expense_id
+        # Remove the expense from the group balance ledger
+        await apply_ledger_deltas(
+            redis_client,
+            group_id,
+            expense_ledger_deltas(old_expense, old_expense["debtors"], sign=-1),
+            ledger_version,
         )
-        log_cache_operation("delete", global_cache_key)
 
-        if group_id:
-            group_cache_key = group_expenses_cache_key(group_id)
-            remove_item_from_cache(
-                background_tasks, redis_client, group_cache_key, expense_id
-            )
-            balances_cache_key = group_balances_cache_key(group_id)
-            invalidate_cache(background_tasks, redis_client, balances_cache_key)
-            log_cache_operation("delete", group_cache_key)
-            log_cache_operation("invalidate", balances_cache_key)
+        # Drop the expense, and its cascaded debtors, from every cached view
+        await apply_cache_change(
+            background_tasks,
+            redis_client,
+            "expenses",
+            group_id=group_id,
+            deleted_id=expense_id,
+        )
+        await apply_cache_change(
+            background_tasks, redis_client, "expenses_debtors", group_id=group_id
+        )
 
         total_duration = time.time() - start_time
         logger.info(
@@ -273,18 +323,21 @@ async def update_expense(
     logger.info(f"Updating expense | ID: {expense_id}")
 
     try:
-        # Get group_id for cache update
+        # Get current expense and debtors for cache and ledger update
         db_start = time.time()
-        group_id = await get_expense_group_id(supabase, expense_id)
+        old_expense = await get_expense_with_debtors_from_db(supabase, expense_id)
         db_duration = time.time() - db_start
 
         log_database_operation("select", "expenses", db_duration)
         track_database_operation("select", "expenses", db_duration)
 
-        if group_id is None:
+        if old_expense is None:
             logger.warning(f"Expense not found for update | ID: {expense_id}")
             raise HTTPException(status_code=404, detail=ErrorMessages.EXPENSE_NOT_FOUND)
 
+        group_id = old_expense["group_id"]
+        ledger_version = await begin_ledger_change(redis_client, group_id)
+
         # Update expense
         db_start = time.time()
         response = await update_expense_in_db(supabase, expense_id, expense)
@@ -297,21 +350,56 @@ async def update_expense(
             logger.warning(f"Expense update failed | ID: {expense_id}")
             raise HTTPException(status_code=404, detail=ErrorMessages.EXPENSE_NOT_FOUND)
 
-        # Update cache in multiple locations
         expense_data = response.data[0]
-        global_cache_key = EXPENSES_ALL
 
-        update_item_cache(
-            background_tasks, redis_client, global_cache_key, expense_data
-        )
-        log_cache_operation("update", global_cache_key)
+        # Move the expense in the group balance ledger. Debtor rows are not
+        # changed by an expense update, so they carry over as they were
+        old_deltas = expense_ledger_deltas(old_expense, old_expense["debtors"], sign=-1)
+        new_deltas = expense_ledger_deltas(expense_data, old_expense["debtors"])
+
+        if expense_data["group_id"] == group_id:
+            await apply_ledger_deltas(
+                redis_client,
+                group_id,
+                merge_ledger_deltas(old_deltas, new_deltas),
+                ledger_version,
+            )
+        else:
+            await apply_ledger_deltas(
+                redis_client, group_id, old_deltas, ledger_version
+            )
+            # The new group was not fenced before the write, so its ledger
+            # is dropped and rebuilt
+            await apply_ledger_deltas(
+                redis_client, expense_data["group_id"], new_deltas, None
+            )
 
-        if group_id:
-            group_cache_key = group_expenses_cache_key(group_id)
-            update_item_cache(
-                background_tasks, redis_client, group_cache_key, expense_data
+        # Update every cached view built from the expense. Its debtors move
+        # along with it when the group changes
+        new_group_id = expense_data["group_id"]
+        if new_group_id != group_id:
+            await apply_cache_change(
+                background_tasks,
+                redis_client,
+                "expenses",
+                group_id=group_id,
+                deleted_id=expense_id,
             )
-            log_cache_operation("update", group_cache_key)
+            for changed_group_id in (group_id, new_group_id):
+                await apply_cache_change(
+                    background_tasks,
+                    redis_client,
+                    "expenses_debtors",
+                    group_id=changed_group_id,
+                )
+        await apply_cache_change(
+            background_tasks,
+            redis_client,
+            "expenses",
+            group_id=new_group_id,
+            row=expense_data,
+            columns=expense.model_dump(exclude_unset=True).keys(),
+        )
 
         total_duration = time.time() - start_time
         logger.info(
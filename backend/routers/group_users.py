@@ -1,19 +1,27 @@
+from config import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
 from dependencies import get_redis, get_supabase
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from typing import Optional
 import time
 
 # Models
 from models.group_user import GroupUserIn, GroupUserUpdate, GroupUsersListResponse
 
 # Helpers
-from helpers.cache_helpers import get_cached_items, cache_items, invalidate_cache
+from helpers.cache_helpers import (
+    get_cache_version,
+    get_cached_page,
+    cache_page,
+)
 from helpers.member_helpers import (
-    get_all_members_from_db,
+    get_members_page_from_db,
     create_member_record,
     get_member_user_id,
     delete_member_from_db,
     update_member_in_db,
 )
+from helpers.fetch_helpers import build_projection
+from helpers.invalidation_helpers import apply_cache_change
 
 # Middlewares
 from middlewares.rate_limiter import (
@@ -25,7 +33,10 @@ from middlewares.logger import get_logger, log_cache_operation, log_database_ope
 from middlewares.monitoring import track_cache_operation, track_database_operation
 
 # Constants
-from constants.cache_keys import MEMBERS_ALL, user_groups_cache_key
+from constants.cache_keys import (
+    MEMBERS_ALL,
+    list_page_cache_field,
+)
 from constants.api_messages import SuccessMessages, ErrorMessages
 
 router = APIRouter(
@@ -41,46 +52,62 @@ logger = get_logger()
 async def get_members(
     request: Request,
     background_tasks: BackgroundTasks,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
     redis_client=Depends(get_redis),
     supabase=Depends(get_supabase),
 ):
     cache_key = MEMBERS_ALL
     start_time = time.time()
 
-    logger.info("Fetching all members")
+    try:
+        columns = build_projection(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page_field = list_page_cache_field(limit, after, columns)
+
+    logger.info(f"Fetching members page | Limit: {limit} | After: {after}")
 
     try:
         # Try to get from cache
-        members = await get_cached_items(redis_client, cache_key)
+        page = await get_cached_page(redis_client, cache_key, page_field)
 
-        if members:
+        if page:
             log_cache_operation("get", cache_key, True)
             track_cache_operation("get", True)
-            logger.info(f"Members retrieved from cache | Count: {len(members)}")
+            logger.info(f"Members retrieved from cache | Count: {len(page['items'])}")
         else:
             log_cache_operation("get", cache_key, False)
             track_cache_operation("get", False)
 
-            # Get from database
+            # Get from database, reading the version first so the page is
+            # not cached if the list is invalidated meanwhile
+            version = await get_cache_version(redis_client, cache_key)
             db_start = time.time()
-            members = await get_all_members_from_db(supabase)
+            page = await get_members_page_from_db(supabase, limit, after, columns)
             db_duration = time.time() - db_start
 
             log_database_operation("select", "members", db_duration)
             track_database_operation("select", "members", db_duration)
 
-            # Cache the results
-            cache_items(background_tasks, redis_client, cache_key, members)
+            # Cache the page under its cursor
+            cache_page(
+                background_tasks, redis_client, cache_key, page_field, page, version
+            )
             log_cache_operation("set", cache_key)
 
             logger.info(
-                f"Members retrieved from database | Count: {len(members)} | DB Duration: {db_duration:.3f}s"
+                f"Members retrieved from database | Count: {len(page['items'])} | DB Duration: {db_duration:.3f}s"
             )
 
         total_duration = time.time() - start_time
         logger.info(f"Get members completed | Total Duration: {total_duration:.3f}s")
 
-        return GroupUsersListResponse(members=members)
+        return GroupUsersListResponse(
+            members=page["items"], next_cursor=page["next_cursor"]
+        )
 
     except Exception as e:
         logger.error(f"Error fetching members: {str(e)}")
@@ -115,15 +142,10 @@ async def add_member(
             logger.error("Failed to create member record")
             raise HTTPException(500, ErrorMessages.ERROR_ADDING_MEMBER)
 
-        # Invalidate caches
-        global_cache_key = MEMBERS_ALL
-        user_cache_key = user_groups_cache_key(member.user_id)
-
-        invalidate_cache(background_tasks, redis_client, global_cache_key)
-        invalidate_cache(background_tasks, redis_client, user_cache_key)
-
-        log_cache_operation("invalidate", global_cache_key)
-        log_cache_operation("invalidate", user_cache_key)
+        # Drop every cached view built from memberships
+        await apply_cache_change(
+            background_tasks, redis_client, "group_users", user_ids=[member.user_id]
+        )
 
         total_duration = time.time() - start_time
         logger.info(
@@ -177,15 +199,10 @@ async def delete_member(
             logger.warning(f"Member deletion failed | ID: {member_id}")
             raise HTTPException(404, ErrorMessages.MEMBER_NOT_FOUND)
 
-        # Invalidate caches
-        global_cache_key = MEMBERS_ALL
-        invalidate_cache(background_tasks, redis_client, global_cache_key)
-        log_cache_operation("invalidate", global_cache_key)
-
-        if user_id:
-            user_cache_key = user_groups_cache_key(user_id)
-            invalidate_cache(background_tasks, redis_client, user_cache_key)
-            log_cache_operation("invalidate", user_cache_key)
+        # Drop every cached view built from memberships
+        await apply_cache_change(
+            background_tasks, redis_client, "group_users", user_ids=[user_id]
+        )
 
         total_duration = time.time() - start_time
         logger.info(
@@ -238,15 +255,14 @@ async def update_member(
             logger.warning(f"Member update failed | ID: {member_id}")
             raise HTTPException(404, ErrorMessages.MEMBER_NOT_FOUND)
 
-        # Invalidate caches
-        global_cache_key = MEMBERS_ALL
-        invalidate_cache(background_tasks, redis_client, global_cache_key)
-        log_cache_operation("invalidate", global_cache_key)
-
-        if user_id:
-            user_cache_key = user_groups_cache_key(user_id)
-            invalidate_cache(background_tasks, redis_client, user_cache_key)
-            log_cache_operation("invalidate", user_cache_key)
+        # Drop every cached view built from memberships, for the old and
+        # the new user
+        await apply_cache_change(
+            background_tasks,
+            redis_client,
+            "group_users",
+            user_ids={user_id, member.user_id},
+        )
 
         total_duration = time.time() - start_time
         logger.info(
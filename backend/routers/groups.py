@@ -1,6 +1,9 @@
 import time
+from config import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
 from dependencies import get_redis, get_supabase
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from functools import partial
+from typing import Optional
 
 # Models
 from models.expense import ExpenseListResponse
@@ -11,29 +14,49 @@ from models.group import (
     GroupResponse,
     GroupPersonsResponse,
     GroupBalancesResponse,
+    GroupSnapshotResponse,
 )
 
 # Helpers
 from helpers.cache_helpers import (
-    cache_single_object,
+    get_cache_version,
     get_cached_items,
+    get_cached_items_stream,
+    stream_and_cache_items,
+    get_cached_response,
+    cache_response,
     cache_items,
-    get_cached_single_object,
-    invalidate_cache,
-    invalidate_multiple_caches,
+    get_cached_single_object_swr,
+    get_cached_page_swr,
+    fill_cache_once,
+    fill_single_object_once,
+    get_group_generation,
+    cache_page,
+    NOT_FOUND,
 )
 
 from helpers.group_helpers import (
-    get_all_groups_from_db,
+    get_groups_page_from_db,
     get_group_by_id_from_db,
     get_group_persons_from_db,
     create_group_record,
     delete_group_from_db,
     update_group_in_db,
-    calculate_group_balances,
+    get_group_snapshot_from_db,
 )
-
-from helpers.expense_helpers import get_group_expenses_from_db
+from helpers.ledger_helpers import get_ledger_balances, rebuild_group_ledger
+
+from helpers.expense_helpers import stream_group_expenses_from_db
+from helpers.stream_helpers import (
+    encoded_batches,
+    list_response,
+    read_first_batch,
+    timed_db_stream,
+    wants_ndjson,
+)
+from helpers.fetch_helpers import build_projection
+from helpers.invalidation_helpers import apply_cache_change
+from helpers.member_helpers import get_group_user_ids_from_db
 
 # Middlewares
 from middlewares.logger import log_cache_operation, log_database_operation, get_logger
@@ -51,7 +74,9 @@ from constants.cache_keys import (
     group_cache_key,
     group_expenses_cache_key,
     group_persons_cache_key,
-    group_balances_cache_key,
+    group_ledger_cache_key,
+    group_snapshot_cache_key,
+    list_page_cache_field,
 )
 
 router = APIRouter(
@@ -68,46 +93,68 @@ logger = get_logger()
 async def get_groups(
     request: Request,
     background_tasks: BackgroundTasks,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
     redis_client=Depends(get_redis),
     supabase=Depends(get_supabase),
 ):
     cache_key = GROUPS_ALL
     start_time = time.time()
 
-    logger.info("Fetching all groups")
+    try:
+        columns = build_projection(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page_field = list_page_cache_field(limit, after, columns)
+
+    logger.info(f"Fetching groups page | Limit: {limit} | After: {after}")
 
     try:
-        # Try to get from cache
-        groups = await get_cached_items(redis_client, cache_key)
+        load_page = partial(get_groups_page_from_db, supabase, limit, after, columns)
+
+        # Try to get from cache, serving stale pages while they refresh
+        page = await get_cached_page_swr(
+            background_tasks,
+            redis_client,
+            cache_key,
+            page_field,
+            load_page,
+        )
 
-        if groups:
+        if page:
             log_cache_operation("get", cache_key, True)
             track_cache_operation("get", True)
-            logger.info(f"Groups retrieved from cache | Count: {len(groups)}")
+            logger.info(f"Groups retrieved from cache | Count: {len(page['items'])}")
         else:
             log_cache_operation("get", cache_key, False)
             track_cache_operation("get", False)
 
-            # Get from database
+            # Get from database, reading the version first so the page is
+            # not cached if the list is invalidated meanwhile
+            version = await get_cache_version(redis_client, cache_key)
             db_start = time.time()
-            groups = await get_all_groups_from_db(supabase)
+            page = await load_page()
             db_duration = time.time() - db_start
 
             log_database_operation("select", "groups", db_duration)
             track_database_operation("select", "groups", db_duration)
 
-            # Cache the results
-            cache_items(background_tasks, redis_client, cache_key, groups)
+            # Cache the page under its cursor
+            cache_page(
+                background_tasks, redis_client, cache_key, page_field, page, version
+            )
             log_cache_operation("set", cache_key)
 
             logger.info(
-                f"Groups retrieved from database | Count: {len(groups)} | DB Duration: {db_duration:.3f}s"
+                f"Groups retrieved from database | Count: {len(page['items'])} | DB Duration: {db_duration:.3f}s"
             )
 
         total_duration = time.time() - start_time
         logger.info(f"Get groups completed | Total Duration: {total_duration:.3f}s")
 
-        return GroupListResponse(groups=groups)
+        return GroupListResponse(groups=page["items"], next_cursor=page["next_cursor"])
 
     except Exception as e:
         logger.error(f"Error fetching groups: {str(e)}")
@@ -125,16 +172,21 @@ async def get_group(
     redis_client=Depends(get_redis),
     supabase=Depends(get_supabase),
 ):
-    cache_key = group_cache_key(group_id)
+    generation = await get_group_generation(redis_client, group_id)
+    cache_key = group_cache_key(group_id, generation)
     start_time = time.time()
 
     logger.info(f"Fetching group | ID: {group_id}")
 
     try:
-        # Try to get from cache
-        group = await get_cached_single_object(redis_client, cache_key)
+        load_group = partial(get_group_by_id_from_db, supabase, group_id)
+
+        # Try to get from cache, serving stale entries while they refresh
+        group = await get_cached_single_object_swr(
+            background_tasks, redis_client, cache_key, load_group
+        )
 
-        if group:
+        if group is not None:
             log_cache_operation("get", cache_key, True)
             track_cache_operation("get", True)
             logger.info(f"Group retrieved from cache | ID: {group_id}")
@@ -142,22 +194,23 @@ async def get_group(
             log_cache_operation("get", cache_key, False)
             track_cache_operation("get", False)
 
-            # Get from database
+            # Get from database, once across concurrent misses
             db_start = time.time()
-            group = await get_group_by_id_from_db(supabase, group_id)
+            group = await fill_single_object_once(redis_client, cache_key, load_group)
             db_duration = time.time() - db_start
 
             log_database_operation("select", "groups", db_duration)
             track_database_operation("select", "groups", db_duration)
-
-            # Cache the result
-            cache_single_object(background_tasks, redis_client, cache_key, group)
             log_cache_operation("set", cache_key)
 
             logger.info(
                 f"Group retrieved from database | ID: {group_id} | DB Duration: {db_duration:.3f}s"
             )
 
+        if group is None or group is NOT_FOUND:
+            logger.warning(f"Group not found | ID: {group_id}")
+            raise HTTPException(404, ErrorMessages.GROUP_NOT_FOUND)
+
         total_duration = time.time() - start_time
         logger.info(
             f"Get group completed | ID: {group_id} | Total Duration: {total_duration:.3f}s"
@@ -165,6 +218,8 @@ async def get_group(
 
         return GroupResponse(group=group)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching group | ID: {group_id} | Error: {str(e)}")
         raise HTTPException(
@@ -181,47 +236,75 @@ async def get_expenses_for_group(
     redis_client=Depends(get_redis),
     supabase=Depends(get_supabase),
 ):
-    cache_key = group_expenses_cache_key(group_id)
+    generation = await get_group_generation(redis_client, group_id)
+    cache_key = group_expenses_cache_key(group_id, generation)
     start_time = time.time()
 
     logger.info(f"Fetching expenses for group | ID: {group_id}")
 
     try:
-        # Try to get from cache
-        expenses = await get_cached_items(redis_client, cache_key)
-
-        if expenses:
+        # Serve the cached response body as is, skipping decode and validation
+        cached_response = await get_cached_response(redis_client, cache_key, request)
+        if cached_response:
             log_cache_operation("get", cache_key, True)
             track_cache_operation("get", True)
             logger.info(
-                f"Group expenses retrieved from cache | Group: {group_id} | Count: {len(expenses)}"
+                f"Group expenses response served from cache | Group: {group_id}"
             )
-        else:
-            log_cache_operation("get", cache_key, False)
-            track_cache_operation("get", False)
+            return cached_response
 
-            # Get from database
-            db_start = time.time()
-            expenses = await get_group_expenses_from_db(supabase, group_id)
-            db_duration = time.time() - db_start
+        # Stream large cached lists from Redis instead of reading them whole
+        streamed_response = await get_cached_items_stream(
+            redis_client, cache_key, "expenses", request
+        )
+        if streamed_response:
+            log_cache_operation("get", cache_key, True)
+            track_cache_operation("get", True)
+            logger.info(f"Group expenses streamed from cache | Group: {group_id}")
+            return streamed_response
 
-            log_database_operation("select", "expenses", db_duration)
-            track_database_operation("select", "expenses", db_duration)
+        # Read the version before the data, so the cache writes below are
+        # refused if the key is invalidated meanwhile
+        version = await get_cache_version(redis_client, cache_key)
 
-            # Cache the results
-            cache_items(background_tasks, redis_client, cache_key, expenses)
-            log_cache_operation("set", cache_key)
+        # Try to get from cache
+        expenses = await get_cached_items(redis_client, cache_key)
 
-            logger.info(
-                f"Group expenses retrieved from database | Group: {group_id} | Count: {len(expenses)} | DB Duration: {db_duration:.3f}s"
+        if expenses is None:
+            log_cache_operation("get", cache_key, False)
+            track_cache_operation("get", False)
+
+            # Stream from database page by page, caching rows as they pass
+            rows = timed_db_stream(
+                stream_group_expenses_from_db(supabase, group_id), "select", "expenses"
             )
+            # The first page is read before responding, so a DB error is
+            # still a 500 instead of a truncated 200
+            batches = await read_first_batch(
+                stream_and_cache_items(redis_client, cache_key, rows, version)
+            )
+            log_cache_operation("set", cache_key)
+            logger.info(f"Group expenses streaming from database | Group: {group_id}")
+            return list_response(request, "expenses", batches)
+
+        log_cache_operation("get", cache_key, True)
+        track_cache_operation("get", True)
+        logger.info(
+            f"Group expenses retrieved from cache | Group: {group_id} | Count: {len(expenses)}"
+        )
 
         total_duration = time.time() - start_time
         logger.info(
             f"Get group expenses completed | Group: {group_id} | Total Duration: {total_duration:.3f}s"
         )
 
-        return ExpenseListResponse(expenses=expenses)
+        if wants_ndjson(request):
+            return list_response(request, "expenses", encoded_batches(expenses))
+
+        response = ExpenseListResponse(expenses=expenses)
+        cache_response(background_tasks, redis_client, cache_key, response, version)
+
+        return response
 
     except Exception as e:
         logger.error(
@@ -241,16 +324,39 @@ async def get_group_persons(
     redis_client=Depends(get_redis),
     supabase=Depends(get_supabase),
 ):
-    cache_key = group_persons_cache_key(group_id)
+    generation = await get_group_generation(redis_client, group_id)
+    cache_key = group_persons_cache_key(group_id, generation)
     start_time = time.time()
 
     logger.info(f"Fetching persons for group | ID: {group_id}")
 
     try:
+        # Serve the cached response body as is, skipping decode and validation
+        cached_response = await get_cached_response(redis_client, cache_key, request)
+        if cached_response:
+            log_cache_operation("get", cache_key, True)
+            track_cache_operation("get", True)
+            logger.info(f"Group persons response served from cache | Group: {group_id}")
+            return cached_response
+
+        # Stream large cached lists from Redis instead of reading them whole
+        streamed_response = await get_cached_items_stream(
+            redis_client, cache_key, "persons", request
+        )
+        if streamed_response:
+            log_cache_operation("get", cache_key, True)
+            track_cache_operation("get", True)
+            logger.info(f"Group persons streamed from cache | Group: {group_id}")
+            return streamed_response
+
+        # Read the version before the data, so the cache writes below are
+        # refused if the key is invalidated meanwhile
+        version = await get_cache_version(redis_client, cache_key)
+
         # Try to get from cache
         persons = await get_cached_items(redis_client, cache_key)
 
-        if persons:
+        if persons is not None:
             log_cache_operation("get", cache_key, True)
             track_cache_operation("get", True)
             logger.info(
@@ -269,7 +375,7 @@ async def get_group_persons(
             track_database_operation("select", "persons", db_duration)
 
             # Cache the results
-            cache_items(background_tasks, redis_client, cache_key, persons)
+            cache_items(background_tasks, redis_client, cache_key, persons, version)
             log_cache_operation("set", cache_key)
 
             logger.info(
@@ -281,7 +387,10 @@ async def get_group_persons(
             f"Get group persons completed | Group: {group_id} | Total Duration: {total_duration:.3f}s"
         )
 
-        return GroupPersonsResponse(persons=persons)
+        response = GroupPersonsResponse(persons=persons)
+        cache_response(background_tasks, redis_client, cache_key, response, version)
+
+        return response
 
     except Exception as e:
         logger.error(
@@ -316,10 +425,8 @@ async def add_group(
             logger.error("Failed to create group record")
             raise HTTPException(500, ErrorMessages.ERROR_ADDING_GROUP)
 
-        # Invalidate caches
-        cache_key = GROUPS_ALL
-        invalidate_cache(background_tasks, redis_client, cache_key)
-        log_cache_operation("invalidate", cache_key)
+        # Drop every cached view listing groups
+        await apply_cache_change(background_tasks, redis_client, "groups")
 
         total_duration = time.time() - start_time
         logger.info(
@@ -347,6 +454,14 @@ async def delete_group(
     logger.info(f"Deleting group | ID: {group_id}")
 
     try:
+        # Get members before deletion, their group lists are cached
+        db_start = time.time()
+        member_user_ids = await get_group_user_ids_from_db(supabase, group_id)
+        db_duration = time.time() - db_start
+
+        log_database_operation("select", "group_users", db_duration)
+        track_database_operation("select", "group_users", db_duration)
+
         db_start = time.time()
         response = await delete_group_from_db(supabase, group_id)
         db_duration = time.time() - db_start
@@ -358,22 +473,16 @@ async def delete_group(
             logger.warning(f"Group not found | ID: {group_id}")
             raise HTTPException(404, ErrorMessages.GROUP_NOT_FOUND)
 
-        # Invalidate multiple caches
-        cache_keys_to_invalidate = [
-            GROUPS_ALL,
-            group_cache_key(group_id),
-            group_expenses_cache_key(group_id),
-            group_persons_cache_key(group_id),
-            group_balances_cache_key(group_id),
-        ]
-
-        invalidate_multiple_caches(
-            background_tasks, redis_client, cache_keys_to_invalidate
+        # Drop every cached view of the group and of the rows it cascades to
+        await apply_cache_change(
+            background_tasks,
+            redis_client,
+            "groups",
+            group_id=group_id,
+            user_ids=member_user_ids,
+            deleted_id=group_id,
         )
 
-        for cache_key in cache_keys_to_invalidate:
-            log_cache_operation("invalidate", cache_key)
-
         total_duration = time.time() - start_time
         logger.info(
             f"Group deleted successfully | ID: {group_id} | Total Duration: {total_duration:.3f}s"
@@ -412,19 +521,27 @@ async def update_group(
             logger.warning(f"Group not found for update | ID: {group_id}")
             raise HTTPException(404, ErrorMessages.GROUP_NOT_FOUND)
 
-        # Invalidate caches
-        cache_keys_to_invalidate = [
-            GROUPS_ALL,
-            group_cache_key(group_id),
-        ]
+        # Members' group lists embed the group name
+        changed_columns = group.model_dump(exclude_unset=True).keys()
+        member_user_ids = []
+        if "name" in changed_columns:
+            db_start = time.time()
+            member_user_ids = await get_group_user_ids_from_db(supabase, group_id)
+            db_duration = time.time() - db_start
 
-        invalidate_multiple_caches(
-            background_tasks, redis_client, cache_keys_to_invalidate
+            log_database_operation("select", "group_users", db_duration)
+            track_database_operation("select", "group_users", db_duration)
+
+        # Drop every cached view built from the group
+        await apply_cache_change(
+            background_tasks,
+            redis_client,
+            "groups",
+            group_id=group_id,
+            user_ids=member_user_ids,
+            columns=changed_columns,
         )
 
-        for cache_key in cache_keys_to_invalidate:
-            log_cache_operation("invalidate", cache_key)
-
         total_duration = time.time() - start_time
         logger.info(
             f"Group updated successfully | ID: {group_id} | Total Duration: {total_duration:.3f}s"
@@ -447,39 +564,59 @@ async def get_group_balances(
     redis_client=Depends(get_redis),
     supabase=Depends(get_supabase),
 ):
-    cache_key = group_balances_cache_key(group_id)
+    generation = await get_group_generation(redis_client, group_id)
+    persons_cache_key = group_persons_cache_key(group_id, generation)
+    ledger_cache_key = group_ledger_cache_key(group_id, generation)
     start_time = time.time()
 
     logger.info(f"Fetching balances for group | ID: {group_id}")
 
     try:
-        # Try to get from cache
-        balances = await get_cached_single_object(redis_client, cache_key)
+        # Balances are read from the running ledger, which only needs the
+        # group's persons, not its expenses
+        persons_version = await get_cache_version(redis_client, persons_cache_key)
+        persons = await get_cached_items(redis_client, persons_cache_key)
 
-        if balances:
-            log_cache_operation("get", cache_key, True)
+        if persons is None:
+            db_start = time.time()
+            persons = await get_group_persons_from_db(supabase, group_id)
+            db_duration = time.time() - db_start
+
+            log_database_operation("select", "persons", db_duration)
+            track_database_operation("select", "persons", db_duration)
+
+            cache_items(
+                background_tasks,
+                redis_client,
+                persons_cache_key,
+                persons,
+                persons_version,
+            )
+            log_cache_operation("set", persons_cache_key)
+
+        balances = await get_ledger_balances(redis_client, group_id, persons)
+
+        if balances is not None:
+            log_cache_operation("get", ledger_cache_key, True)
             track_cache_operation("get", True)
-            logger.info(f"Group balances retrieved from cache | Group: {group_id}")
+            logger.info(f"Group balances retrieved from ledger | Group: {group_id}")
         else:
-            log_cache_operation("get", cache_key, False)
+            log_cache_operation("get", ledger_cache_key, False)
             track_cache_operation("get", False)
 
-            # Calculate from database
+            # Rebuild the ledger from database, once across concurrent misses
             db_start = time.time()
-            balances = await calculate_group_balances(supabase, group_id)
+            balances = await fill_cache_once(
+                redis_client,
+                ledger_cache_key,
+                lambda: get_ledger_balances(redis_client, group_id, persons),
+                lambda: rebuild_group_ledger(redis_client, supabase, group_id),
+            )
             db_duration = time.time() - db_start
 
             log_database_operation("calculate_balances", "expenses", db_duration)
             track_database_operation("calculate_balances", "expenses", db_duration)
-
-            # Store as a single item list for cache consistency
-            cache_single_object(
-                background_tasks,
-                redis_client,
-                cache_key,
-                balances,
-            )
-            log_cache_operation("set", cache_key)
+            log_cache_operation("set", ledger_cache_key)
 
             logger.info(
                 f"Group balances calculated from database | Group: {group_id} | DB Duration: {db_duration:.3f}s"
@@ -499,3 +636,72 @@ async def get_group_balances(
         raise HTTPException(
             status_code=500, detail=ErrorMessages.ERROR_RETRIEVING_GROUP_BALANCES
         )
+
+
+@router.get("/{group_id}/snapshot", response_model=GroupSnapshotResponse)
+@basic_rate_limit()
+async def get_group_snapshot(
+    group_id: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    redis_client=Depends(get_redis),
+    supabase=Depends(get_supabase),
+):
+    generation = await get_group_generation(redis_client, group_id)
+    cache_key = group_snapshot_cache_key(group_id, generation)
+    start_time = time.time()
+
+    logger.info(f"Fetching snapshot for group | ID: {group_id}")
+
+    try:
+        load_snapshot = partial(get_group_snapshot_from_db, supabase, group_id)
+
+        # Try to get from cache, serving stale entries while they refresh
+        snapshot = await get_cached_single_object_swr(
+            background_tasks, redis_client, cache_key, load_snapshot
+        )
+
+        if snapshot is not None:
+            log_cache_operation("get", cache_key, True)
+            track_cache_operation("get", True)
+            logger.info(f"Group snapshot retrieved from cache | Group: {group_id}")
+        else:
+            log_cache_operation("get", cache_key, False)
+            track_cache_operation("get", False)
+
+            # Assemble from database with concurrent fetches, once across
+            # concurrent misses, and cache the whole snapshot as one entry
+            db_start = time.time()
+            snapshot = await fill_single_object_once(
+                redis_client, cache_key, load_snapshot
+            )
+            db_duration = time.time() - db_start
+
+            log_database_operation("snapshot", "groups", db_duration)
+            track_database_operation("snapshot", "groups", db_duration)
+            log_cache_operation("set", cache_key)
+
+            logger.info(
+                f"Group snapshot assembled from database | Group: {group_id} | DB Duration: {db_duration:.3f}s"
+            )
+
+        if snapshot is None or snapshot is NOT_FOUND:
+            logger.warning(f"Group not found | ID: {group_id}")
+            raise HTTPException(404, ErrorMessages.GROUP_NOT_FOUND)
+
+        total_duration = time.time() - start_time
+        logger.info(
+            f"Get group snapshot completed | Group: {group_id} | Total Duration: {total_duration:.3f}s"
+        )
+
+        return GroupSnapshotResponse(**snapshot)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(
+            f"Error fetching group snapshot | Group: {group_id} | Error: {str(e)}"
+        )
+        raise HTTPException(
+            status_code=500, detail=ErrorMessages.ERROR_RETRIEVING_GROUP_SNAPSHOT
+        )
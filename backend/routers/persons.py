@@ -1,19 +1,28 @@
+from config import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
 from dependencies import get_redis, get_supabase
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from typing import Optional
 import time
 
 # Models
 from models.person import PersonIn, PersonUpdate, PersonListResponse
 
 # Helpers
-from helpers.cache_helpers import get_cached_items, cache_items, invalidate_cache
+from helpers.cache_helpers import (
+    get_cache_version,
+    get_cached_page,
+    cache_page,
+)
 from helpers.person_helpers import (
-    get_all_persons_from_db,
+    get_persons_page_from_db,
     create_person_record,
     get_person_group_id,
     delete_person_from_db,
     update_person_in_db,
 )
+from helpers.fetch_helpers import build_projection
+from helpers.stream_helpers import encoded_batches, list_response
+from helpers.invalidation_helpers import apply_cache_change
 
 # Middlewares
 from middlewares.rate_limiter import (
@@ -27,8 +36,7 @@ from middlewares.monitoring import track_cache_operation, track_database_operati
 # Constants
 from constants.cache_keys import (
     PERSONS_ALL,
-    group_persons_cache_key,
-    group_balances_cache_key,
+    list_page_cache_field,
 )
 from constants.api_messages import SuccessMessages, ErrorMessages
 
@@ -45,46 +53,65 @@ logger = get_logger()
 async def get_persons(
     request: Request,
     background_tasks: BackgroundTasks,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
     redis_client=Depends(get_redis),
     supabase=Depends(get_supabase),
 ):
     cache_key = PERSONS_ALL
     start_time = time.time()
 
-    logger.info("Fetching all persons")
+    try:
+        columns = build_projection(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page_field = list_page_cache_field(limit, after, columns)
+
+    logger.info(f"Fetching persons page | Limit: {limit} | After: {after}")
 
     try:
         # Try to get from cache
-        persons = await get_cached_items(redis_client, cache_key)
+        page = await get_cached_page(redis_client, cache_key, page_field)
 
-        if persons:
+        if page:
             log_cache_operation("get", cache_key, True)
             track_cache_operation("get", True)
-            logger.info(f"Persons retrieved from cache | Count: {len(persons)}")
+            logger.info(f"Persons retrieved from cache | Count: {len(page['items'])}")
         else:
             log_cache_operation("get", cache_key, False)
             track_cache_operation("get", False)
 
-            # Get from database
+            # Get from database, reading the version first so the page is
+            # not cached if the list is invalidated meanwhile
+            version = await get_cache_version(redis_client, cache_key)
             db_start = time.time()
-            persons = await get_all_persons_from_db(supabase)
+            page = await get_persons_page_from_db(supabase, limit, after, columns)
             db_duration = time.time() - db_start
 
             log_database_operation("select", "persons", db_duration)
             track_database_operation("select", "persons", db_duration)
 
-            # Cache the results
-            cache_items(background_tasks, redis_client, cache_key, persons)
+            # Cache the page under its cursor
+            cache_page(
+                background_tasks, redis_client, cache_key, page_field, page, version
+            )
             log_cache_operation("set", cache_key)
 
             logger.info(
-                f"Persons retrieved from database | Count: {len(persons)} | DB Duration: {db_duration:.3f}s"
+                f"Persons retrieved from database | Count: {len(page['items'])} | DB Duration: {db_duration:.3f}s"
             )
 
         total_duration = time.time() - start_time
         logger.info(f"Get persons completed | Total Duration: {total_duration:.3f}s")
 
-        return PersonListResponse(persons=persons)
+        return list_response(
+            request,
+            "persons",
+            encoded_batches(page["items"]),
+            {"next_cursor": page["next_cursor"]},
+        )
 
     except Exception as e:
         logger.error(f"Error fetching persons: {str(e)}")
@@ -123,18 +150,10 @@ async def add_person(
         logger.error(f"Error adding person | Name: {person.name} | Error: {str(e)}")
         raise HTTPException(500, ErrorMessages.ERROR_ADDING_PERSON)
 
-    # Invalidate caches
-    global_cache_key = PERSONS_ALL
-    persons_cache_key = group_persons_cache_key(person.group_id)
-    balances_cache_key = group_balances_cache_key(person.group_id)
-
-    invalidate_cache(background_tasks, redis_client, global_cache_key)
-    invalidate_cache(background_tasks, redis_client, persons_cache_key)
-    invalidate_cache(background_tasks, redis_client, balances_cache_key)
-
-    log_cache_operation("invalidate", global_cache_key)
-    log_cache_operation("invalidate", persons_cache_key)
-    log_cache_operation("invalidate", balances_cache_key)
+    # Drop every cached view built from the group's persons
+    await apply_cache_change(
+        background_tasks, redis_client, "persons", group_id=person.group_id
+    )
 
     total_duration = time.time() - start_time
     logger.info(
@@ -180,15 +199,15 @@ async def delete_person(
             logger.warning(f"Person deletion failed | ID: {person_id}")
             raise HTTPException(404, ErrorMessages.PERSON_NOT_FOUND)
 
-        # Invalidate caches
-        global_cache_key = PERSONS_ALL
-        invalidate_cache(background_tasks, redis_client, global_cache_key)
-        log_cache_operation("invalidate", global_cache_key)
-
-        if group_id:
-            group_cache_key = group_persons_cache_key(group_id)
-            invalidate_cache(background_tasks, redis_client, group_cache_key)
-            log_cache_operation("invalidate", group_cache_key)
+        # Deleting a person can cascade to expenses and debtors, so every
+        # group cache, the ledger included, is rebuilt from the DB
+        await apply_cache_change(
+            background_tasks,
+            redis_client,
+            "persons",
+            group_id=group_id,
+            deleted_id=person_id,
+        )
 
         total_duration = time.time() - start_time
         logger.info(
@@ -241,15 +260,16 @@ async def update_person(
             logger.warning(f"Person update failed | ID: {person_id}")
             raise HTTPException(404, ErrorMessages.PERSON_NOT_FOUND)
 
-        # Invalidate caches
-        global_cache_key = PERSONS_ALL
-        invalidate_cache(background_tasks, redis_client, global_cache_key)
-        log_cache_operation("invalidate", global_cache_key)
-
-        if group_id:
-            group_cache_key = group_persons_cache_key(group_id)
-            invalidate_cache(background_tasks, redis_client, group_cache_key)
-            log_cache_operation("invalidate", group_cache_key)
+        # Drop every cached view built from the persons of both groups
+        changed_columns = person.model_dump(exclude_unset=True).keys()
+        for changed_group_id in {group_id, person.group_id or group_id}:
+            await apply_cache_change(
+                background_tasks,
+                redis_client,
+                "persons",
+                group_id=changed_group_id,
+                columns=changed_columns,
+            )
 
         total_duration = time.time() - start_time
         logger.info(
@@ -6,7 +6,14 @@ import time
 from models.user import UserGroupsResponse
 
 # Helpers
-from helpers.cache_helpers import get_cached_items, cache_items
+from helpers.cache_helpers import (
+    get_cache_version,
+    get_cached_items,
+    get_cached_items_stream,
+    get_cached_response,
+    cache_items,
+    cache_response,
+)
 from helpers.user_helpers import get_user_groups_from_db
 
 # Middlewares
@@ -41,10 +48,32 @@ async def get_user_groups(
     try:
         cache_key = user_groups_cache_key(user_id)
 
+        # Serve the cached response body as is, skipping decode and validation
+        cached_response = await get_cached_response(redis_client, cache_key, request)
+        if cached_response:
+            log_cache_operation("get", cache_key, True)
+            track_cache_operation("get", True)
+            logger.info(f"User groups response served from cache | User: {user_id}")
+            return cached_response
+
+        # Stream large cached lists from Redis instead of reading them whole
+        streamed_response = await get_cached_items_stream(
+            redis_client, cache_key, "groups", request
+        )
+        if streamed_response:
+            log_cache_operation("get", cache_key, True)
+            track_cache_operation("get", True)
+            logger.info(f"User groups streamed from cache | User: {user_id}")
+            return streamed_response
+
+        # Read the version before the data, so the cache writes below are
+        # refused if the key is invalidated meanwhile
+        version = await get_cache_version(redis_client, cache_key)
+
         # Try to get from cache
         groups = await get_cached_items(redis_client, cache_key)
 
-        if groups:
+        if groups is not None:
             log_cache_operation("get", cache_key, True)
             track_cache_operation("get", True)
             logger.info(
@@ -68,7 +97,12 @@ async def get_user_groups(
 
             # Cache the results
             cache_items(
-                background_tasks, redis_client, cache_key, groups, id_field="id"
+                background_tasks,
+                redis_client,
+                cache_key,
+                groups,
+                version,
+                id_field="id",
             )
             log_cache_operation("set", cache_key)
 
@@ -81,7 +115,10 @@ async def get_user_groups(
             f"Get user groups completed | User: {user_id} | Total Duration: {total_duration:.3f}s"
         )
 
-        return UserGroupsResponse(groups=groups)
+        response = UserGroupsResponse(groups=groups)
+        cache_response(background_tasks, redis_client, cache_key, response, version)
+
+        return response
     except HTTPException:
         raise
     except Exception as e:
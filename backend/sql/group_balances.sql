@@ -0,0 +1,45 @@
+-- Per-person balances for a group, aggregated in Postgres.
+-- Used by the "sql" balance engine (BALANCE_ENGINE=sql) through PostgREST RPC:
+--   POST /rest/v1/rpc/group_balances {"p_group_id": "<group_id>"}
+
+create or replace function public.group_balances(p_group_id uuid)
+returns table (
+    person_id uuid,
+    name text,
+    paid double precision,
+    owes double precision,
+    balance double precision
+)
+language sql
+stable
+as $$
+    with paid as (
+        select e.payer_id as person_id, sum(e.amount)::double precision as paid
+        from expenses e
+        where e.group_id = p_group_id
+        group by e.payer_id
+    ),
+    owes as (
+        select d.person_id, sum(d.amount)::double precision as owes
+        from expenses_debtors d
+        join expenses e on e.id = d.expense_id
+        where e.group_id = p_group_id
+        group by d.person_id
+    )
+    select
+        p.id as person_id,
+        p.name,
+        coalesce(paid.paid, 0) as paid,
+        coalesce(owes.owes, 0) as owes,
+        coalesce(paid.paid, 0) - coalesce(owes.owes, 0) as balance
+    from persons p
+    left join paid on paid.person_id = p.id
+    left join owes on owes.person_id = p.id
+    where p.group_id = p_group_id;
+$$;
+
+-- Indexes the aggregation relies on
+create index if not exists expenses_group_id_idx on expenses (group_id);
+create index if not exists expenses_debtors_expense_id_idx
+    on expenses_debtors (expense_id);
+create index if not exists persons_group_id_idx on persons (group_id);
@@ -0,0 +1,54 @@
+import os
+
+# Log synchronously, so pytest captures log lines per test instead of the
+# writer thread flushing them after capture has ended
+os.environ.setdefault("LOG_QUEUE_SIZE", "0")
+# Clients are built at import, tests never reach Supabase
+os.environ.setdefault("SUPABASE_PROJECT_ID", "test")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test")
+
+import fakeredis
+import httpx
+import pytest
+
+from app import app
+from dependencies import get_redis, get_supabase
+from helpers.local_cache import local_cache
+from middlewares.rate_limiter import limiter
+from tests.fake_supabase import FakeSupabase
+
+
+@pytest.fixture
+async def redis_client():
+    """In-memory Redis with Lua scripting, fresh for every test"""
+    # Enough connections for tests that fire many commands in parallel
+    client = fakeredis.FakeAsyncRedis(decode_responses=True, max_connections=10_000)
+    yield client
+    await client.flushall()
+    await client.aclose()
+
+
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    local_cache.clear()
+    yield
+    local_cache.clear()
+
+
+@pytest.fixture
+def supabase():
+    """Empty in-memory database, see tests/fake_supabase.py"""
+    return FakeSupabase()
+
+
+@pytest.fixture
+async def api(redis_client, supabase, monkeypatch):
+    """HTTP client for the app, backed by the fake Redis and database"""
+    monkeypatch.setattr(limiter, "redis_client", redis_client)
+    monkeypatch.setattr(limiter, "buckets", {})
+    app.dependency_overrides[get_redis] = lambda: redis_client
+    app.dependency_overrides[get_supabase] = lambda: supabase
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
@@ -0,0 +1,248 @@
+import copy
+import uuid
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from postgrest.exceptions import APIError
+
+# Foreign keys of each table: column -> referenced table. Embeds follow them
+# both ways and deletes cascade along them, as in the app's schema
+FOREIGN_KEYS = {
+    "expenses": {"group_id": "groups", "payer_id": "persons"},
+    "expenses_debtors": {"expense_id": "expenses", "person_id": "persons"},
+    "persons": {"group_id": "groups"},
+    "group_users": {"group_id": "groups"},
+}
+
+# Column defaults, for inserts that leave them out
+DEFAULTS = {
+    "expenses_debtors": {"amount": 0},
+}
+
+CREATED_AT = "2026-01-01T00:00:00+00:00"
+
+
+def split_columns(columns: str) -> List[str]:
+    """Split a select list on the commas outside of embeds"""
+    parts, depth, current = [], 0, ""
+    for char in columns:
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        current += char
+    parts.append(current.strip())
+    return [part for part in parts if part]
+
+
+class FakeQuery:
+    """Just enough of a PostgREST request builder for the app's queries"""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.values = None
+        self.filters = []
+        self.order_by = None
+        self.bounds = None
+        self.single_row = None
+
+    def select(self, columns: str = "*"):
+        self.columns = columns
+        return self
+
+    def insert(self, values):
+        self.action, self.values = "insert", values
+        return self
+
+    def update(self, values: Dict):
+        self.action, self.values = "update", values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column: str, value):
+        self.filters.append((column, lambda v: v == value))
+        return self
+
+    def gt(self, column: str, value):
+        self.filters.append((column, lambda v: v is not None and v > value))
+        return self
+
+    def order(self, column: str):
+        self.order_by = column
+        return self
+
+    def range(self, start: int, end: int):
+        self.bounds = (start, end + 1)
+        return self
+
+    def limit(self, count: int):
+        self.bounds = (0, count)
+        return self
+
+    def single(self):
+        self.single_row = "single"
+        return self
+
+    def maybe_single(self):
+        self.single_row = "maybe"
+        return self
+
+    async def execute(self):
+        self.db.calls.append((self.action, self.table))
+        error = self.db.errors.get((self.action, self.table))
+        if error is not None:
+            raise error
+
+        if self.action == "insert":
+            data = self.db.insert_rows(self.table, self.values)
+        elif self.action == "update":
+            data = self.db.update_rows(self.table, self.matching(), self.values)
+        elif self.action == "delete":
+            data = self.db.delete_rows(self.table, self.matching())
+        else:
+            data = self.selected()
+
+        if self.single_row == "maybe" and not data:
+            return None
+        if self.single_row:
+            return SimpleNamespace(data=data[0] if data else None)
+        return SimpleNamespace(data=data)
+
+    def matching(self) -> List[Dict]:
+        return [
+            row
+            for row in self.db.tables[self.table]
+            if all(test(row.get(column)) for column, test in self.filters)
+        ]
+
+    def selected(self) -> List[Dict]:
+        own_filters = [(c, t) for c, t in self.filters if "." not in c]
+        rows = [
+            row
+            for row in self.db.tables[self.table]
+            if all(test(row.get(column)) for column, test in own_filters)
+        ]
+        if self.order_by:
+            rows = sorted(rows, key=lambda row: row[self.order_by])
+        rows = [self.db.project(self.table, row, self.columns) for row in rows]
+
+        # Filters on an embed keep only rows whose embed matches
+        for column, test in self.filters:
+            if "." in column:
+                embed, field = column.split(".", 1)
+                rows = [
+                    row
+                    for row in rows
+                    if row.get(embed) is not None and test(row[embed].get(field))
+                ]
+
+        if self.bounds:
+            rows = rows[self.bounds[0] : self.bounds[1]]
+        return copy.deepcopy(rows)
+
+
+class FakeRpc:
+    def __init__(self, db: "FakeSupabase", function: Callable, params: Dict):
+        self.db = db
+        self.function = function
+        self.params = params
+
+    async def execute(self):
+        return SimpleNamespace(data=self.function(self.db.tables, **self.params))
+
+
+class FakeSupabase:
+    """In-memory stand-in for the async PostgREST client.
+
+    Tables are lists of row dicts. Set errors[(action, table)] to make the
+    next requests of that kind raise, and register RPCs in functions.
+    """
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict]]] = None):
+        self.tables = {name: [] for name in ("groups", *FOREIGN_KEYS)}
+        for name, rows in (tables or {}).items():
+            self.tables[name] = copy.deepcopy(rows)
+        self.errors: Dict[tuple, Exception] = {}
+        self.functions: Dict[str, Callable] = {}
+        self.calls: List[tuple] = []
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Dict) -> FakeRpc:
+        return FakeRpc(self, self.functions[name], params)
+
+    def fail(self, action: str, table: str, message: str = "Database unavailable"):
+        self.errors[(action, table)] = APIError({"message": message, "code": "XX000"})
+
+    def project(self, table: str, row: Dict, columns: str) -> Dict:
+        projected = {}
+        for column in split_columns(columns):
+            if column == "*":
+                projected.update(row)
+            elif "(" in column:
+                name, embed_columns = column[:-1].split("(", 1)
+                alias, _, embedded = name.rpartition(":")
+                projected[alias or embedded] = self.embed(
+                    table, row, embedded, embed_columns
+                )
+            else:
+                projected[column] = row.get(column)
+        return projected
+
+    def embed(self, table: str, row: Dict, embedded: str, columns: str):
+        for column, target in FOREIGN_KEYS.get(table, {}).items():
+            if target == embedded:
+                for other in self.tables[embedded]:
+                    if other["id"] == row.get(column):
+                        return self.project(embedded, other, columns)
+                return None
+        for column, target in FOREIGN_KEYS[embedded].items():
+            if target == table:
+                return [
+                    self.project(embedded, other, columns)
+                    for other in sorted(self.tables[embedded], key=lambda r: r["id"])
+                    if other.get(column) == row["id"]
+                ]
+        raise ValueError(f"No relationship between {table} and {embedded}")
+
+    def insert_rows(self, table: str, values) -> List[Dict]:
+        rows = []
+        for value in values if isinstance(values, list) else [values]:
+            row = {
+                "id": uuid.uuid4().hex,
+                "created_at": CREATED_AT,
+                **DEFAULTS.get(table, {}),
+                **value,
+            }
+            self.tables[table].append(row)
+            rows.append(row)
+        return copy.deepcopy(rows)
+
+    def update_rows(self, table: str, rows: List[Dict], values: Dict) -> List[Dict]:
+        for row in rows:
+            row.update(values)
+        return copy.deepcopy(rows)
+
+    def delete_rows(self, table: str, rows: List[Dict]) -> List[Dict]:
+        deleted = copy.deepcopy(rows)
+        ids = {row["id"] for row in rows}
+        self.tables[table] = [row for row in self.tables[table] if row["id"] not in ids]
+        # ON DELETE CASCADE
+        for other, foreign_keys in FOREIGN_KEYS.items():
+            for column, target in foreign_keys.items():
+                if target == table:
+                    self.delete_rows(
+                        other,
+                        [row for row in self.tables[other] if row.get(column) in ids],
+                    )
+        return deleted
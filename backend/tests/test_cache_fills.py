@@ -0,0 +1,62 @@
+import asyncio
+
+from fastapi import BackgroundTasks
+
+from constants.cache_keys import group_cache_key
+from helpers.cache_helpers import (
+    NOT_FOUND,
+    cache_single_object_async,
+    fill_single_object_once,
+    get_cache_version,
+    get_cached_single_object_swr,
+)
+
+GROUP = {"id": "g1", "name": "Trip"}
+
+
+async def test_miss_does_not_join_a_background_refresh(redis_client):
+    cache_key = group_cache_key("g1", 0)
+    version = await get_cache_version(redis_client, cache_key)
+    # Cached without a freshness marker, so the next read is stale
+    await cache_single_object_async(redis_client, cache_key, GROUP, version)
+    await redis_client.delete(f"{cache_key}:fresh")
+
+    refresh_started = asyncio.Event()
+    release_refresh = asyncio.Event()
+
+    async def slow_compute():
+        refresh_started.set()
+        await release_refresh.wait()
+        return GROUP
+
+    background_tasks = BackgroundTasks()
+    stale = await get_cached_single_object_swr(
+        background_tasks, redis_client, cache_key, slow_compute
+    )
+    assert stale == GROUP
+
+    refresh = asyncio.create_task(background_tasks())
+    await refresh_started.wait()
+
+    async def compute():
+        return GROUP
+
+    try:
+        # Joining the refresh would wait on it, and then get nothing back
+        data = await asyncio.wait_for(
+            fill_single_object_once(redis_client, cache_key, compute), timeout=1
+        )
+        assert data == GROUP
+    finally:
+        release_refresh.set()
+        await refresh
+
+
+async def test_fill_caches_not_found(redis_client):
+    cache_key = group_cache_key("missing", 0)
+
+    async def compute():
+        return None
+
+    assert await fill_single_object_once(redis_client, cache_key, compute) is NOT_FOUND
+    assert await redis_client.get(cache_key) == "not_found"
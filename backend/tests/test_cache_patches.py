@@ -0,0 +1,36 @@
+from constants.cache_keys import group_expenses_cache_key
+from helpers.cache_helpers import (
+    EMPTY_LIST_FIELD,
+    encode_cache_value,
+    get_cache_version,
+    get_cached_items,
+    replace_cached_items_async,
+    update_cache_item_async,
+)
+
+EXPENSE = {"id": "e1", "name": "Taxi", "amount": 12.0}
+
+
+async def test_patching_an_empty_list_drops_its_marker(redis_client):
+    cache_key = group_expenses_cache_key("g1", 0)
+    version = await get_cache_version(redis_client, cache_key)
+    await replace_cached_items_async(redis_client, cache_key, {}, version)
+    assert await redis_client.hkeys(cache_key) == [EMPTY_LIST_FIELD]
+
+    await update_cache_item_async(
+        redis_client, cache_key, EXPENSE["id"], encode_cache_value(EXPENSE)
+    )
+
+    assert await redis_client.hkeys(cache_key) == [EXPENSE["id"]]
+    assert await get_cached_items(redis_client, cache_key) == [EXPENSE]
+
+
+async def test_patching_a_missing_list_does_not_create_it(redis_client):
+    cache_key = group_expenses_cache_key("g1", 0)
+
+    await update_cache_item_async(
+        redis_client, cache_key, EXPENSE["id"], encode_cache_value(EXPENSE)
+    )
+
+    assert not await redis_client.exists(cache_key)
+    assert await get_cache_version(redis_client, cache_key) == 1
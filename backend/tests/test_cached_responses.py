@@ -0,0 +1,38 @@
+import gzip
+
+import pytest
+from starlette.requests import Request
+
+from constants.cache_keys import group_expenses_cache_key
+from helpers.cache_helpers import (
+    cache_response_async,
+    get_cache_version,
+    get_cached_response,
+)
+
+# Large enough to be stored gzipped as well
+BODY = '{"expenses":[' + ",".join(['{"id":"e1"}'] * 200) + "]}"
+
+
+def request_accepting(encoding: str) -> Request:
+    headers = [(b"accept-encoding", encoding.encode())] if encoding else []
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+@pytest.mark.parametrize("encoding", ["gzip", ""])
+async def test_cached_bodies_vary_on_accept_encoding(redis_client, encoding):
+    cache_key = group_expenses_cache_key("g1", 0)
+    version = await get_cache_version(redis_client, cache_key)
+    await cache_response_async(redis_client, cache_key, BODY, version)
+
+    response = await get_cached_response(
+        redis_client, cache_key, request_accepting(encoding)
+    )
+
+    assert response.headers["vary"] == "Accept-Encoding"
+    if encoding:
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(response.body).decode() == BODY
+    else:
+        assert "content-encoding" not in response.headers
+        assert response.body.decode() == BODY
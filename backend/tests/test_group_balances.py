@@ -0,0 +1,245 @@
+import os
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+import helpers.group_helpers as group_helpers
+from helpers.group_helpers import (
+    calculate_group_balances,
+    calculate_group_balances_python,
+    calculate_group_balances_sql,
+    find_balance_mismatches,
+)
+
+
+def uid(n: int) -> str:
+    return str(uuid.UUID(int=n))
+
+
+GROUP_ID = uid(1)
+OTHER_GROUP_ID = uid(2)
+ANA, BO, CY, DEE, EVE = (uid(n) for n in range(11, 16))
+
+GROUPS = [{"id": GROUP_ID, "name": "Trip"}, {"id": OTHER_GROUP_ID, "name": "Flat"}]
+PERSONS = [
+    {"id": ANA, "name": "Ana", "group_id": GROUP_ID},
+    {"id": BO, "name": "Bo", "group_id": GROUP_ID},
+    # No expenses and no debts
+    {"id": CY, "name": "Cy", "group_id": GROUP_ID},
+    # Owes but never paid, so has no row in the paid aggregate
+    {"id": DEE, "name": "Dee", "group_id": GROUP_ID},
+    {"id": EVE, "name": "Eve", "group_id": OTHER_GROUP_ID},
+]
+# Decimal amounts that do not add up exactly in binary floating point
+EXPENSES = [
+    {"id": uid(21), "group_id": GROUP_ID, "payer_id": ANA, "amount": 0.1},
+    {"id": uid(22), "group_id": GROUP_ID, "payer_id": ANA, "amount": 0.2},
+    {"id": uid(23), "group_id": GROUP_ID, "payer_id": BO, "amount": 10.01},
+    {"id": uid(24), "group_id": OTHER_GROUP_ID, "payer_id": EVE, "amount": 5},
+]
+DEBTORS = [
+    # The payer owes part of their own expense
+    {"id": uid(31), "expense_id": uid(21), "person_id": ANA, "amount": 0.05},
+    {"id": uid(32), "expense_id": uid(21), "person_id": BO, "amount": 0.05},
+    {"id": uid(33), "expense_id": uid(22), "person_id": BO, "amount": 0.1},
+    {"id": uid(34), "expense_id": uid(22), "person_id": DEE, "amount": 0.1},
+    {"id": uid(35), "expense_id": uid(23), "person_id": ANA, "amount": 3.34},
+    {"id": uid(36), "expense_id": uid(23), "person_id": BO, "amount": 3.34},
+    {"id": uid(37), "expense_id": uid(23), "person_id": DEE, "amount": 3.33},
+    # Debts in another group's expense do not count towards this group
+    {"id": uid(38), "expense_id": uid(24), "person_id": BO, "amount": 2.5},
+    {"id": uid(39), "expense_id": uid(24), "person_id": EVE, "amount": 2.5},
+]
+
+# Worked out by hand
+EXPECTED_BALANCES = {
+    ANA: {"name": "Ana", "paid": 0.3, "owes": 3.39, "balance": -3.09},
+    BO: {"name": "Bo", "paid": 10.01, "owes": 3.49, "balance": 6.52},
+    CY: {"name": "Cy", "paid": 0.0, "owes": 0.0, "balance": 0.0},
+    DEE: {"name": "Dee", "paid": 0.0, "owes": 3.43, "balance": -3.43},
+}
+
+GROUP_BALANCES_SQL = Path(__file__).parent.parent / "sql" / "group_balances.sql"
+
+
+def group_balances(tables, p_group_id):
+    """sql/group_balances.sql, step by step over the fake tables: numeric
+    sums per payer and per debtor of the group's expenses, left joined onto
+    the group's persons and cast to double precision"""
+    expenses = {e["id"]: e for e in tables["expenses"] if e["group_id"] == p_group_id}
+
+    paid = defaultdict(Decimal)
+    for e in expenses.values():
+        paid[e["payer_id"]] += Decimal(str(e["amount"]))
+
+    owes = defaultdict(Decimal)
+    for d in tables["expenses_debtors"]:
+        if d["expense_id"] in expenses:
+            owes[d["person_id"]] += Decimal(str(d["amount"]))
+
+    rows = []
+    for p in tables["persons"]:
+        if p["group_id"] != p_group_id:
+            continue
+        person_paid = float(paid.get(p["id"], 0))
+        person_owes = float(owes.get(p["id"], 0))
+        rows.append(
+            {
+                "person_id": p["id"],
+                "name": p["name"],
+                "paid": person_paid,
+                "owes": person_owes,
+                "balance": person_paid - person_owes,
+            }
+        )
+    return rows
+
+
+def assert_expected_balances(balances):
+    assert set(balances) == set(EXPECTED_BALANCES)
+    for person_id, expected in EXPECTED_BALANCES.items():
+        assert balances[person_id]["name"] == expected["name"]
+        for field in ("paid", "owes", "balance"):
+            assert balances[person_id][field] == pytest.approx(expected[field])
+
+
+@pytest.fixture
+def supabase(supabase):
+    supabase.tables.update(
+        groups=[dict(row) for row in GROUPS],
+        persons=[dict(row) for row in PERSONS],
+        expenses=[dict(row) for row in EXPENSES],
+        expenses_debtors=[dict(row) for row in DEBTORS],
+    )
+    supabase.functions["group_balances"] = group_balances
+    return supabase
+
+
+def diverging(change):
+    """A group_balances that returns changed rows"""
+
+    def function(tables, p_group_id):
+        rows = {row["person_id"]: row for row in group_balances(tables, p_group_id)}
+        change(rows)
+        return list(rows.values())
+
+    return function
+
+
+async def test_sql_engine_matches_python_engine(supabase):
+    python_balances = await calculate_group_balances_python(supabase, GROUP_ID)
+    sql_balances = await calculate_group_balances_sql(supabase, GROUP_ID)
+
+    assert find_balance_mismatches(python_balances, sql_balances) == []
+    assert_expected_balances(python_balances)
+    assert_expected_balances(sql_balances)
+
+
+async def test_mismatches_flag_a_diverging_person(supabase):
+    supabase.functions["group_balances"] = diverging(
+        lambda rows: rows[BO].update(owes=3.5, balance=6.51)
+    )
+
+    python_balances = await calculate_group_balances_python(supabase, GROUP_ID)
+    sql_balances = await calculate_group_balances_sql(supabase, GROUP_ID)
+
+    assert find_balance_mismatches(python_balances, sql_balances) == [BO]
+
+
+async def test_mismatches_flag_a_missing_person(supabase):
+    supabase.functions["group_balances"] = diverging(lambda rows: rows.pop(DEE))
+
+    python_balances = await calculate_group_balances_python(supabase, GROUP_ID)
+    sql_balances = await calculate_group_balances_sql(supabase, GROUP_ID)
+
+    assert find_balance_mismatches(python_balances, sql_balances) == [DEE]
+
+
+async def test_compare_engine_serves_python_balances(supabase, monkeypatch):
+    monkeypatch.setattr(group_helpers, "BALANCE_ENGINE", "compare")
+    supabase.functions["group_balances"] = diverging(
+        lambda rows: rows[ANA].update(paid=1.0, balance=-2.39)
+    )
+
+    balances = await calculate_group_balances(supabase, GROUP_ID)
+
+    assert balances == await calculate_group_balances_python(supabase, GROUP_ID)
+
+
+@pytest.fixture
+def postgres():
+    """Connection to the Postgres at TEST_DATABASE_URL, in a transaction that
+    is rolled back, with the app's tables as temporary tables"""
+    psycopg = pytest.importorskip("psycopg")
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    with psycopg.connect(url) as connection:
+        connection.execute("""
+            create temp table persons (
+                id uuid primary key, name text not null, group_id uuid not null
+            );
+            create temp table expenses (
+                id uuid primary key,
+                group_id uuid not null,
+                payer_id uuid not null,
+                amount numeric not null
+            );
+            create temp table expenses_debtors (
+                id uuid primary key,
+                expense_id uuid not null,
+                person_id uuid not null,
+                amount numeric not null
+            );
+            """)
+        yield connection
+        connection.rollback()
+
+
+@pytest.mark.postgres
+async def test_sql_function_matches_python_engine_on_postgres(postgres, supabase):
+    postgres.execute(GROUP_BALANCES_SQL.read_text())
+    for table, rows in (
+        ("persons", PERSONS),
+        ("expenses", EXPENSES),
+        ("expenses_debtors", DEBTORS),
+    ):
+        columns = list(rows[0])
+        with postgres.cursor() as cursor:
+            cursor.executemany(
+                f"insert into {table} ({', '.join(columns)}) "
+                f"values ({', '.join(['%s'] * len(columns))})",
+                # Amounts as written, not as the nearest binary float
+                [
+                    [
+                        Decimal(str(value)) if column == "amount" else value
+                        for column, value in row.items()
+                    ]
+                    for row in rows
+                ],
+            )
+
+    rows = postgres.execute(
+        "select person_id, name, paid, owes, balance from group_balances(%s)",
+        [GROUP_ID],
+    ).fetchall()
+    sql_balances = {
+        str(person_id): {"name": name, "paid": paid, "owes": owes, "balance": balance}
+        for person_id, name, paid, owes, balance in rows
+    }
+
+    python_balances = await calculate_group_balances_python(supabase, GROUP_ID)
+
+    assert find_balance_mismatches(python_balances, sql_balances) == []
+    assert_expected_balances(sql_balances)
+    # The in-memory stand-in agrees with the real function
+    assert (
+        find_balance_mismatches(
+            await calculate_group_balances_sql(supabase, GROUP_ID), sql_balances
+        )
+        == []
+    )
@@ -0,0 +1,94 @@
+import itertools
+
+import pytest
+
+from helpers.ledger_helpers import (
+    apply_ledger_deltas,
+    begin_ledger_change,
+    expense_ledger_deltas,
+    get_ledger_balances,
+    get_ledger_fill_target,
+    store_group_ledger,
+)
+
+GROUP_ID = "g1"
+PERSONS = [{"id": "p1", "name": "Ana"}, {"id": "p2", "name": "Bo"}]
+
+EXPENSE = {"id": "e1", "payer_id": "p1", "amount": 30}
+DEBTORS = [{"person_id": "p1", "amount": 10}, {"person_id": "p2", "amount": 20}]
+
+BEFORE_WRITE = {
+    "p1": {"name": "Ana", "paid": 50.0, "owes": 25.0},
+    "p2": {"name": "Bo", "paid": 0.0, "owes": 25.0},
+}
+AFTER_WRITE = {
+    "p1": {"name": "Ana", "paid": 80.0, "owes": 35.0},
+    "p2": {"name": "Bo", "paid": 0.0, "owes": 45.0},
+}
+
+
+def interleavings():
+    """Every order of a write (begin, commit, apply) and a rebuild (target,
+    read, store), each keeping its own steps in order"""
+    write = ["begin", "commit", "apply"]
+    rebuild = ["target", "read", "store"]
+    for positions in itertools.combinations(range(6), 3):
+        steps, write_steps, rebuild_steps = [], iter(write), iter(rebuild)
+        for i in range(6):
+            steps.append(next(write_steps if i in positions else rebuild_steps))
+        yield steps
+
+
+@pytest.mark.parametrize("ledger_cached", [False, True])
+@pytest.mark.parametrize("steps", list(interleavings()), ids="-".join)
+async def test_rebuild_racing_a_write_never_double_counts(
+    redis_client, steps, ledger_cached
+):
+    if ledger_cached:
+        cache_key, version = await get_ledger_fill_target(redis_client, GROUP_ID)
+        await store_group_ledger(redis_client, cache_key, BEFORE_WRITE, version)
+
+    db = BEFORE_WRITE
+    for step in steps:
+        if step == "begin":
+            ledger_version = await begin_ledger_change(redis_client, GROUP_ID)
+        elif step == "commit":
+            db = AFTER_WRITE
+        elif step == "apply":
+            deltas = expense_ledger_deltas(EXPENSE, DEBTORS)
+            await apply_ledger_deltas(redis_client, GROUP_ID, deltas, ledger_version)
+        elif step == "target":
+            cache_key, version = await get_ledger_fill_target(redis_client, GROUP_ID)
+        elif step == "read":
+            balances = db
+        elif step == "store":
+            await store_group_ledger(redis_client, cache_key, balances, version)
+
+    # A dropped ledger is rebuilt from the DB, a cached one must match it
+    ledger = await get_ledger_balances(redis_client, GROUP_ID, PERSONS)
+    if ledger is not None:
+        for person_id, expected in AFTER_WRITE.items():
+            assert ledger[person_id]["paid"] == expected["paid"]
+            assert ledger[person_id]["owes"] == expected["owes"]
+
+
+async def test_deltas_patch_a_ledger_untouched_during_the_write(redis_client):
+    cache_key, version = await get_ledger_fill_target(redis_client, GROUP_ID)
+    await store_group_ledger(redis_client, cache_key, BEFORE_WRITE, version)
+
+    ledger_version = await begin_ledger_change(redis_client, GROUP_ID)
+    deltas = expense_ledger_deltas(EXPENSE, DEBTORS)
+    assert await apply_ledger_deltas(redis_client, GROUP_ID, deltas, ledger_version)
+
+    ledger = await get_ledger_balances(redis_client, GROUP_ID, PERSONS)
+    assert ledger["p1"]["balance"] == 45.0
+    assert ledger["p2"]["balance"] == -45.0
+
+
+async def test_deltas_without_a_version_drop_the_ledger(redis_client):
+    cache_key, version = await get_ledger_fill_target(redis_client, GROUP_ID)
+    await store_group_ledger(redis_client, cache_key, BEFORE_WRITE, version)
+
+    deltas = expense_ledger_deltas(EXPENSE, DEBTORS)
+    assert not await apply_ledger_deltas(redis_client, GROUP_ID, deltas, None)
+    assert await get_ledger_balances(redis_client, GROUP_ID, PERSONS) is None
@@ -0,0 +1,33 @@
+from prometheus_client import REGISTRY
+
+from helpers.cache_helpers import get_cached_single_object_async
+from helpers.local_cache import local_cache
+
+
+def tier_lookups(tier: str) -> float:
+    return sum(
+        REGISTRY.get_sample_value(
+            "cache_tier_operations_total", {"tier": tier, "result": result}
+        )
+        or 0
+        for result in ("hit", "miss")
+    )
+
+
+async def test_lookups_skip_l1_stats_while_l1_is_off(redis_client, monkeypatch):
+    monkeypatch.setattr(local_cache, "enabled", False)
+    l1_before, l2_before = tier_lookups("l1"), tier_lookups("l2")
+
+    await get_cached_single_object_async(redis_client, "groups:g1:g0")
+
+    assert tier_lookups("l1") == l1_before
+    assert tier_lookups("l2") == l2_before + 1
+
+
+async def test_lookups_track_l1_while_l1_is_on(redis_client, monkeypatch):
+    monkeypatch.setattr(local_cache, "enabled", True)
+    l1_before = tier_lookups("l1")
+
+    await get_cached_single_object_async(redis_client, "groups:g1:g0")
+
+    assert tier_lookups("l1") == l1_before + 1
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from middlewares.rate_limiter import (
+    RateLimitCharge,
+    SlidingWindowLimiter,
+    request_cost_units,
+)
+
+KEY = "rate_limit:test"
+LIMIT = 60
+WINDOW = 60
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+async def test_parallel_hits_admit_exactly_the_limit(redis_client, workers):
+    limiters = [SlidingWindowLimiter(redis_client) for _ in range(workers)]
+
+    results = await asyncio.gather(
+        *[limiters[i % workers].hit(KEY, LIMIT, WINDOW) for i in range(1000)]
+    )
+
+    allowed = [result for result in results if result.allowed]
+    assert len(allowed) == LIMIT
+    assert await redis_client.zcard(KEY) == LIMIT
+    # Each admitted request saw a distinct count of what is left
+    assert sorted(result.remaining for result in allowed) == list(range(LIMIT))
+    for result in results:
+        assert result.limit == LIMIT
+        assert 0 < result.reset_ms <= WINDOW * 1000
+
+
+async def test_denied_hits_report_no_remaining_budget(redis_client):
+    limiter = SlidingWindowLimiter(redis_client)
+    await asyncio.gather(*[limiter.hit(KEY, LIMIT, WINDOW) for _ in range(LIMIT)])
+
+    result = await limiter.hit(KEY, LIMIT, WINDOW)
+
+    assert not result.allowed
+    assert result.remaining == 0
+    assert 0 < result.reset_ms <= WINDOW * 1000
+    # A denied request is not charged
+    assert await redis_client.zcard(KEY) == LIMIT
+
+
+async def test_parallel_weighted_hits_stay_within_the_limit(redis_client):
+    limiter = SlidingWindowLimiter(redis_client)
+
+    results = await asyncio.gather(
+        *[limiter.hit(KEY, LIMIT, WINDOW, cost=2.5) for _ in range(100)]
+    )
+
+    assert sum(result.allowed for result in results) == LIMIT // 2.5
+
+
+@pytest.mark.parametrize("cost, allowed", [(1, True), (2, False)])
+async def test_a_request_is_admitted_only_if_its_cost_fits(redis_client, cost, allowed):
+    limiter = SlidingWindowLimiter(redis_client)
+    assert (await limiter.hit(KEY, 10, WINDOW, cost=9)).allowed
+
+    result = await limiter.hit(KEY, 10, WINDOW, cost=cost)
+
+    assert result.allowed is allowed
+    assert result.remaining == (0 if allowed else 1)
+
+
+async def test_a_local_bucket_never_admits_past_the_limit(redis_client):
+    limiter = SlidingWindowLimiter(redis_client, local_share=1)
+    await limiter.hit(KEY, 10, WINDOW, cost=1)
+
+    results = [await limiter.hit(KEY, 10, WINDOW, cost=2) for _ in range(10)]
+    await limiter.sync()
+
+    admitted = 1 + 2 * sum(result.allowed for result in results)
+    assert admitted <= 10
+    assert float(await redis_client.hget(f"{KEY}:cost", "_total")) == admitted
+
+
+@pytest.fixture
+def supabase(supabase):
+    supabase.tables.update(
+        groups=[{"id": "g1", "name": "Trip"}],
+        persons=[
+            {"id": f"p{i}", "name": f"Person {i}", "group_id": "g1"} for i in range(5)
+        ],
+        expenses=[
+            {"id": f"e{i}", "amount": 10.0, "group_id": "g1", "payer_id": "p0"}
+            for i in range(20)
+        ],
+        expenses_debtors=[
+            {"id": f"d{i}", "expense_id": f"e{i}", "person_id": "p1", "amount": 10.0}
+            for i in range(20)
+        ],
+    )
+    return supabase
+
+
+@pytest.mark.parametrize("url", ["/groups/g1/snapshot", "/groups/g1/balances"])
+async def test_a_miss_costs_more_than_a_hit(api, monkeypatch, url):
+    costs = []
+    monkeypatch.setattr(RateLimitCharge, "settle", lambda self: costs.append(self.cost))
+
+    for _ in range(2):
+        assert (await api.get(url)).status_code == 200
+
+    miss, hit = costs
+    assert miss.db_rows >= 20 + 20 + 5
+    assert hit.db_rows == 0
+    assert request_cost_units(miss) > request_cost_units(hit)
@@ -0,0 +1,58 @@
+import pytest
+
+from constants.api_messages import ErrorMessages
+
+EXPENSES = [
+    {"id": "e1", "name": "Taxi", "amount": 30.0, "group_id": "g1", "payer_id": "p1"},
+    {"id": "e2", "name": "Lunch", "amount": 12.5, "group_id": "g1", "payer_id": "p1"},
+]
+DEBTORS = [
+    {"id": "d1", "expense_id": "e1", "person_id": "p1", "amount": 30.0},
+    {"id": "d2", "expense_id": "e2", "person_id": "p1", "amount": 12.5},
+]
+
+# Group lists streamed from the DB on a miss, with the table they read
+STREAMED_LISTS = [
+    (
+        "/groups/g1/expenses",
+        "expenses",
+        EXPENSES,
+        ErrorMessages.ERROR_RETRIEVING_GROUP_EXPENSES,
+    ),
+    (
+        "/debtors/g1",
+        "expenses_debtors",
+        DEBTORS,
+        ErrorMessages.ERROR_RETRIEVING_GROUP_DEBTORS,
+    ),
+]
+
+
+@pytest.fixture
+def supabase(supabase):
+    supabase.tables.update(
+        groups=[{"id": "g1", "name": "Trip"}],
+        persons=[{"id": "p1", "name": "Ana", "group_id": "g1"}],
+        expenses=[dict(row) for row in EXPENSES],
+        expenses_debtors=[dict(row) for row in DEBTORS],
+    )
+    return supabase
+
+
+@pytest.mark.parametrize("url, table, rows, error", STREAMED_LISTS)
+async def test_first_page_error_is_a_500(api, supabase, url, table, rows, error):
+    supabase.fail("select", table)
+
+    response = await api.get(url)
+
+    assert response.status_code == 500
+    assert response.json() == {"detail": error}
+
+
+@pytest.mark.parametrize("url, table, rows, error", STREAMED_LISTS)
+async def test_miss_streams_every_row(api, url, table, rows, error):
+    response = await api.get(url)
+
+    assert response.status_code == 200
+    (items,) = response.json().values()
+    assert sorted(item["id"] for item in items) == [row["id"] for row in rows]
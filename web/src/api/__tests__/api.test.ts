@@ -6,6 +6,7 @@ import {
   submitExpense,
   getGroupPersons,
   getExpenses,
+  getGroupSnapshot,
 } from "../api";
 
 vi.mock("axios");
@@ -134,4 +135,33 @@ describe("API functions", () => {
       expect(result).toEqual(mockExpenses);
     });
   });
+
+  describe("getGroupSnapshot", () => {
+    it("fetches group snapshot in a single request", async () => {
+      const mockSnapshot = {
+        group: { id: "group1", name: "Test Group" },
+        persons: [{ id: "1", name: "John" }],
+        expenses: [
+          {
+            id: "1",
+            name: "Test Expense",
+            amount: 50,
+            debtors: [{ id: "d1", expense_id: "1", person_id: "1", amount: 50 }],
+          },
+        ],
+        balances: { "1": { name: "John", paid: 50, owes: 50, balance: 0 } },
+      };
+      vi.mocked(mockedAxios.get).mockResolvedValue({ data: mockSnapshot });
+
+      const controller = new AbortController();
+      const result = await getGroupSnapshot("group1", controller);
+
+      expect(mockedAxios.get).toHaveBeenCalledTimes(1);
+      expect(mockedAxios.get).toHaveBeenCalledWith(
+        "http://localhost:8000/groups/group1/snapshot",
+        { signal: controller.signal }
+      );
+      expect(result).toEqual(mockSnapshot);
+    });
+  });
 });
@@ -3,6 +3,7 @@ import { Group } from "../interfaces/Group";
 import { Person } from "../interfaces/Person";
 import { ExpenseCreate } from "../interfaces/ExpenseCreate";
 import { Expense } from "../interfaces/Expense";
+import { GroupSnapshot } from "../interfaces/GroupSnapshot";
 
 const API_BASE_URL = "http://localhost:8000";
 
@@ -105,3 +106,17 @@ export const getGroupBalances = async (
 
   return res.data;
 };
+
+export const getGroupSnapshot = async (
+  groupId: string,
+  controller?: AbortController
+) => {
+  const res = await axios.get<GroupSnapshot>(
+    `${API_BASE_URL}/groups/${groupId}/snapshot`,
+    {
+      signal: controller?.signal,
+    }
+  );
+
+  return res.data;
+};
@@ -0,0 +1,16 @@
+import { Balances } from "./Balances";
+import { DebtorsExpense } from "./DebtorsExpense";
+import { Expense } from "./Expense";
+import { Group } from "./Group";
+import { Person } from "./Person";
+
+export interface SnapshotExpense extends Omit<Expense, "debtors"> {
+  debtors: DebtorsExpense[];
+}
+
+export interface GroupSnapshot {
+  group: Group;
+  persons: Person[];
+  expenses: SnapshotExpense[];
+  balances: Balances;
+}
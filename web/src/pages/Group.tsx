@@ -1,13 +1,9 @@
 import { useParams, Link } from "react-router-dom";
 import { useCallback, useEffect, useState } from "react";
 import {
-  getDebtors,
-  getExpenses,
-  getGroupPersons,
   submitExpense,
-  getGroup,
   addPerson,
-  getGroupBalances,
+  getGroupSnapshot,
   deleteExpense,
   deletePerson,
 } from "../api/api";
@@ -164,25 +160,20 @@ const Group = () => {
       setIsLoading(true);
 
       try {
-        const [
-          groupData,
-          personsData,
-          expensesData,
-          debtorsData,
-          balancesData,
-        ] = await Promise.all([
-          getGroup(groupId, controller),
-          getGroupPersons(groupId, controller),
-          getExpenses(groupId, controller),
-          getDebtors(groupId, controller),
-          getGroupBalances(groupId, controller),
-        ]);
-
-        setGroup(groupData);
-        setPersons(personsData);
-        setExpenses(expensesData);
-        setDebtorsExpenses(debtorsData);
-        setBalances(balancesData.balances);
+        const snapshot = await getGroupSnapshot(groupId, controller);
+
+        setGroup(snapshot.group);
+        setPersons(snapshot.persons);
+        setExpenses(
+          snapshot.expenses.map(({ debtors, ...expense }) => ({
+            ...expense,
+            debtors: debtors.map((debtor) => debtor.person_id),
+          }))
+        );
+        setDebtorsExpenses(
+          snapshot.expenses.flatMap((expense) => expense.debtors)
+        );
+        setBalances(snapshot.balances);
       } catch (err: unknown) {
         if (err instanceof Error) {
           if (err.name === "CanceledError") return; // ignore cancellation